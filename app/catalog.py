@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable
+
+from app.organize import classify
+from app.sqlite_utils import connect
+
+_COLUMNS = (
+    "sha256",
+    "saved_path",
+    "provider",
+    "query",
+    "url",
+    "source_url",
+    "width",
+    "height",
+    "area",
+    "bytes",
+    "content_type",
+    "time_kst",
+    "day",
+    "buckets",
+    "smart_dedup",
+    "smart_dedup_old_path",
+)
+
+ORDERS = {
+    "newest": "time_kst DESC",
+    "oldest": "time_kst ASC",
+    "largest": "area DESC",
+    "bytes": "bytes DESC",
+}
+
+GROUPS = ("provider", "day", "query", "smart_dedup")
+
+_IMPORT_COMMIT_EVERY = 5000
+
+
+@dataclass
+class ImportStats:
+    lines: int = 0
+    imported: int = 0
+    bad_lines: int = 0
+
+
+def _record(row: dict[str, Any]) -> tuple[Any, ...] | None:
+    """Catalog row for one items.jsonl entry, or None if it is not a saved image."""
+    sha256_hex = row.get("sha256")
+    saved_path = row.get("saved_path")
+    if not isinstance(sha256_hex, str) or not isinstance(saved_path, str):
+        return None
+    width = int(row.get("width") or 0)
+    height = int(row.get("height") or 0)
+    size_bytes = int(row.get("content_length") or 0)
+    time_kst = str(row.get("time_kst") or "")
+    return (
+        sha256_hex,
+        saved_path,
+        row.get("provider"),
+        row.get("query"),
+        row.get("url"),
+        row.get("source_url"),
+        width,
+        height,
+        width * height,
+        size_bytes,
+        row.get("content_type"),
+        time_kst,
+        time_kst[:10],
+        ",".join(classify(width, height, size_bytes)),
+        row.get("smart_dedup"),
+        row.get("smart_dedup_old_path"),
+    )
+
+
+class ItemCatalog:
+    """Indexed catalog of saved images (meta/catalog.sqlite), one row per sha256.
+
+    Holds the same fields as meta/items.jsonl, so questions like "OKs per provider last
+    week" or "largest images" are index lookups instead of a scan of the whole log. A
+    row whose file was later replaced by a smart dedup UPGRADE keeps its data but gets
+    `replaced_at`; queries skip those rows unless asked for them.
+    """
+
+    def __init__(self, db_path: Path, *, wal: bool = True) -> None:
+        self.db_path = db_path
+        self.conn = connect(self.db_path, wal=wal)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS items (
+                sha256 TEXT PRIMARY KEY,
+                saved_path TEXT NOT NULL,
+                provider TEXT,
+                query TEXT,
+                url TEXT,
+                source_url TEXT,
+                width INTEGER NOT NULL,
+                height INTEGER NOT NULL,
+                area INTEGER NOT NULL,
+                bytes INTEGER NOT NULL,
+                content_type TEXT,
+                time_kst TEXT NOT NULL,
+                day TEXT NOT NULL,
+                buckets TEXT NOT NULL,
+                smart_dedup TEXT,
+                smart_dedup_old_path TEXT,
+                replaced_at TEXT
+            );
+            CREATE INDEX IF NOT EXISTS items_provider_time ON items (provider, time_kst);
+            CREATE INDEX IF NOT EXISTS items_time ON items (time_kst);
+            CREATE INDEX IF NOT EXISTS items_day ON items (day);
+            CREATE INDEX IF NOT EXISTS items_area ON items (area);
+            CREATE INDEX IF NOT EXISTS items_bytes ON items (bytes);
+            CREATE INDEX IF NOT EXISTS items_saved_path ON items (saved_path);
+            CREATE TABLE IF NOT EXISTS catalog_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """
+        )
+        self.conn.commit()
+
+    def _put(self, row: dict[str, Any]) -> bool:
+        record = _record(row)
+        if record is None:
+            return False
+        placeholders = ", ".join("?" for _ in _COLUMNS)
+        updates = ", ".join(f"{col} = excluded.{col}" for col in _COLUMNS[1:])
+        self.conn.execute(
+            f"INSERT INTO items ({', '.join(_COLUMNS)}) VALUES ({placeholders}) "
+            f"ON CONFLICT(sha256) DO UPDATE SET {updates}",
+            record,
+        )
+        old_path = row.get("smart_dedup_old_path")
+        if row.get("smart_dedup") == "UPGRADE" and old_path:
+            self.conn.execute(
+                "UPDATE items SET replaced_at = ? WHERE saved_path = ? AND replaced_at IS NULL",
+                (record[_COLUMNS.index("time_kst")], old_path),
+            )
+        return True
+
+    def add(self, row: dict[str, Any]) -> None:
+        """Record one items.jsonl row (the downloader calls this as it logs the row)."""
+        self._put(row)
+        self.conn.commit()
+
+    def import_jsonl(self, path: Path) -> ImportStats:
+        """Import items.jsonl, continuing from where the previous import stopped.
+
+        Rows are keyed by sha256, so importing rows the downloader already recorded is
+        harmless. If the file got shorter than the saved offset (replaced or rotated),
+        it is imported from the start.
+        """
+        stats = ImportStats()
+        if not path.exists():
+            return stats
+        key = f"offset:{path.name}"
+        row = self.conn.execute("SELECT value FROM catalog_meta WHERE key = ?", (key,)).fetchone()
+        offset = int(row[0]) if row is not None else 0
+        if offset > path.stat().st_size:
+            offset = 0
+        with path.open("rb") as fh:
+            fh.seek(offset)
+            for raw in fh:
+                if not raw.endswith(b"\n"):
+                    break  # a line still being written; picked up next time
+                offset += len(raw)
+                stats.lines += 1
+                try:
+                    data = json.loads(raw)
+                except ValueError:
+                    stats.bad_lines += 1
+                    continue
+                if isinstance(data, dict) and self._put(data):
+                    stats.imported += 1
+                if stats.lines % _IMPORT_COMMIT_EVERY == 0:
+                    self._save_offset(key, offset)
+        self._save_offset(key, offset)
+        return stats
+
+    def import_rows(self, rows: Iterable[dict[str, Any]]) -> int:
+        """Import already parsed rows (e.g. rotated log segments); returns how many were images."""
+        imported = 0
+        for n, row in enumerate(rows, start=1):
+            if self._put(row):
+                imported += 1
+            if n % _IMPORT_COMMIT_EVERY == 0:
+                self.conn.commit()
+        self.conn.commit()
+        return imported
+
+    def _save_offset(self, key: str, offset: int) -> None:
+        self.conn.execute(
+            "INSERT INTO catalog_meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, str(offset)),
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def _where(
+        *,
+        provider: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        day: str | None = None,
+        query: str | None = None,
+        bucket: str | None = None,
+        min_width: int = 0,
+        min_height: int = 0,
+        include_replaced: bool = False,
+    ) -> tuple[str, list[Any]]:
+        clauses: list[str] = []
+        params: list[Any] = []
+        if provider:
+            clauses.append("provider = ?")
+            params.append(provider)
+        if since:
+            clauses.append("time_kst >= ?")
+            params.append(since)
+        if until:
+            # `until` is inclusive: a bare date covers that whole day.
+            clauses.append("time_kst < ?")
+            params.append(until + "\uffff")
+        if day:
+            clauses.append("day = ?")
+            params.append(day)
+        if query:
+            clauses.append("query LIKE ?")
+            params.append(f"%{query}%")
+        if bucket:
+            clauses.append("(',' || buckets || ',') LIKE ?")
+            params.append(f"%,{bucket},%")
+        if min_width:
+            clauses.append("width >= ?")
+            params.append(int(min_width))
+        if min_height:
+            clauses.append("height >= ?")
+            params.append(int(min_height))
+        if not include_replaced:
+            clauses.append("replaced_at IS NULL")
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def select(self, *, order: str = "newest", limit: int = 20, **filters: Any) -> list[dict[str, Any]]:
+        where, params = self._where(**filters)
+        cur = self.conn.execute(
+            f"SELECT * FROM items{where} ORDER BY {ORDERS[order]} LIMIT ?", [*params, int(limit)]
+        )
+        names = [d[0] for d in cur.description]
+        return [dict(zip(names, values)) for values in cur.fetchall()]
+
+    def count(self, **filters: Any) -> int:
+        where, params = self._where(**filters)
+        return int(self.conn.execute(f"SELECT COUNT(*) FROM items{where}", params).fetchone()[0])
+
+    def count_by(self, group: str, **filters: Any) -> list[tuple[str, int, int]]:
+        """(group value, images, bytes), largest groups first."""
+        if group not in GROUPS:
+            raise ValueError(f"unknown group: {group}")
+        where, params = self._where(**filters)
+        rows = self.conn.execute(
+            f"SELECT {group}, COUNT(*), SUM(bytes) FROM items{where} GROUP BY {group} ORDER BY COUNT(*) DESC",
+            params,
+        ).fetchall()
+        return [(str(value), int(n), int(total or 0)) for value, n, total in rows]
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def open_catalog(root: Path, *, wal: bool = True, sync: bool = True) -> ItemCatalog:
+    """The photo root's catalog, first catching up with rows logged while it was not being written."""
+    catalog = ItemCatalog(root / "meta" / "catalog.sqlite", wal=wal)
+    if sync:
+        catalog.import_jsonl(root / "meta" / "items.jsonl")
+    return catalog
+
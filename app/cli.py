@@ -26,7 +26,62 @@ def run(
         help="검색어 목록(쉼표 구분). 비우면 기본 추천 키워드 사용",
     ),
     dry_run: bool = typer.Option(False, "--dry-run", help="다운로드/저장을 건너뛰고 수집 후보만 점검"),
+    max_workers: int = typer.Option(
+        RunConfig.max_workers,
+        "--max-workers",
+        min=1,
+        envvar="MAX_WORKERS",
+        help="동시 다운로드 상한. 응답이 빠르고 차단이 없으면 이 값까지 늘림 (기본은 보수적으로 5)",
+    ),
+    min_workers: int = typer.Option(
+        RunConfig.min_workers,
+        "--min-workers",
+        min=1,
+        envvar="MIN_WORKERS",
+        help="동시 다운로드 하한. 429/403이나 지연이 늘면 이 값까지 줄임",
+    ),
     once: bool = typer.Option(True, "--once/--no-once", help="단발 실행 여부. 현재는 단발 실행만 지원"),
+    resume: bool = typer.Option(
+        False,
+        "--resume",
+        help="중단된 이전 실행의 작업 큐(meta/frontier.sqlite)를 이어서 처리. 남은 항목이 없으면 새로 수집",
+    ),
+    deadline_seconds: float = typer.Option(
+        0.0,
+        "--deadline-seconds",
+        help="실행 제한 시간(초). 시간이 부족하면 새 다운로드를 멈추고 요약/상태를 기록한 뒤 종료 (0이면 제한 없음)",
+    ),
+    processes: int = typer.Option(
+        1,
+        "--processes",
+        min=1,
+        help="다운로드를 N개 프로세스로 나눠 처리(호스트 기준 분할). 같은 사진 폴더/중복 DB를 공유",
+    ),
+    coordination: str = typer.Option(
+        "",
+        "--coordination",
+        help='여러 머신이 같은 사진 폴더를 나눠 처리: "sqlite"(공유 폴더의 meta/coordination.sqlite) 또는 "redis"',
+    ),
+    coordination_url: str = typer.Option(
+        "",
+        "--coordination-url",
+        envvar="COORDINATION_URL",
+        help="redis 백엔드 주소 (예: redis://nas:6379/0)",
+    ),
+    run_id: str = typer.Option(
+        "", "--run-id", help="같은 run id의 노드끼리 작업 큐를 공유 (기본: 현재 4시간 주기의 시작 시각, 예: 2026-01-01T0800)"
+    ),
+    node_id: str = typer.Option("", "--node-id", help="노드 이름 (기본: 호스트명)"),
+    trace: bool = typer.Option(
+        False,
+        "--trace",
+        help="후보별 처리 구간(조회/연결/전송/디코드/해시/중복검사/저장)을 logs/trace_<시각>.json에 기록 (chrome://tracing, Perfetto)",
+    ),
+    trace_memory: bool = typer.Option(
+        False,
+        "--trace-memory",
+        help="tracemalloc으로 메모리 최고점 시점의 상위 할당 위치를 요약/상태에 기록 (느려짐, 서버 사양 산정용)",
+    ),
 ) -> None:
     load_dotenv()
 
@@ -40,8 +95,32 @@ def run(
         typer.echo("--no-once는 app.cli run에서 지원하지 않습니다. run_loop.py를 사용하세요.")
         raise typer.Exit(code=EXIT_ERROR)
 
+    if coordination not in ("", "sqlite", "redis"):
+        typer.echo(f"Unknown coordination backend: {coordination}")
+        raise typer.Exit(code=EXIT_ERROR)
+
+    if min_workers > max_workers:
+        typer.echo("--min-workers는 --max-workers보다 클 수 없습니다.")
+        raise typer.Exit(code=EXIT_ERROR)
+
     selected_keywords = _parse_csv(keywords) if keywords else list(DEFAULT_KEYWORDS)
-    config = RunConfig(providers=selected_providers, keywords=selected_keywords, dry_run=dry_run)
+    config = RunConfig(
+        providers=selected_providers,
+        keywords=selected_keywords,
+        dry_run=dry_run,
+        max_workers=max_workers,
+        min_workers=min_workers,
+        initial_workers=min(max(RunConfig.initial_workers, min_workers), max_workers),
+        resume=resume,
+        deadline_seconds=deadline_seconds or None,
+        processes=processes,
+        coordination=coordination,
+        coordination_url=coordination_url,
+        coordination_run_id=run_id,
+        node_id=node_id,
+        trace=trace,
+        trace_memory=trace_memory,
+    )
     project_root = Path(__file__).resolve().parents[1]
     code = run_sync(config, project_root)
     raise typer.Exit(code=code)
@@ -81,6 +160,275 @@ def status() -> None:
     raise typer.Exit(code=EXIT_DEGRADED)
 
 
+@app.command("cluster-report")
+def cluster_report(
+    coordination: str = typer.Option("sqlite", "--coordination", help='"sqlite" 또는 "redis"'),
+    coordination_url: str = typer.Option("", "--coordination-url", envvar="COORDINATION_URL"),
+    run_id: str = typer.Option("", "--run-id", help="합산할 run id (기본: 현재 주기의 run id)"),
+) -> None:
+    """여러 노드가 같은 run id로 올린 실행 결과를 합산해 출력."""
+    load_dotenv()
+    from app.coordination import default_run_id, merge_reports, open_backend
+    from app.paths import get_photo_root
+
+    backend = open_backend(coordination, get_photo_root(), url=coordination_url)
+    try:
+        reports = backend.reports(run_id or default_run_id(RunConfig.coordination_cycle_hours))
+    finally:
+        backend.close()
+    if not reports:
+        typer.echo("No node reports for this run id.")
+        raise typer.Exit(code=EXIT_DEGRADED)
+
+    merged = merge_reports(reports)
+    typer.echo(f"nodes: {','.join(merged['nodes'])}")
+    typer.echo(f"candidates_total: {merged['candidates_total']}")
+    typer.echo("counts:")
+    for key in sorted(merged["counts"]):
+        typer.echo(f"  {key}: {merged['counts'][key]}")
+    typer.echo("provider_ok:")
+    for provider in sorted(merged["provider_ok"]):
+        typer.echo(f"  {provider}: {merged['provider_ok'][provider]}")
+    if merged["failures_by_reason"]:
+        typer.echo("failures_by_reason:")
+        for reason, value in merged["failures_by_reason"].items():
+            typer.echo(f"  {reason}: {value}")
+
+
+@app.command("dedup-index")
+def dedup_index(
+    workers: int = typer.Option(0, "--workers", min=0, help="해시 계산 프로세스 수 (0이면 CPU 코어 수)"),
+) -> None:
+    """기존 사진 폴더 전체의 이미지 지문을 계산해 스마트 중복 DB에 반영 (변경된 파일만 다시 계산)."""
+    load_dotenv()
+    from app.dedup_index import build_index
+    from app.paths import get_photo_root
+
+    root = get_photo_root()
+    stats = build_index(
+        root,
+        workers=workers or None,
+        progress=lambda done, total: typer.echo(f"  hashed {done}/{total}"),
+    )
+    rate = stats.hashed / stats.elapsed_s if stats.elapsed_s > 0 else 0.0
+    typer.echo(f"root: {root}")
+    typer.echo(f"scanned: {stats.scanned}")
+    typer.echo(f"unchanged: {stats.unchanged}")
+    typer.echo(f"hashed: {stats.hashed} ({rate:.0f}/s)")
+    typer.echo(f"errors: {stats.errors}")
+    typer.echo(f"removed: {stats.removed}")
+    typer.echo(f"loaded_into_smart_dedup: {stats.loaded}")
+    typer.echo(f"elapsed_s: {stats.elapsed_s:.1f}")
+
+
+@app.command("compact")
+def compact(
+    dry_run: bool = typer.Option(False, "--dry-run", help="지우지 않고 지울 대상과 확보될 용량만 출력"),
+) -> None:
+    """원본이 없어진 Organized 복사본(스마트 중복 교체, near-dups 격리 등으로 남은 것)을 정리. 바뀐 폴더만 다시 읽음."""
+    load_dotenv()
+    from app.compaction import compact_library
+    from app.paths import get_photo_root
+
+    root = get_photo_root()
+    stats = compact_library(root, dry_run=dry_run)
+    typer.echo(f"root: {root}")
+    typer.echo(f"primaries: {stats.primaries}")
+    typer.echo(f"primary_dirs: listed={stats.primary_dirs_listed} unchanged={stats.primary_dirs_unchanged}")
+    typer.echo(f"organized_dirs: listed={stats.buckets_listed} unchanged={stats.buckets_unchanged}")
+    typer.echo(f"checked: {stats.checked}")
+    typer.echo(f"orphans: {stats.orphans}")
+    typer.echo(f"removed: {stats.removed}{' (dry run)' if dry_run else ''}")
+    typer.echo(f"reclaimed_mb: {stats.reclaimed_bytes / (1024 * 1024):.1f}")
+    typer.echo(f"errors: {stats.errors}")
+    typer.echo(f"elapsed_s: {stats.elapsed_s:.1f}")
+
+
+@app.command("near-dups")
+def near_dups(
+    threshold: int = typer.Option(4, "--threshold", min=0, max=16, help="같은 사진으로 볼 지문 차이(비트 수). 클수록 느슨"),
+    quarantine: bool = typer.Option(
+        False,
+        "--quarantine",
+        help="각 묶음에서 가장 고화질 1장만 남기고 나머지를 Quarantine/<날짜>/ 로 이동",
+    ),
+    refresh: bool = typer.Option(True, "--refresh/--no-refresh", help="먼저 dedup-index로 지문을 최신화"),
+) -> None:
+    """사진 폴더 전체에서 거의 같은 사진 묶음을 찾아 reports/에 JSON/Markdown 보고서 작성."""
+    load_dotenv()
+    from app.dedup_index import LibraryIndex, build_index
+    from app.near_dup import build_report, numpy_available, quarantine as move_to_quarantine, write_report
+    from app.paths import get_photo_root
+
+    if not numpy_available():
+        typer.secho(
+            "경고: numpy가 설치되어 있지 않아 느린 순수 파이썬 방식으로 비교합니다. "
+            "수십만 장 이상이면 `pip install -r requirements.txt`로 numpy를 설치하세요.",
+            err=True,
+            fg=typer.colors.YELLOW,
+        )
+
+    root = get_photo_root()
+    if refresh:
+        build_index(root)
+    index = LibraryIndex(root / "meta" / "dedup_index.sqlite")
+    try:
+        entries = index.entries()
+    finally:
+        index.close()
+
+    report = build_report(entries, threshold)
+    if quarantine and report.clusters:
+        move_to_quarantine(root, report)
+        build_index(root)  # moved files drop out of the index and smart dedup
+    json_path, md_path = write_report(root, report)
+
+    typer.echo(f"images: {report.images}")
+    typer.echo(f"clusters: {len(report.clusters)}")
+    typer.echo(f"redundant: {report.redundant}")
+    typer.echo(f"quarantined: {report.quarantined}")
+    typer.echo(f"elapsed_s: {report.elapsed_s:.1f}")
+    typer.echo(f"report: {md_path}")
+    typer.echo(f"json: {json_path}")
+
+
+@app.command("thumbs")
+def thumbs(
+    workers: int = typer.Option(0, "--workers", min=0, help="썸네일 생성 프로세스 수 (0이면 CPU 코어 수)"),
+    cache_mb: int = typer.Option(512, "--cache-mb", min=1, help="썸네일 캐시 최대 용량(MB). 넘으면 오래 안 본 것부터 삭제"),
+) -> None:
+    """사진 폴더 전체의 썸네일(meta/thumbs/)을 미리 만들어 둠. 이미 있는 것은 건너뜀."""
+    load_dotenv()
+    from app.dedup_index import iter_library_images
+    from app.paths import get_photo_root
+    from app.thumbnails import ThumbnailCache, backfill, load_items
+
+    root = get_photo_root()
+    known = {row["saved_path"]: row.get("sha256") for row in load_items(root / "meta" / "items.jsonl")}
+    files = [(path, known.get(str(path))) for path in iter_library_images(root)]
+    cache = ThumbnailCache(root / "meta" / "thumbs", max_bytes=cache_mb * 1024 * 1024)
+    try:
+        made, errors = backfill(cache, files, workers=workers or None)
+        evicted = cache.evict()
+    finally:
+        cache.close()
+    typer.echo(f"files: {len(files)}")
+    typer.echo(f"made: {made}")
+    typer.echo(f"errors: {errors}")
+    typer.echo(f"evicted: {evicted}")
+
+
+@app.command("contact-sheet")
+def contact_sheet(
+    date: str = typer.Option("", "--date", help="YYYY-MM-DD (KST). 비우면 오늘"),
+    all_dates: bool = typer.Option(False, "--all", help="날짜 상관없이 전체"),
+    cache_mb: int = typer.Option(512, "--cache-mb", min=1),
+) -> None:
+    """썸네일로 된 HTML 사진 목록(reports/Contact_Sheet_<날짜>.html) 생성. 원본을 열지 않아 바로 뜸."""
+    load_dotenv()
+    from app.paths import get_photo_root
+    from app.thumbnails import ThumbnailCache, backfill, load_items, write_contact_sheet
+    from app.time_utils import kst_date_str
+
+    root = get_photo_root()
+    day = None if all_dates else (date or kst_date_str())
+    items = load_items(root / "meta" / "items.jsonl", date=day)
+    cache = ThumbnailCache(root / "meta" / "thumbs", max_bytes=cache_mb * 1024 * 1024)
+    try:
+        backfill(cache, [(Path(row["saved_path"]), row.get("sha256")) for row in items])
+        label = day or "all"
+        out = write_contact_sheet(
+            root / "reports" / f"Contact_Sheet_{label}.html",
+            cache,
+            items,
+            title=f"Contact Sheet ({label})",
+        )
+    finally:
+        cache.close()
+    typer.echo(f"images: {len(items)}")
+    typer.echo(f"report: {out}")
+
+
+@app.command("catalog-import")
+def catalog_import() -> None:
+    """기존 meta/items.jsonl(압축 보관된 지난 기록 포함)을 사진 목록 DB(meta/catalog.sqlite)로 가져옴. 다시 실행하면 새 줄만 읽음."""
+    load_dotenv()
+    from app.catalog import ItemCatalog
+    from app.log_segments import iter_log
+    from app.paths import get_photo_root
+
+    root = get_photo_root()
+    catalog = ItemCatalog(root / "meta" / "catalog.sqlite")
+    try:
+        from_segments = catalog.import_rows(iter_log(root / "meta", "items", include_active=False))
+        stats = catalog.import_jsonl(root / "meta" / "items.jsonl")
+        total = catalog.count(include_replaced=True)
+    finally:
+        catalog.close()
+    typer.echo(f"from_segments: {from_segments}")
+    typer.echo(f"lines: {stats.lines}")
+    typer.echo(f"imported: {stats.imported}")
+    typer.echo(f"bad_lines: {stats.bad_lines}")
+    typer.echo(f"catalog_items: {total}")
+
+
+@app.command("query")
+def query(
+    provider: str = typer.Option("", "--provider", help="provider 이름 (예: naver)"),
+    since: str = typer.Option("", "--since", help="이 시각(KST) 이후. YYYY-MM-DD 또는 7d(최근 7일)"),
+    until: str = typer.Option("", "--until", help="이 날짜(KST)까지. YYYY-MM-DD"),
+    search: str = typer.Option("", "--search", help="검색어(query)에 이 글자가 들어간 것만"),
+    bucket: str = typer.Option("", "--bucket", help="Organized 분류 (예: Organized/Best_Cuts)"),
+    min_width: int = typer.Option(0, "--min-width", min=0),
+    min_height: int = typer.Option(0, "--min-height", min=0),
+    order: str = typer.Option("newest", "--order", help="newest | oldest | largest(해상도) | bytes(용량)"),
+    limit: int = typer.Option(20, "--limit", min=1),
+    group_by: str = typer.Option("", "--group-by", help="개수만 묶어서 출력: provider | day | query | smart_dedup"),
+    include_replaced: bool = typer.Option(False, "--include-replaced", help="더 좋은 화질로 교체된 예전 사진도 포함"),
+) -> None:
+    """저장한 사진 목록(meta/catalog.sqlite)에서 조건에 맞는 사진/개수를 조회. items.jsonl의 새 줄을 먼저 반영."""
+    load_dotenv()
+    from datetime import timedelta
+
+    from app.catalog import GROUPS, ORDERS, open_catalog
+    from app.paths import get_photo_root
+    from app.time_utils import now_kst
+
+    if order not in ORDERS:
+        typer.echo(f"Unknown order: {order}")
+        raise typer.Exit(code=EXIT_ERROR)
+    if group_by and group_by not in GROUPS:
+        typer.echo(f"Unknown group: {group_by}")
+        raise typer.Exit(code=EXIT_ERROR)
+    if since.endswith("d") and since[:-1].isdigit():
+        since = (now_kst() - timedelta(days=int(since[:-1]))).strftime("%Y-%m-%d")
+
+    filters = {
+        "provider": provider or None,
+        "since": since or None,
+        "until": until or None,
+        "query": search or None,
+        "bucket": bucket or None,
+        "min_width": min_width,
+        "min_height": min_height,
+        "include_replaced": include_replaced,
+    }
+    catalog = open_catalog(get_photo_root())
+    try:
+        if group_by:
+            for value, n, total in catalog.count_by(group_by, **filters):
+                typer.echo(f"{value}\t{n}\t{total / (1024 * 1024):.1f}MB")
+            return
+        typer.echo(f"matches: {catalog.count(**filters)}")
+        for row in catalog.select(order=order, limit=limit, **filters):
+            typer.echo(
+                f"{row['time_kst'][:19]}  {row['provider'] or '-':<14} {row['width']}x{row['height']:<6} "
+                f"{row['bytes'] / (1024 * 1024):6.2f}MB  {row['saved_path']}"
+            )
+    finally:
+        catalog.close()
+
+
 @app.command("providers")
 def list_providers() -> None:
     typer.echo(f"recommended: {','.join(DEFAULT_PROVIDERS)}")
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from app.dedup_index import IMAGE_SUFFIXES, NON_LIBRARY_DIRS
+from app.sqlite_utils import connect
+
+ORGANIZED_DIR = "Organized"
+
+
+@dataclass
+class CompactionStats:
+    primary_dirs_listed: int = 0
+    primary_dirs_unchanged: int = 0
+    primaries: int = 0
+    buckets_listed: int = 0
+    buckets_unchanged: int = 0
+    checked: int = 0
+    orphans: int = 0
+    removed: int = 0
+    reclaimed_bytes: int = 0
+    errors: int = 0
+    elapsed_s: float = 0.0
+
+
+@dataclass
+class _Dir:
+    mtime_ns: int
+    files: list[str]
+    subdirs: list[str]
+
+
+class CompactionState:
+    """Listing of every primary and Organized folder as of the last compaction (meta/compaction.sqlite).
+
+    A folder's mtime changes whenever an entry is added, removed or renamed in it, so a
+    folder whose mtime is unchanged is not listed again.
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = db_path
+        self.conn = connect(self.db_path)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS compaction_dirs (
+                path TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                files TEXT NOT NULL,
+                subdirs TEXT NOT NULL
+            )
+            """
+        )
+        self.conn.commit()
+
+    def load(self, kind: str) -> dict[str, _Dir]:
+        rows = self.conn.execute(
+            "SELECT path, mtime_ns, files, subdirs FROM compaction_dirs WHERE kind = ?", (kind,)
+        ).fetchall()
+        return {path: _Dir(int(mtime_ns), json.loads(files), json.loads(subdirs)) for path, mtime_ns, files, subdirs in rows}
+
+    def replace(self, kind: str, dirs: dict[str, _Dir]) -> None:
+        with self.conn:
+            self.conn.execute("DELETE FROM compaction_dirs WHERE kind = ?", (kind,))
+            self.conn.executemany(
+                "INSERT INTO compaction_dirs (path, kind, mtime_ns, files, subdirs) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (path, kind, d.mtime_ns, json.dumps(d.files, ensure_ascii=False), json.dumps(d.subdirs, ensure_ascii=False))
+                    for path, d in dirs.items()
+                ],
+            )
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def _list_dir(path: Path, *, skip: set[str] = frozenset()) -> tuple[list[str], list[str]]:
+    files, subdirs = [], []
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.name.startswith(".") or entry.name in skip:
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.name)
+            elif Path(entry.name).suffix.lower() in IMAGE_SUFFIXES:
+                files.append(entry.name)
+    return sorted(files), sorted(subdirs)
+
+
+def _walk(root: Path, previous: dict[str, _Dir], *, skip_top: set[str] = frozenset()) -> tuple[dict[str, _Dir], set[str]]:
+    """Folders under `root` with their listing; only folders whose mtime changed are listed again.
+
+    Returns (folders, keys of the folders listed this time).
+    """
+    current: dict[str, _Dir] = {}
+    listed: set[str] = set()
+    pending = [root]
+    while pending:
+        path = pending.pop()
+        try:
+            mtime_ns = path.stat().st_mtime_ns
+        except OSError:
+            continue  # gone
+        key = str(path)
+        entry = previous.get(key)
+        if entry is None or entry.mtime_ns != mtime_ns:
+            try:
+                files, subdirs = _list_dir(path, skip=skip_top if path == root else frozenset())
+            except OSError:
+                if entry is None:
+                    continue
+                # Keep the old listing rather than treating the folder's files as deleted.
+                mtime_ns = -1  # forces a new listing next time
+                files, subdirs = entry.files, entry.subdirs
+            else:
+                listed.add(key)
+            entry = _Dir(mtime_ns, files, subdirs)
+        current[key] = entry
+        pending.extend(path / name for name in entry.subdirs)
+    return current, listed
+
+
+def _live_names(dirs: dict[str, _Dir]) -> set[str]:
+    return {name for d in dirs.values() for name in d.files}
+
+
+def compact_library(root: Path, *, dry_run: bool = False) -> CompactionStats:
+    """Remove Organized copies whose primary file is gone.
+
+    Organized copies carry their primary's file name (the sha256 prefix), so a copy
+    is an orphan when no primary download has that name any more, e.g. after a smart
+    dedup UPGRADE replaced it or `near-dups --quarantine` moved it aside. Only the
+    folders that changed since the last compaction are listed; copies in unchanged
+    Organized folders are checked against the primaries that disappeared since then.
+    """
+    started = time.monotonic()
+    stats = CompactionStats()
+    state = CompactionState(root / "meta" / "compaction.sqlite")
+    try:
+        old_primaries = state.load("primary")
+        primaries, listed = _walk(root, old_primaries, skip_top=NON_LIBRARY_DIRS)
+        stats.primary_dirs_listed = len(listed)
+        stats.primary_dirs_unchanged = len(primaries) - len(listed)
+        live = _live_names(primaries)
+        stats.primaries = len(live)
+        if not live:
+            # An empty or unmounted library would make every copy look orphaned.
+            stats.elapsed_s = time.monotonic() - started
+            return stats
+        gone = _live_names(old_primaries) - live
+
+        old_buckets = state.load("bucket")
+        buckets, listed = _walk(root / ORGANIZED_DIR, old_buckets)
+        stats.buckets_listed = len(listed)
+        stats.buckets_unchanged = len(buckets) - len(listed)
+        for key, entry in buckets.items():
+            if key in listed:
+                known = old_buckets.get(key)
+                seen = set(known.files) if known is not None else set()
+                # New copies may belong to any primary; copies seen before only if their primary went away.
+                suspects = [name for name in entry.files if (name not in seen and name not in live) or name in gone]
+            else:
+                suspects = [name for name in entry.files if name in gone]
+            if not suspects:
+                continue
+            stats.checked += len(suspects)
+            removed = _remove_orphans(Path(key), suspects, live, stats, dry_run=dry_run)
+            if removed is None:
+                # Something failed: list the folder next time and check every copy in it again.
+                entry.mtime_ns, entry.files = -1, []
+            elif removed:
+                # Our deletions changed the folder's mtime; the next run lists it once more
+                # (cheap) instead of trusting an mtime that may also cover a concurrent download.
+                entry.mtime_ns = -1
+                entry.files = [name for name in entry.files if name not in removed]
+
+        if not dry_run:
+            state.replace("primary", primaries)
+            state.replace("bucket", buckets)
+    finally:
+        state.close()
+    stats.elapsed_s = time.monotonic() - started
+    return stats
+
+
+def _remove_orphans(
+    bucket: Path, names: list[str], live: set[str], stats: CompactionStats, *, dry_run: bool
+) -> set[str] | None:
+    """Delete the copies in `bucket` that have no live primary; None if any of them failed."""
+    removed: set[str] = set()
+    ok = True
+    for name in names:
+        if name in live:
+            continue
+        path = bucket / name
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            removed.add(name)
+            continue
+        except OSError:
+            stats.errors += 1
+            ok = False
+            continue
+        stats.orphans += 1
+        # A hard-linked copy frees nothing while its other name remains.
+        freed = st.st_size if st.st_nlink == 1 else 0
+        if not dry_run:
+            try:
+                path.unlink()
+            except OSError:
+                stats.errors += 1
+                ok = False
+                continue
+            removed.add(name)
+            stats.removed += 1
+        stats.reclaimed_bytes += freed
+    return removed if ok else None
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import asyncio
+import statistics
+import time
+from typing import Any
+
+
+class AIMDController:
+    """Adaptive limit on concurrent downloads (additive increase, multiplicative decrease).
+
+    Workers call `acquire()`/`release()` around each download and report what they
+    observed with `record()`. Every `window` completions the controller decides:
+
+    - throttled (429/403) or latency far above the best window seen -> limit *= decrease_factor
+    - latency near the baseline and throughput not dropping         -> limit += increase_step
+    - otherwise                                                       -> hold
+
+    A throttle response shrinks the limit immediately (at most once per window) so a
+    blocking host is backed off before the window completes.
+    """
+
+    def __init__(
+        self,
+        *,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        increase_step: int = 1,
+        decrease_factor: float = 0.5,
+        window: int = 8,
+        latency_slack: float = 2.0,
+    ) -> None:
+        self.min_limit = max(1, int(min_limit))
+        self.max_limit = max(self.min_limit, int(max_limit))
+        self.limit = min(self.max_limit, max(self.min_limit, int(initial)))
+        self.increase_step = max(1, int(increase_step))
+        self.decrease_factor = float(decrease_factor)
+        self.window = max(1, int(window))
+        self.latency_slack = float(latency_slack)
+
+        self.active = 0
+        self._cond = asyncio.Condition()
+        self._started = time.monotonic()
+        self._window_started = self._started
+        self._latencies: list[float] = []
+        self._bytes = 0
+        self._throttled = 0
+        self._since_decrease = self.window
+        self._baseline_latency: float | None = None
+        self._last_throughput: float | None = None
+        self.trajectory: list[dict[str, Any]] = [{"t": 0.0, "limit": self.limit, "why": "start"}]
+
+    async def acquire(self) -> None:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+
+    async def release(self) -> None:
+        async with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+    async def record(self, *, latency_s: float, nbytes: int = 0, throttled: bool = False) -> None:
+        async with self._cond:
+            self._latencies.append(float(latency_s))
+            self._bytes += int(nbytes)
+            self._since_decrease += 1
+            if throttled:
+                self._throttled += 1
+                if self._since_decrease >= self.window:
+                    self._decrease("throttled")
+                    return
+            if len(self._latencies) >= self.window:
+                self._decide()
+
+    def _decide(self) -> None:
+        now = time.monotonic()
+        p50 = statistics.median(self._latencies)
+        throughput = self._bytes / max(1e-6, now - self._window_started)
+        baseline = self._baseline_latency
+        if baseline is None or p50 < baseline:
+            self._baseline_latency = baseline = p50
+
+        if self._throttled:
+            self._decrease("throttled")
+        elif p50 > baseline * self.latency_slack:
+            self._decrease("latency")
+        elif self._last_throughput is None or throughput >= self._last_throughput * 0.9:
+            self._set(self.limit + self.increase_step, "increase")
+            self._reset_window()
+        else:
+            self._reset_window()
+        self._last_throughput = throughput
+
+    def _decrease(self, why: str) -> None:
+        self._set(int(self.limit * self.decrease_factor), why)
+        self._since_decrease = 0
+        self._reset_window()
+
+    def _reset_window(self) -> None:
+        self._window_started = time.monotonic()
+        self._latencies.clear()
+        self._bytes = 0
+        self._throttled = 0
+
+    def _set(self, limit: int, why: str) -> None:
+        limit = min(self.max_limit, max(self.min_limit, limit))
+        if limit == self.limit:
+            return
+        self.limit = limit
+        self.trajectory.append({"t": round(time.monotonic() - self._started, 3), "limit": limit, "why": why})
+        self._cond.notify_all()
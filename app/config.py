@@ -19,14 +19,156 @@ class RunConfig:
 
     # Downloader
     # Keep workers moderate to avoid bursts / rate limiting.
+    # With adaptive_concurrency the active worker count starts at initial_workers and moves
+    # within [min_workers, max_workers] (AIMD on latency/throughput/429-403 responses). The
+    # default ceiling is the old fixed worker count; raise it (run --max-workers / MAX_WORKERS)
+    # to let healthy hosts scale up.
     max_workers: int = 5
+    min_workers: int = 2
+    initial_workers: int = 5
+    adaptive_concurrency: bool = True
+
+    # Download pipeline: the workers above fetch; process_workers decode headers/fingerprints in
+    # threads and one persister writes the dedup DBs/logs. Stages hand over through queues of
+    # stage_queue_size items, so a slow stage holds back the others instead of piling up temp files.
+    process_workers: int = 2
+    stage_queue_size: int = 16
+    # Image files are written by one writer thread: temp file + atomic rename, so a crash never
+    # leaves a half-written image. durable_writes also fsyncs each file and, once per batch of up
+    # to write_batch_size queued writes, the directories renamed into.
+    durable_writes: bool = True
+    write_batch_size: int = 32
+
+    # >1: split downloads across this many worker processes (partitioned by host).
+    # Worker limits and the in-flight byte budget apply per process.
+    processes: int = 1
     min_short_side_px: int = 720  # default: 720p quality gate
+    # Bodies are streamed to disk. Responses being downloaded at once may add up to
+    # inflight_byte_budget_mb (each reserves its Content-Length, or max_image_mb when unknown),
+    # and a body over max_image_mb is aborted as DOWNLOAD_FAIL.
+    inflight_byte_budget_mb: int = 96
+    max_image_mb: int = 48
+
+    # Download order: candidates are scored by historical OK rate per provider/host/query
+    # (meta/yield_stats.sqlite) and fetched best-first. Weights scale each dimension's rate.
+    priority_scheduling: bool = True
+    priority_weights: dict[str, float] = field(
+        default_factory=lambda: {"provider": 1.0, "host": 1.0, "query": 0.5}
+    )
+    # Pseudo-observations of the global OK rate mixed into each key's rate (smoothing).
+    priority_prior_strength: float = 5.0
+
+    # Negative cache (meta/negative_cache.sqlite): URLs that ended in DOWNLOAD_FAIL/NOT_IMAGE/
+    # IMAGE_DECODE_FAIL, and hosts with a run of such failures, are skipped until their TTL expires.
+    # Each repeated failure moves one step up the TTL ladder. Only transport errors, timeouts and
+    # 5xx count toward a host's streak (404/NOT_IMAGE are dead links, not a dead host), and a
+    # host is never skipped for longer than negative_cache_host_ttl_max_seconds.
+    negative_cache: bool = True
+    negative_cache_ttls_seconds: tuple[int, ...] = (3600, 6 * 3600, 24 * 3600, 7 * 24 * 3600)
+    negative_cache_host_failure_threshold: int = 5
+    negative_cache_host_ttl_max_seconds: int = 6 * 3600
+
+    # Per-host circuit breaker + per-run retry budget for request_with_retry.
+    # A host opens after circuit_failure_threshold consecutive failures and is probed again
+    # after circuit_cooldown_seconds. Retries are capped at retry_budget_min + ratio * requests.
+    circuit_failure_threshold: int = 5
+    circuit_cooldown_seconds: float = 60.0
+    retry_budget_ratio: float = 0.2
+    retry_budget_min: int = 10
 
     # Naver
     naver_display: int = 50
     naver_pages: int = 5
 
+    # Naver OpenAPI quota: calls are counted per KST day in meta/naver_quota.sqlite. Each run makes
+    # keywords x naver_pages calls (at most remaining / runs left today, one per
+    # naver_run_interval_hours), picked from every reachable page by historical yield.
+    # A URL counts as new again once Naver has not returned it for naver_seen_days.
+    naver_quota: bool = True
+    naver_daily_quota: int = 25_000
+    naver_run_interval_hours: float = 4.0
+    naver_seen_days: float = 30.0
+
+    # Wikimedia: newest uploads first. With wikimedia_incremental, meta/discovery_watermarks.sqlite
+    # remembers the newest file seen per query, so a run pages only through new uploads
+    # (up to wikimedia_new_pages) and then backfills wikimedia_backfill_pages older pages.
+    wikimedia_incremental: bool = True
+    wikimedia_new_pages: int = 3
+    wikimedia_backfill_pages: int = 1
+
+    # Instagram seeds: up to instagram_seed_concurrency seed pages are resolved at once, each
+    # read only up to </head> (og:image lives there) and never past instagram_head_max_kb.
+    instagram_seed_concurrency: int = 4
+    instagram_head_max_kb: int = 512
+
     # Google (best-effort)
     google_max_pages: int = 2
 
     dry_run: bool = False
+
+    # Run deadline: when set, run_once finishes within deadline_seconds. Discovery may use
+    # discovery_budget_fraction of it; downloads stop being scheduled when one more would not
+    # fit before (deadline - deadline_drain_seconds), and in-flight ones get the drain window.
+    deadline_seconds: float | None = None
+    discovery_budget_fraction: float = 0.3
+    deadline_drain_seconds: float = 30.0
+
+    # Thumbnails: WebP previews of new downloads in meta/thumbs/, rendered by background
+    # threads; the cache is trimmed to thumbnail_cache_mb (least recently used first).
+    thumbnails: bool = True
+    thumbnail_workers: int = 2
+    thumbnail_cache_mb: int = 512
+
+    # Item catalog: every saved image is also recorded in meta/catalog.sqlite (indexed by
+    # provider/time/size) for `app.cli query` and the daily report.
+    item_catalog: bool = True
+
+    # Log rotation: at the start of a run, meta/items.jsonl and meta/failed.jsonl move into
+    # compressed segments under meta/segments/ once bigger than log_rotate_mb or holding
+    # entries older than log_rotate_days. zstd needs the optional zstandard package (else gzip).
+    log_rotation: bool = True
+    log_rotate_mb: int = 64
+    log_rotate_days: float = 7.0
+    log_compression: str = "zstd"
+
+    # Discovery cache: reuse Wikimedia search results / Instagram og:image resolutions
+    # younger than the provider's TTL instead of querying again.
+    discovery_cache: bool = True
+    discovery_cache_ttl_seconds: dict[str, float] = field(
+        default_factory=lambda: {"wikimedia": 12 * 3600, "instagram_seed": 24 * 3600}
+    )
+
+    # Tracing: record per-candidate spans (provider queries, connect/TLS/transfer, decode,
+    # sha256, smart-dedup lock wait, disk writes) into logs/trace_<run_ts>.json, viewable in
+    # chrome://tracing or Perfetto. Off by default; disabled spans are shared no-ops.
+    trace: bool = False
+
+    # Event-loop watchdog: callbacks that block the loop longer than loop_stall_threshold_ms
+    # are logged with the blocking stack to meta/loop_stalls.jsonl and counted in the summary.
+    loop_watchdog: bool = True
+    loop_stall_threshold_ms: float = 250.0
+
+    # Memory accounting: RSS is sampled every memory_sample_interval_s and the run/stage peaks go
+    # to the summary and status.json. trace_memory (--trace-memory) also runs tracemalloc and
+    # lists the top allocation sites live at the RSS peak (slower; for sizing workers/machines).
+    memory_sampling: bool = True
+    memory_sample_interval_s: float = 0.5
+    trace_memory: bool = False
+    trace_memory_top: int = 15
+
+    # Frontier (crash-safe work queue)
+    # resume=True continues the previous run's pending items instead of re-discovering.
+    resume: bool = False
+    frontier_lease_seconds: float = 300.0
+
+    # Multi-node coordination ("" = single host; "sqlite" = queue in meta/coordination.sqlite on
+    # the shared photo root; "redis" = coordination_url). Nodes using the same run id share one
+    # candidate queue, handed out in leased batches. The default run id is the KST start of the
+    # current coordination_cycle_hours slot (run_loop's interval), so each cycle gets a fresh
+    # queue and URLs that failed are retried; node_id defaults to the host name.
+    coordination: str = ""
+    coordination_url: str = ""
+    coordination_run_id: str = ""
+    coordination_cycle_hours: float = 4.0
+    coordination_batch_size: int = 100
+    node_id: str = ""
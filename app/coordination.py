@@ -0,0 +1,402 @@
+from __future__ import annotations
+
+import json
+import socket
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterable, Protocol
+
+from app.dedup import DedupStore
+from app.models import Candidate
+from app.smart_dedup import SmartDedupStore, decide, fingerprint
+from app.sqlite_utils import connect
+from app.time_utils import now_kst
+
+BACKEND_SQLITE = "sqlite"
+BACKEND_REDIS = "redis"
+
+
+def default_node_id() -> str:
+    """Stable per host, so every cycle of the same machine reports as the same node."""
+    return socket.gethostname()
+
+
+def default_run_id(cycle_hours: float, now: datetime | None = None) -> str:
+    """KST start of the current `cycle_hours` slot, e.g. "2026-01-01T0800".
+
+    Nodes started within the same slot share a queue without agreeing on an id up front,
+    and the next cycle gets a fresh one, so URLs that failed are tried again.
+    """
+    now = now or now_kst()
+    slot = max(1, round(cycle_hours * 60))
+    minute = (now.hour * 60 + now.minute) // slot * slot
+    return f"{now:%Y-%m-%d}T{minute // 60:02d}{minute % 60:02d}"
+
+
+class CoordinationBackend(Protocol):
+    """Shared state for several collector nodes working on one photo root.
+
+    Candidates of a run (`run_id`) are enqueued once, no matter how many nodes discovered
+    them, and handed out in leased batches; a lease that is not completed in time (node
+    crashed) goes back to the queue. Dedup indexes and run reports are shared as well.
+    """
+
+    def enqueue(self, run_id: str, candidates: Iterable[Candidate]) -> int:
+        """Add candidates not yet known for this run. Returns how many were new."""
+
+    def lease(self, run_id: str, owner: str, limit: int, lease_seconds: float) -> list[Candidate]: ...
+
+    def complete(self, run_id: str, url: str, outcome: str) -> None: ...
+
+    def dedup_store(self) -> Any:
+        """sha256 index with the DedupStore interface (has/add/claim/release/close)."""
+
+    def smart_dedup(self) -> Any:
+        """Perceptual index with the SmartDedupStore interface (check_and_update[_fingerprint], check_fingerprint)."""
+
+    def publish_report(self, run_id: str, node_id: str, report: dict[str, Any]) -> None: ...
+
+    def reports(self, run_id: str) -> dict[str, dict[str, Any]]: ...
+
+    def close(self) -> None: ...
+
+
+class LeasedFrontier:
+    """Adapter so `ImageDownloader.process_candidates(frontier=...)` completes shared leases."""
+
+    def __init__(self, backend: CoordinationBackend, run_id: str) -> None:
+        self.backend = backend
+        self.run_id = run_id
+
+    def lease(self, url: str) -> None:
+        # Already leased by `backend.lease()` when the batch was handed out.
+        pass
+
+    def complete(self, url: str, outcome: str) -> None:
+        self.backend.complete(self.run_id, url, outcome)
+
+
+def merge_reports(reports: dict[str, dict[str, Any]]) -> dict[str, Any]:
+    """Sum the per-node run reports of one run_id."""
+    counts: Counter = Counter()
+    provider_ok: Counter = Counter()
+    failures: Counter = Counter()
+    candidates_total = 0
+    for report in reports.values():
+        counts.update({k: int(v) for k, v in (report.get("counts") or {}).items() if not k.startswith("_")})
+        provider_ok.update(report.get("provider_ok") or {})
+        failures.update(report.get("failures_by_reason") or {})
+        candidates_total += int(report.get("candidates_total", 0) or 0)
+    return {
+        "nodes": sorted(reports),
+        "candidates_total": candidates_total,
+        "counts": dict(counts),
+        "provider_ok": dict(provider_ok),
+        "failures_by_reason": dict(sorted(failures.items())),
+    }
+
+
+class SQLiteCoordination:
+    """Coordination through files on the shared photo root.
+
+    The queue lives in meta/coordination.sqlite; the sha256 and perceptual indexes are the
+    regular meta/dedup.sqlite and meta/smart_dedup.pkl (already guarded by SQLite and
+    flock locks). SQLite is opened without WAL because WAL does not work across hosts.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.conn = connect(root / "meta" / "coordination.sqlite", wal=False)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS queue (
+                run_id TEXT NOT NULL,
+                url TEXT NOT NULL,
+                provider TEXT NOT NULL,
+                query TEXT,
+                source_url TEXT,
+                state TEXT NOT NULL,
+                owner TEXT,
+                lease_until REAL,
+                outcome TEXT,
+                seq INTEGER NOT NULL,
+                PRIMARY KEY (run_id, url)
+            );
+            CREATE INDEX IF NOT EXISTS idx_queue_state ON queue (run_id, state, seq);
+            CREATE TABLE IF NOT EXISTS reports (
+                run_id TEXT NOT NULL,
+                node_id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (run_id, node_id)
+            );
+            """
+        )
+        self.conn.commit()
+
+    def enqueue(self, run_id: str, candidates: Iterable[Candidate]) -> int:
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            row = self.conn.execute("SELECT COALESCE(MAX(seq), -1) FROM queue WHERE run_id = ?", (run_id,)).fetchone()
+            start = int(row[0]) + 1
+            before = self.conn.total_changes
+            self.conn.executemany(
+                """
+                INSERT OR IGNORE INTO queue (run_id, url, provider, query, source_url, state, seq)
+                VALUES (?, ?, ?, ?, ?, 'pending', ?)
+                """,
+                [
+                    (run_id, c.url, c.provider, c.query, c.source_url, start + i)
+                    for i, c in enumerate(candidates)
+                ],
+            )
+            return self.conn.total_changes - before
+
+    def lease(self, run_id: str, owner: str, limit: int, lease_seconds: float) -> list[Candidate]:
+        now = time.time()
+        with self.conn:
+            # IMMEDIATE takes the write lock up front, so two nodes never lease the same rows.
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.execute(
+                """
+                UPDATE queue SET state = 'pending', owner = NULL, lease_until = NULL
+                WHERE run_id = ? AND state = 'in_flight' AND lease_until < ?
+                """,
+                (run_id, now),
+            )
+            rows = self.conn.execute(
+                """
+                SELECT url, provider, query, source_url FROM queue
+                WHERE run_id = ? AND state = 'pending' ORDER BY seq LIMIT ?
+                """,
+                (run_id, int(limit)),
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE queue SET state = 'in_flight', owner = ?, lease_until = ? WHERE run_id = ? AND url = ?",
+                [(owner, now + lease_seconds, run_id, url) for url, *_ in rows],
+            )
+        return [Candidate(url=url, provider=provider, query=query, source_url=source_url) for url, provider, query, source_url in rows]
+
+    def complete(self, run_id: str, url: str, outcome: str) -> None:
+        with self.conn:
+            self.conn.execute(
+                "UPDATE queue SET state = 'done', lease_until = NULL, outcome = ? WHERE run_id = ? AND url = ?",
+                (outcome, run_id, url),
+            )
+
+    def dedup_store(self) -> DedupStore:
+        return DedupStore(self.root / "meta" / "dedup.sqlite", wal=False)
+
+    def smart_dedup(self) -> SmartDedupStore:
+        return SmartDedupStore(str(self.root / "meta" / "smart_dedup.pkl"))
+
+    def publish_report(self, run_id: str, node_id: str, report: dict[str, Any]) -> None:
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO reports (run_id, node_id, payload, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(run_id, node_id) DO UPDATE SET payload = excluded.payload, updated_at = excluded.updated_at
+                """,
+                (run_id, node_id, json.dumps(report, ensure_ascii=False), time.time()),
+            )
+
+    def reports(self, run_id: str) -> dict[str, dict[str, Any]]:
+        rows = self.conn.execute("SELECT node_id, payload FROM reports WHERE run_id = ?", (run_id,)).fetchall()
+        return {node_id: json.loads(payload) for node_id, payload in rows}
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def _text(value: Any) -> str | None:
+    if value is None:
+        return None
+    return value.decode("utf-8") if isinstance(value, bytes) else str(value)
+
+
+class _RedisDedupStore:
+    def __init__(self, client: Any, key: str) -> None:
+        self.client = client
+        self.key = key
+
+    def has(self, sha256_hex: str) -> bool:
+        return self.client.hget(self.key, sha256_hex) is not None
+
+    def add(self, sha256_hex: str, created_at: str) -> None:
+        self.client.hsetnx(self.key, sha256_hex, created_at)
+
+    def claim(self, sha256_hex: str, created_at: str) -> bool:
+        return bool(self.client.hsetnx(self.key, sha256_hex, created_at))
+
+    def release(self, sha256_hex: str) -> None:
+        self.client.hdel(self.key, sha256_hex)
+
+    def close(self) -> None:
+        pass
+
+
+# Delete the lock only while it still holds our token (it may have expired and been retaken).
+_RELEASE_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Requeue expired leases, then move up to ARGV[4] queued candidates into the lease hash. One
+# script, so a node dying between the pop and the lease write cannot lose a URL.
+# KEYS: queue, leases. ARGV: now, lease until, owner, limit.
+_LEASE = """
+local now = tonumber(ARGV[1])
+local leases = redis.call('HGETALL', KEYS[2])
+for i = 1, #leases, 2 do
+    local lease = cjson.decode(leases[i + 1])
+    if lease['until'] < now then
+        redis.call('HDEL', KEYS[2], leases[i])
+        redis.call('RPUSH', KEYS[1], cjson.encode(lease['cand']))
+    end
+end
+local out = {}
+for _ = 1, tonumber(ARGV[4]) do
+    local raw = redis.call('LPOP', KEYS[1])
+    if not raw then
+        break
+    end
+    local cand = cjson.decode(raw)
+    redis.call('HSET', KEYS[2], cand['url'], cjson.encode({owner = ARGV[3], ['until'] = tonumber(ARGV[2]), cand = cand}))
+    out[#out + 1] = raw
+end
+return out
+"""
+
+
+class _RedisSmartDedup:
+    """Blocking (network round-trips, lock waits): call it from a thread, not the event loop."""
+
+    def __init__(self, client: Any, key: str, *, lock_ms: int = 10_000) -> None:
+        self.client = client
+        self.key = key
+        self.lock_key = f"{key}:lock"
+        self.lock_ms = lock_ms
+
+    def check_and_update(self, img, new_path: str):
+        ph, new_area = fingerprint(img)
+        return self.check_and_update_fingerprint(ph, new_area, new_path)
+
+    def check_fingerprint(self, ph: str, new_area: int):
+        raw = _text(self.client.hget(self.key, ph))
+        old_info = json.loads(raw) if raw else None
+        return decide(old_info, new_area), (old_info or {}).get("path")
+
+    def check_and_update_fingerprint(self, ph: str, new_area: int, new_path: str):
+        # Compare-and-set under a short lock; expires on its own if the holder dies.
+        token = uuid.uuid4().hex
+        while not self.client.set(self.lock_key, token, nx=True, px=self.lock_ms):
+            time.sleep(0.01)
+        try:
+            raw = _text(self.client.hget(self.key, ph))
+            old_info = json.loads(raw) if raw else None
+            action = decide(old_info, new_area)
+            if action == "DUPLICATE":
+                return "DUPLICATE", old_info.get("path", "")
+            self.client.hset(self.key, ph, json.dumps({"path": new_path, "area": new_area}, ensure_ascii=False))
+        finally:
+            self.client.eval(_RELEASE_LOCK, 1, self.lock_key, token)
+        if action == "UPGRADE":
+            return "UPGRADE", old_info.get("path", "")
+        return "NEW", None
+
+    def save(self) -> None:
+        pass
+
+
+class RedisCoordination:
+    """Coordination through a Redis server (or anything speaking the same commands).
+
+    Only a small command set is used (HSETNX/HGET/HSET/HDEL/HGETALL, RPUSH, SET NX PX/EXISTS
+    and EVAL of the scripts above), with redis-py call signatures, so a compatible stand-in
+    client can be passed instead of `redis.Redis`.
+    """
+
+    def __init__(self, client: Any, *, prefix: str = "photo_collector") -> None:
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self.prefix, *parts))
+
+    def seed(self, root: Path) -> None:
+        """Copy the local meta/ dedup indexes into Redis once, so nodes start from the existing library."""
+        if self.client.exists(self._key("seeded")):
+            return
+        sha_key, phash_key = self._key("sha256"), self._key("phash")
+        dedup_path = root / "meta" / "dedup.sqlite"
+        if dedup_path.exists():
+            store = DedupStore(dedup_path)
+            try:
+                for sha, created_at in store.conn.execute("SELECT sha256, created_at FROM hashes"):
+                    self.client.hsetnx(sha_key, sha, created_at)
+            finally:
+                store.close()
+        smart = SmartDedupStore(str(root / "meta" / "smart_dedup.pkl"))
+        for ph, info in smart.hashes.items():
+            self.client.hsetnx(phash_key, ph, json.dumps(info, ensure_ascii=False))
+        self.client.set(self._key("seeded"), "1")
+
+    def enqueue(self, run_id: str, candidates: Iterable[Candidate]) -> int:
+        seen_key, queue_key = self._key("seen", run_id), self._key("queue", run_id)
+        added = 0
+        for c in candidates:
+            if self.client.hsetnx(seen_key, c.url, "1"):
+                payload = {"url": c.url, "provider": c.provider, "query": c.query, "source_url": c.source_url}
+                self.client.rpush(queue_key, json.dumps(payload, ensure_ascii=False))
+                added += 1
+        return added
+
+    def lease(self, run_id: str, owner: str, limit: int, lease_seconds: float) -> list[Candidate]:
+        now = time.time()
+        leased = self.client.eval(
+            _LEASE, 2, self._key("queue", run_id), self._key("leases", run_id), now, now + lease_seconds, owner, int(limit)
+        )
+        return [Candidate(**json.loads(_text(raw))) for raw in leased or []]
+
+    def complete(self, run_id: str, url: str, outcome: str) -> None:
+        self.client.hdel(self._key("leases", run_id), url)
+        self.client.hset(self._key("done", run_id), url, outcome)
+
+    def dedup_store(self) -> _RedisDedupStore:
+        return _RedisDedupStore(self.client, self._key("sha256"))
+
+    def smart_dedup(self) -> _RedisSmartDedup:
+        return _RedisSmartDedup(self.client, self._key("phash"))
+
+    def publish_report(self, run_id: str, node_id: str, report: dict[str, Any]) -> None:
+        self.client.hset(self._key("reports", run_id), node_id, json.dumps(report, ensure_ascii=False))
+
+    def reports(self, run_id: str) -> dict[str, dict[str, Any]]:
+        raw = self.client.hgetall(self._key("reports", run_id)) or {}
+        return {_text(node): json.loads(_text(payload)) for node, payload in raw.items()}
+
+    def close(self) -> None:
+        close = getattr(self.client, "close", None)
+        if close is not None:
+            close()
+
+
+def open_backend(kind: str, root: Path, *, url: str = "", prefix: str = "photo_collector") -> CoordinationBackend:
+    if kind == BACKEND_SQLITE:
+        return SQLiteCoordination(root)
+    if kind == BACKEND_REDIS:
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("coordination=redis requires the 'redis' package (pip install redis)") from exc
+        if not url:
+            raise RuntimeError("coordination=redis requires a URL (--coordination-url / COORDINATION_URL)")
+        backend = RedisCoordination(redis.Redis.from_url(url), prefix=prefix)
+        backend.seed(root)
+        return backend
+    raise ValueError(f"unknown coordination backend: {kind}")
@@ -1,14 +1,14 @@
 from __future__ import annotations
 
-import sqlite3
 from pathlib import Path
 
+from app.sqlite_utils import connect
+
 
 class DedupStore:
-    def __init__(self, db_path: Path) -> None:
+    def __init__(self, db_path: Path, *, wal: bool = True) -> None:
         self.db_path = db_path
-        self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self.conn = sqlite3.connect(self.db_path)
+        self.conn = connect(self.db_path, wal=wal)
         self.conn.execute(
             """
             CREATE TABLE IF NOT EXISTS hashes (
@@ -30,5 +30,22 @@ class DedupStore:
         )
         self.conn.commit()
 
+    def claim(self, sha256_hex: str, created_at: str) -> bool:
+        """Atomically insert the hash if absent. True means the caller owns saving this image.
+
+        Two workers (or processes) fetching the same bytes can never both win.
+        """
+        cur = self.conn.execute(
+            "INSERT OR IGNORE INTO hashes (sha256, created_at) VALUES (?, ?)",
+            (sha256_hex, created_at),
+        )
+        self.conn.commit()
+        return cur.rowcount == 1
+
+    def release(self, sha256_hex: str) -> None:
+        """Undo a `claim` whose image ended up not being saved."""
+        self.conn.execute("DELETE FROM hashes WHERE sha256 = ?", (sha256_hex,))
+        self.conn.commit()
+
     def close(self) -> None:
         self.conn.close()
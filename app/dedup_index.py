@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+from PIL import Image
+
+from app.smart_dedup import FINGERPRINT_VERSION, SmartDedupStore, fingerprint
+from app.sqlite_utils import connect
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp", ".tiff"}
+
+# Top-level folders that are not primary downloads (Organized/ holds copies of them,
+# Quarantine/ the near-duplicates moved aside by `near-dups --quarantine`).
+NON_LIBRARY_DIRS = {"Organized", "Quarantine", "meta", "logs", "reports"}
+
+_COMMIT_EVERY = 500
+
+
+@dataclass
+class IndexStats:
+    scanned: int = 0
+    unchanged: int = 0
+    hashed: int = 0
+    errors: int = 0
+    removed: int = 0
+    loaded: int = 0
+    elapsed_s: float = 0.0
+
+
+def iter_library_images(root: Path) -> Iterator[Path]:
+    """Primary image files under `<date>/<provider>/`, skipping Organized copies and metadata."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        if Path(dirpath) == root:
+            dirnames[:] = [d for d in dirnames if d not in NON_LIBRARY_DIRS and not d.startswith(".")]
+        for name in filenames:
+            if not name.startswith(".") and Path(name).suffix.lower() in IMAGE_SUFFIXES:
+                yield Path(dirpath) / name
+
+
+def _hash_file(job: tuple[str, int, int]) -> tuple[str, int, int, str | None, int, str | None]:
+    """Worker: (path, mtime_ns, size) -> (path, mtime_ns, size, phash, area, error)."""
+    path, mtime_ns, size = job
+    try:
+        with Image.open(path) as img:
+            ph, area = fingerprint(img)
+        return path, mtime_ns, size, ph, area, None
+    except Exception as exc:  # noqa: BLE001
+        return path, mtime_ns, size, None, 0, f"{type(exc).__name__}: {exc}"
+
+
+class LibraryIndex:
+    """path + mtime -> perceptual hash of every library file (meta/dedup_index.sqlite).
+
+    Files whose mtime and size are unchanged are not decoded again, so re-running the
+    backfill is incremental, and an interrupted run resumes where it stopped. Hashes
+    from another `FINGERPRINT_VERSION` are dropped on open (their paths are kept in
+    `outdated_paths`) so every file is hashed again the current way.
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = db_path
+        self.conn = connect(self.db_path)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS library_index (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                phash TEXT,
+                area INTEGER NOT NULL DEFAULT 0,
+                error TEXT
+            )
+            """
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS library_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.conn.commit()
+        self.outdated_paths: list[str] = []
+        row = self.conn.execute("SELECT value FROM library_meta WHERE key = 'fingerprint_version'").fetchone()
+        if row is None or int(row[0]) != FINGERPRINT_VERSION:
+            with self.conn:
+                self.outdated_paths = [p for (p,) in self.conn.execute("SELECT path FROM library_index")]
+                self.conn.execute("DELETE FROM library_index")
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO library_meta (key, value) VALUES ('fingerprint_version', ?)",
+                    (str(FINGERPRINT_VERSION),),
+                )
+
+    def known(self) -> dict[str, tuple[int, int]]:
+        rows = self.conn.execute("SELECT path, mtime_ns, size FROM library_index").fetchall()
+        return {path: (int(mtime_ns), int(size)) for path, mtime_ns, size in rows}
+
+    def put(self, path: str, mtime_ns: int, size: int, phash: str | None, area: int, error: str | None) -> None:
+        self.conn.execute(
+            """
+            INSERT INTO library_index (path, mtime_ns, size, phash, area, error) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(path) DO UPDATE SET
+                mtime_ns = excluded.mtime_ns, size = excluded.size, phash = excluded.phash,
+                area = excluded.area, error = excluded.error
+            """,
+            (path, mtime_ns, size, phash, area, error),
+        )
+
+    def remove(self, paths: list[str]) -> None:
+        self.conn.executemany("DELETE FROM library_index WHERE path = ?", [(p,) for p in paths])
+
+    def entries(self) -> list[tuple[str, str, int]]:
+        """(phash, path, area) rows, ready for `SmartDedupStore.bulk_load`."""
+        rows = self.conn.execute("SELECT phash, path, area FROM library_index WHERE phash IS NOT NULL").fetchall()
+        return [(ph, path, int(area)) for ph, path, area in rows]
+
+    def commit(self) -> None:
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
+
+
+def build_index(root: Path, *, workers: int | None = None, progress=None) -> IndexStats:
+    """Hash new/changed library files in a process pool and load them into smart dedup."""
+    started = time.monotonic()
+    stats = IndexStats()
+    index = LibraryIndex(root / "meta" / "dedup_index.sqlite")
+    try:
+        known = index.known()
+        jobs: list[tuple[str, int, int]] = []
+        seen: set[str] = set()
+        for path in iter_library_images(root):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            key = str(path)
+            seen.add(key)
+            stats.scanned += 1
+            if known.get(key) == (st.st_mtime_ns, st.st_size):
+                stats.unchanged += 1
+            else:
+                jobs.append((key, st.st_mtime_ns, st.st_size))
+
+        gone = [path for path in known if path not in seen]
+        index.remove(gone)
+        stats.removed = len(gone)
+        # Entries of files hashed again (changed, or hashed by an older fingerprint version, possibly
+        # by the downloader) are forgotten first, then reloaded with their current hashes.
+        forget = gone + index.outdated_paths + [key for key, _, _ in jobs]
+
+        if jobs:
+            workers = max(1, workers or os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                # Large chunks keep the per-file IPC cost small next to the decode.
+                chunksize = max(1, min(256, len(jobs) // (workers * 4)))
+                for done, row in enumerate(pool.map(_hash_file, jobs, chunksize=chunksize), start=1):
+                    index.put(*row)
+                    if row[3] is None:
+                        stats.errors += 1
+                    else:
+                        stats.hashed += 1
+                    if done % _COMMIT_EVERY == 0:
+                        index.commit()
+                        if progress is not None:
+                            progress(done, len(jobs))
+        index.commit()
+
+        store = SmartDedupStore(str(root / "meta" / "smart_dedup.pkl"))
+        stats.loaded = store.bulk_load(index.entries(), forget_paths=forget)
+    finally:
+        index.close()
+    stats.elapsed_s = time.monotonic() - started
+    return stats
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import json
+import time
+from collections import Counter
+from pathlib import Path
+
+from app.models import Candidate
+from app.sqlite_utils import connect
+
+# Per-provider TTLs. Wikimedia search results and Instagram og:image links change slowly.
+DEFAULT_TTLS_SECONDS = {"wikimedia": 12 * 3600, "instagram_seed": 24 * 3600}
+
+
+class DiscoveryCache:
+    """Candidate lists per (provider, query, page), reused while younger than the provider's TTL.
+
+    Only successful lookups are stored, so a failing query is retried on the next run.
+    Providers without a TTL are never cached.
+    """
+
+    def __init__(
+        self, db_path: Path, *, ttls_seconds: dict[str, float] | None = None, wal: bool = True
+    ) -> None:
+        self.db_path = db_path
+        self.ttls_seconds = dict(DEFAULT_TTLS_SECONDS if ttls_seconds is None else ttls_seconds)
+        self.hits: Counter[str] = Counter()
+        self.misses: Counter[str] = Counter()
+        self.conn = connect(self.db_path, wal=wal)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS discovery_cache (
+                provider TEXT NOT NULL,
+                query TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                candidates TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (provider, query, page)
+            )
+            """
+        )
+        self.conn.commit()
+
+    def get(self, provider: str, query: str, page: int = 0, now: float | None = None) -> list[Candidate] | None:
+        ttl = self.ttls_seconds.get(provider)
+        if not ttl:
+            return None
+        now = time.time() if now is None else now
+        row = self.conn.execute(
+            "SELECT candidates FROM discovery_cache WHERE provider = ? AND query = ? AND page = ? AND fetched_at > ?",
+            (provider, query, int(page), now - ttl),
+        ).fetchone()
+        if row is None:
+            self.misses[provider] += 1
+            return None
+        self.hits[provider] += 1
+        return [Candidate(**item) for item in json.loads(row[0])]
+
+    def put(self, provider: str, query: str, page: int, candidates: list[Candidate], now: float | None = None) -> None:
+        if not self.ttls_seconds.get(provider):
+            return
+        payload = json.dumps(
+            [{"url": c.url, "provider": c.provider, "query": c.query, "source_url": c.source_url} for c in candidates],
+            ensure_ascii=False,
+        )
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO discovery_cache (provider, query, page, candidates, fetched_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(provider, query, page) DO UPDATE SET
+                    candidates = excluded.candidates, fetched_at = excluded.fetched_at
+                """,
+                (provider, query, int(page), payload, time.time() if now is None else now),
+            )
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {
+            provider: {"hit": self.hits[provider], "miss": self.misses[provider]}
+            for provider in sorted(set(self.hits) | set(self.misses))
+        }
+
+    def close(self) -> None:
+        self.conn.close()
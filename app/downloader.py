@@ -4,21 +4,43 @@ import asyncio
 import hashlib
 # imghdr removed (deprecated in Python 3.13)
 import random
+import time
 from collections import Counter
+from dataclasses import dataclass
 from io import BytesIO
 from pathlib import Path
-from typing import Iterable
+from typing import Any, Iterable
 from urllib.parse import urlparse
 
 import httpx
 from PIL import Image
 
-from app.http_utils import request_with_retry
+from app.concurrency import AIMDController
+from app.file_writer import FileWriter, merge_writer_stats
+from app.http_utils import CircuitOpenError, request_with_retry
 from app.models import Candidate
+from app.smart_dedup import fingerprint
 from app.time_utils import kst_timestamp_str
+from app.tracing import tracer
 
 
-def _guess_extension(url: str, content_type: str | None, data: bytes, img_format: str | None = None) -> str:
+# Responses that mean "slow down" for the adaptive concurrency controller.
+_THROTTLE_STATUSES = {403, 429}
+# Besides 5xx, statuses that say the host itself is struggling, not that one URL is dead.
+_HOST_FAULT_STATUSES = {408}
+
+# Starting guess for one candidate's wall time (politeness delay + fetch), refined by EWMA.
+_INITIAL_ITEM_SECONDS = 3.0
+
+# Streaming chunk size; peak body memory per worker is bounded by this, not by image size.
+_CHUNK_BYTES = 256 * 1024
+
+
+class _BodyTooLarge(Exception):
+    """The response body grew past the per-download cap while streaming."""
+
+
+def _guess_extension(url: str, content_type: str | None, data: bytes | Path, img_format: str | None = None) -> str:
     parsed = urlparse(url)
     name = Path(parsed.path).name.lower()
     if "." in name:
@@ -45,7 +67,7 @@ def _guess_extension(url: str, content_type: str | None, data: bytes, img_format
     fmt = (img_format or "").strip().lower()
     if not fmt:
         try:
-            with Image.open(BytesIO(data)) as im:
+            with Image.open(BytesIO(data) if isinstance(data, bytes) else data) as im:
                 fmt = (im.format or "").strip().lower()
         except Exception:
             fmt = ""
@@ -57,6 +79,18 @@ def _guess_extension(url: str, content_type: str | None, data: bytes, img_format
     return ".img"
 
 
+def _content_length(resp: httpx.Response) -> int | None:
+    try:
+        value = int(resp.headers.get("content-length", ""))
+    except ValueError:
+        return None
+    return value if value >= 0 else None
+
+
+def _is_host_fault(status: int | None) -> bool:
+    return status is not None and (status >= 500 or status in _HOST_FAULT_STATUSES)
+
+
 def is_quality_ok(width: int, height: int, *, min_short_side_px: int) -> bool:
     """Quality gate.
 
@@ -67,7 +101,130 @@ def is_quality_ok(width: int, height: int, *, min_short_side_px: int) -> bool:
     return min(width, height) >= int(min_short_side_px)
 
 
+class ByteBudget:
+    """Global cap on the bytes of responses being downloaded at once, across all workers.
+
+    Each response reserves its Content-Length (the per-download cap when unknown) until its
+    body is on disk, so a burst of very large originals is fetched a few at a time instead of
+    all workers pulling 30 MB bodies together. A response larger than the whole budget
+    still runs, alone.
+    """
+
+    def __init__(self, limit_bytes: int) -> None:
+        self.limit_bytes = max(_CHUNK_BYTES, int(limit_bytes))
+        self.in_use = 0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self, n: int) -> int:
+        n = min(int(n), self.limit_bytes)
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_use + n <= self.limit_bytes)
+            self.in_use += n
+        return n
+
+    async def release(self, n: int) -> None:
+        async with self._cond:
+            self.in_use -= n
+            self._cond.notify_all()
+
+
+@dataclass
+class _Fetched:
+    """A body saved to its temp file, travelling from the fetch stage to processing and persisting."""
+
+    cand: Candidate
+    time_kst: str
+    tmp_path: Path
+    save_dir: Path
+    content_type: str
+    sha256_hex: str
+    size_bytes: int
+    # Filled in by the process stage.
+    width: int = 0
+    height: int = 0
+    img_format: str = ""
+    fingerprint: tuple[str, int] | None = None
+    smart_error: str | None = None
+
+
+@dataclass
+class _Outcome:
+    """A candidate that ended before persisting; `detail=None` means nothing to log.
+
+    `remote=False` marks a failure on our side (e.g. writing the temp file), which says
+    nothing about the URL or its host. `host_fault=True` marks a transport error, timeout
+    or 5xx: the host, not just this URL, failed.
+    """
+
+    cand: Candidate
+    time_kst: str
+    reason: str
+    detail: str | None
+    remote: bool = True
+    host_fault: bool = False
+
+
+@dataclass
+class StageStats:
+    """Per-stage counters: how busy its workers were and how often its input queue was full."""
+
+    workers: int = 0
+    items: int = 0
+    busy_s: float = 0.0
+    queue_max: int = 0
+    put_wait_s: float = 0.0  # time upstream producers waited for room in this stage's queue
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "items": self.items,
+            "busy_s": round(self.busy_s, 3),
+            "queue_max": self.queue_max,
+            "put_wait_s": round(self.put_wait_s, 3),
+        }
+
+
+def merge_pipeline_stats(a: dict[str, Any], b: dict[str, Any]) -> dict[str, Any]:
+    """Combine the stats of two `process_candidates` calls (batches or worker processes)."""
+    if not a:
+        return {k: (dict(v) if isinstance(v, dict) else v) for k, v in b.items()}
+    if not b:
+        return a
+    out: dict[str, Any] = {"wall_s": round(a["wall_s"] + b["wall_s"], 3)}
+    for stage in PIPELINE_STAGES:
+        x, y = a[stage], b[stage]
+        out[stage] = {
+            "workers": max(x["workers"], y["workers"]),
+            "items": x["items"] + y["items"],
+            "busy_s": round(x["busy_s"] + y["busy_s"], 3),
+            "queue_max": max(x["queue_max"], y["queue_max"]),
+            "put_wait_s": round(x["put_wait_s"] + y["put_wait_s"], 3),
+        }
+    out["writer"] = merge_writer_stats(a.get("writer") or {}, b.get("writer") or {})
+    return out
+
+
+PIPELINE_STAGES = ("fetch", "process", "persist")
+
+
 class ImageDownloader:
+    """Downloads candidates through a staged pipeline.
+
+    - fetch (N workers, gated by the adaptive concurrency controller): request and
+      stream the body to a temp file, hashing it on the way.
+    - process (M workers): parse the header, apply the quality gate and compute the
+      perceptual fingerprint in threads, off the event loop.
+    - persist (one worker): the only writer of the dedup SQLite/pickle, the frontier,
+      yield stats, negative cache and JSONL logs; renames the file into place.
+
+    Image files themselves (temp bodies, renames, Organized copies) are written by a
+    `FileWriter` thread, atomically and with batched fsyncs.
+
+    Stages are connected by bounded queues, so a slow disk or decoder applies
+    backpressure instead of piling up temp files, and fetchers keep fetching while
+    another stage works. `pipeline_stats` holds the last call's per-stage counters.
+    """
+
     def __init__(
         self,
         root: Path,
@@ -77,51 +234,227 @@ class ImageDownloader:
         *,
         min_short_side_px: int = 720,
         smart_dedup=None,
+        inflight_byte_budget: int = 96 * 1024 * 1024,
+        max_image_bytes: int = 48 * 1024 * 1024,
+        concurrency: AIMDController | None = None,
+        yield_stats=None,
+        negative_cache=None,
+        guard=None,
+        thumbnails=None,
+        process_workers: int = 2,
+        stage_queue_size: int = 16,
+        durable_writes: bool = True,
+        write_batch_size: int = 32,
+        catalog=None,
     ) -> None:
         self.root = root
         self.dedup_store = dedup_store
         self.smart_dedup = smart_dedup
-        self._smart_lock = asyncio.Lock() if smart_dedup is not None else None
         self.items_logger = items_logger
         self.failed_logger = failed_logger
         self.min_short_side_px = int(min_short_side_px)
+        self.byte_budget = ByteBudget(inflight_byte_budget)
+        self.max_image_bytes = int(max_image_bytes)
+        self.concurrency = concurrency
+        self.yield_stats = yield_stats
+        self.negative_cache = negative_cache
+        self.guard = guard
+        self.thumbnails = thumbnails
+        self.catalog = catalog
+        self.process_workers = max(1, int(process_workers))
+        self.stage_queue_size = max(1, int(stage_queue_size))
+        self.pipeline_stats: dict[str, Any] = {}
+        self.writer = FileWriter(fsync=durable_writes, batch_size=write_batch_size)
 
     async def process_candidates(
         self,
         client: httpx.AsyncClient,
         candidates: Iterable[Candidate],
         workers: int,
+        *,
+        frontier=None,
+        deadline: float | None = None,
+        drain_seconds: float = 30.0,
     ) -> tuple[Counter, dict[str, int]]:
-        queue: asyncio.Queue[Candidate] = asyncio.Queue()
-        for c in candidates:
-            queue.put_nowait(c)
+        """Download candidates with `workers` fetchers feeding the process/persist stages.
+
+        `deadline` is a `time.monotonic()` value: fetchers stop taking new candidates once
+        the expected time of one more fetch would cross it, and items already in the
+        pipeline get `drain_seconds` beyond it before being cancelled. Everything not
+        finished is counted as DEADLINE_DEFERRED (and stays pending in the frontier for `--resume`).
+        """
+        # Highest expected yield first; the sequence number keeps provider order among equal scores.
+        queue: asyncio.PriorityQueue[tuple[float, int, Candidate]] = asyncio.PriorityQueue()
+        for seq, c in enumerate(candidates):
+            score = self.yield_stats.score(c) if self.yield_stats is not None else 0.0
+            queue.put_nowait((-score, seq, c))
 
         counts: Counter = Counter()
         provider_ok: dict[str, int] = {}
-        lock = asyncio.Lock()
-
-        async def worker() -> None:
+        controller = self.concurrency
+        if controller is not None:
+            # Spawn enough fetchers for the upper bound; the controller gates how many run at once.
+            workers = controller.max_limit
+        workers = max(1, workers)
+        process_q: asyncio.Queue[_Fetched | None] = asyncio.Queue(maxsize=self.stage_queue_size)
+        persist_q: asyncio.Queue[Any] = asyncio.Queue(maxsize=self.stage_queue_size)
+        stats = {
+            "fetch": StageStats(workers=workers),
+            "process": StageStats(workers=self.process_workers),
+            "persist": StageStats(workers=1),
+        }
+        stats["fetch"].queue_max = queue.qsize()
+        self.writer.start()
+        item_seconds = _INITIAL_ITEM_SECONDS
+        in_flight = 0  # taken by a fetcher, not yet recorded by the persister
+        started_at = time.monotonic()
+
+        async def put(q: asyncio.Queue, item: Any, stage: str) -> None:
+            st = stats[stage]
+            if q.full():
+                waited = time.monotonic()
+                await q.put(item)
+                st.put_wait_s += time.monotonic() - waited
+            else:
+                q.put_nowait(item)
+            st.queue_max = max(st.queue_max, q.qsize())
+
+        async def fetcher() -> None:
+            nonlocal item_seconds, in_flight
             while True:
+                if controller is not None:
+                    await controller.acquire()
                 try:
-                    cand = queue.get_nowait()
-                except asyncio.QueueEmpty:
+                    if deadline is not None and time.monotonic() + item_seconds > deadline:
+                        return
+                    try:
+                        _, _, cand = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    in_flight += 1
+                    await put(persist_q, ("lease", cand), "persist")
+                    started = time.monotonic()
+                    with tracer().span("fetch", "download", url=cand.url, provider=cand.provider):
+                        result = await self._fetch(client, cand)
+                    elapsed = time.monotonic() - started
+                    item_seconds = 0.8 * item_seconds + 0.2 * elapsed
+                    stats["fetch"].items += 1
+                    stats["fetch"].busy_s += elapsed
+                finally:
+                    if controller is not None:
+                        await controller.release()
+                try:
+                    if isinstance(result, _Fetched):
+                        await put(process_q, result, "process")
+                    else:
+                        await put(persist_q, result, "persist")
+                except asyncio.CancelledError:
+                    _discard(result)
+                    raise
+
+        async def processor() -> None:
+            while True:
+                item = await process_q.get()
+                if item is None:
                     return
-
-                reason = await self._download_one(client, cand)
-                async with lock:
-                    counts[reason] += 1
-                    if reason == "OK":
-                        provider_ok[cand.provider] = provider_ok.get(cand.provider, 0) + 1
-                queue.task_done()
-
-        tasks = [asyncio.create_task(worker()) for _ in range(max(1, workers))]
-        await asyncio.gather(*tasks)
+                try:
+                    started = time.monotonic()
+                    with tracer().span("process", "download", url=item.cand.url):
+                        result = await self._process(item)
+                    stats["process"].items += 1
+                    stats["process"].busy_s += time.monotonic() - started
+                    await put(persist_q, result, "persist")
+                except asyncio.CancelledError:
+                    _discard(item)
+                    raise
+
+        def record(cand: Candidate, reason: str, *, remote: bool = True, host_fault: bool = False) -> None:
+            nonlocal in_flight
+            in_flight -= 1
+            if frontier is not None:
+                frontier.complete(cand.url, reason)
+            if self.yield_stats is not None:
+                self.yield_stats.record(cand, reason)
+            if self.negative_cache is not None:
+                self.negative_cache.record(cand, reason, remote=remote, host_fault=host_fault)
+            counts[reason] += 1
+            if reason == "OK":
+                provider_ok[cand.provider] = provider_ok.get(cand.provider, 0) + 1
+
+        async def persister() -> None:
+            while True:
+                msg = await persist_q.get()
+                if msg is None:
+                    return
+                started = time.monotonic()
+                if isinstance(msg, tuple):  # ("lease", cand)
+                    if frontier is not None:
+                        frontier.lease(msg[1].url)
+                    stats["persist"].busy_s += time.monotonic() - started
+                    continue
+                if isinstance(msg, _Outcome):
+                    if msg.detail is not None:
+                        self._fail(msg.cand, msg.time_kst, msg.reason, msg.detail)
+                    reason, remote, host_fault = msg.reason, msg.remote, msg.host_fault
+                else:
+                    with tracer().span("persist", "download", url=msg.cand.url) as span:
+                        reason = span["reason"] = await self._persist(msg)
+                    remote, host_fault = True, False
+                record(msg.cand, reason, remote=remote, host_fault=host_fault)
+                stats["persist"].items += 1
+                stats["persist"].busy_s += time.monotonic() - started
+
+        fetchers = [asyncio.create_task(fetcher(), name=f"fetch-{i}") for i in range(workers)]
+        processors = [asyncio.create_task(processor(), name=f"process-{i}") for i in range(self.process_workers)]
+        persist_task = asyncio.create_task(persister(), name="persist")
+        stage_tasks = [*fetchers, *processors, persist_task]
+
+        async def drain() -> None:
+            # Shut the stages down in order once each upstream stage is done.
+            await asyncio.gather(*fetchers)
+            for _ in processors:
+                await process_q.put(None)
+            await asyncio.gather(*processors)
+            await persist_q.put(None)
+            await persist_task
+
+        closer = asyncio.create_task(drain(), name="pipeline-drain")
+        timeout = None if deadline is None else max(0.0, deadline + drain_seconds - time.monotonic())
+        try:
+            # Returns early if a stage crashes, so the others never wait on it forever.
+            await asyncio.wait([closer, *stage_tasks], timeout=timeout, return_when=asyncio.FIRST_EXCEPTION)
+        finally:
+            leftovers = [t for t in (closer, *stage_tasks) if not t.done()]
+            for task in leftovers:
+                task.cancel()
+            await asyncio.gather(*leftovers, return_exceptions=True)
+            # Items cancelled between stages: drop their temp files.
+            for q in (process_q, persist_q):
+                while not q.empty():
+                    _discard(q.get_nowait())
+            # Let queued writes (and aborts of cancelled temp files) finish before reporting.
+            await asyncio.to_thread(self.writer.stop)
+            self.pipeline_stats = {"wall_s": round(time.monotonic() - started_at, 3)}
+            self.pipeline_stats.update({stage: st.as_dict() for stage, st in stats.items()})
+            self.pipeline_stats["writer"] = self.writer.take_stats()
+
+        for task in stage_tasks:
+            if task.done() and not task.cancelled() and task.exception() is not None:
+                raise task.exception()  # type: ignore[misc]
+        # Cancelled in-flight items keep their frontier lease and are reclaimed on resume.
+        deferred = queue.qsize() + in_flight
+        if deferred:
+            counts["DEADLINE_DEFERRED"] += deferred
         return counts, provider_ok
 
-    async def _download_one(self, client: httpx.AsyncClient, cand: Candidate) -> str:
+    async def _fetch(self, client: httpx.AsyncClient, cand: Candidate) -> _Fetched | _Outcome:
+        """Fetch stage: request the candidate and stream an image body to a temp file."""
         time_kst = kst_timestamp_str()
-        try:
+        trace = tracer()
+        with trace.span("polite_delay", "download"):
             await asyncio.sleep(random.uniform(0.8, 1.6))
+        fetch_started = time.monotonic()
+        try:
             resp = await request_with_retry(
                 client,
                 "GET",
@@ -129,160 +462,268 @@ class ImageDownloader:
                 retries=3,
                 polite_delay=False,
                 follow_redirects=True,
+                stream=True,
+                guard=self.guard,
             )
-            resp.raise_for_status()
-        except Exception as exc:  # noqa: BLE001
-            self.failed_logger.append(
-                {
-                    "time_kst": time_kst,
-                    "provider": cand.provider,
-                    "url": cand.url,
-                    "source_url": cand.source_url,
-                    "reason": "DOWNLOAD_FAIL",
-                    "detail": f"{type(exc).__name__}: {exc}",
-                }
-            )
-            return "DOWNLOAD_FAIL"
-
-        content_type = (resp.headers.get("content-type") or "").split(";")[0].strip().lower()
-        if not content_type.startswith("image/"):
-            self.failed_logger.append(
-                {
-                    "time_kst": time_kst,
-                    "provider": cand.provider,
-                    "url": cand.url,
-                    "source_url": cand.source_url,
-                    "reason": "NOT_IMAGE",
-                    "detail": f"content_type={content_type or 'unknown'}",
-                }
-            )
-            return "NOT_IMAGE"
-
-        data = resp.content
-
-        try:
-            with Image.open(BytesIO(data)) as img:
-                width, height = img.size
-                img_format = (img.format or "")
+        except CircuitOpenError as exc:
+            # Host short-circuited: nothing was sent, so this says nothing about the URL itself.
+            return _Outcome(cand, time_kst, "CIRCUIT_OPEN_SKIP", str(exc))
         except Exception as exc:  # noqa: BLE001
-            self.failed_logger.append(
-                {
-                    "time_kst": time_kst,
-                    "provider": cand.provider,
-                    "url": cand.url,
-                    "source_url": cand.source_url,
-                    "reason": "IMAGE_DECODE_FAIL",
-                    "detail": f"{type(exc).__name__}: {exc}",
-                }
+            status = exc.response.status_code if isinstance(exc, httpx.HTTPStatusError) else None
+            await self._observe_fetch(fetch_started, 0, throttled=status in _THROTTLE_STATUSES)
+            return _Outcome(
+                cand,
+                time_kst,
+                "DOWNLOAD_FAIL",
+                f"{type(exc).__name__}: {exc}",
+                host_fault=isinstance(exc, httpx.TransportError) or _is_host_fault(status),
             )
-            return "IMAGE_DECODE_FAIL"
-
-        if not is_quality_ok(width, height, min_short_side_px=self.min_short_side_px):
-            self.failed_logger.append(
-                {
-                    "time_kst": time_kst,
-                    "provider": cand.provider,
-                    "url": cand.url,
-                    "source_url": cand.source_url,
-                    "reason": "RESOLUTION_TOO_SMALL",
-                    "detail": f"{width}x{height} (min_short_side_px={self.min_short_side_px})",
-                }
-            )
-            return "RESOLUTION_TOO_SMALL"
-
-        sha256_hex = hashlib.sha256(data).hexdigest()
-        if self.dedup_store.has(sha256_hex):
-            self.failed_logger.append(
-                {
-                    "time_kst": time_kst,
-                    "provider": cand.provider,
-                    "url": cand.url,
-                    "source_url": cand.source_url,
-                    "reason": "DUPLICATE",
-                    "detail": sha256_hex,
-                }
-            )
-            return "DUPLICATE"
 
         date_str = time_kst[:10]
         save_dir = self.root / date_str / cand.provider
-        save_dir.mkdir(parents=True, exist_ok=True)
-
-        ext = _guess_extension(cand.url, content_type, data, img_format=img_format)
-        filename = f"{sha256_hex[:20]}{ext}"
-        save_path = save_dir / filename
-
-        # Smart (perceptual) dedup: catches re-encodes/resizes of the same underlying image.
-        # If an "upgrade" is found, we keep the better one and optionally remove the old file.
-        smart_action = None
-        old_path = None
-        if self.smart_dedup is not None:
+        tmp_path: Path | None = None
+        try:
             try:
-                async with self._smart_lock:  # type: ignore[arg-type]
-                    smart_action, old_path = self.smart_dedup.check_and_update(img, str(save_path))
+                resp.raise_for_status()
             except Exception as exc:  # noqa: BLE001
-                # Do not fail the run due to dedup errors.
-                self.failed_logger.append(
-                    {
-                        "time_kst": time_kst,
-                        "provider": cand.provider,
-                        "url": cand.url,
-                        "source_url": cand.source_url,
-                        "reason": "SMART_DEDUP_ERROR",
-                        "detail": f"{type(exc).__name__}: {exc}",
-                    }
-                )
-                smart_action = None
-
-            if smart_action == "DUPLICATE":
-                self.failed_logger.append(
-                    {
-                        "time_kst": time_kst,
-                        "provider": cand.provider,
-                        "url": cand.url,
-                        "source_url": cand.source_url,
-                        "reason": "DUPLICATE_SMART",
-                        "detail": old_path or "",
-                    }
+                await self._observe_fetch(fetch_started, 0, throttled=resp.status_code in _THROTTLE_STATUSES)
+                return _Outcome(
+                    cand,
+                    time_kst,
+                    "DOWNLOAD_FAIL",
+                    f"{type(exc).__name__}: {exc}",
+                    host_fault=_is_host_fault(resp.status_code),
                 )
-                return "DUPLICATE"
 
-        save_path.write_bytes(data)
-        self.dedup_store.add(sha256_hex, time_kst)
+            # Content-Type is known from the headers, so non-images are rejected before reading the body.
+            content_type = (resp.headers.get("content-type") or "").split(";")[0].strip().lower()
+            if not content_type.startswith("image/"):
+                await self._observe_fetch(fetch_started, 0)
+                return _Outcome(cand, time_kst, "NOT_IMAGE", f"content_type={content_type or 'unknown'}")
+
+            declared = _content_length(resp)
+            if declared is not None and declared > self.max_image_bytes:
+                await self._observe_fetch(fetch_started, 0)
+                return _Outcome(
+                    cand, time_kst, "DOWNLOAD_FAIL", f"content_length={declared} > max_image_bytes={self.max_image_bytes}"
+                )
 
-        # If smart dedup decided this is an upgrade, best-effort remove the older inferior file.
-        if smart_action == "UPGRADE" and old_path:
+            reserved = await self.byte_budget.acquire(declared if declared is not None else self.max_image_bytes)
             try:
-                Path(old_path).unlink(missing_ok=True)
-            except Exception:
-                pass
-
-        # Organized copies (classification shared with reorganize.py)
-        from app.organize import classify
+                # Body is streamed into a temp file next to its final location so acceptance is an atomic rename.
+                tmp_path = await self.writer.open_temp(save_dir)
+                with trace.span("transfer", "download") as span:
+                    sha256_hex, size_bytes = await self._stream_to_file(resp, tmp_path)
+                    span["bytes"] = size_bytes
+            except BaseException as exc:
+                if tmp_path is not None:
+                    self.writer.abort(tmp_path)
+                if not isinstance(exc, Exception):
+                    raise
+                await self._observe_fetch(fetch_started, 0)
+                # Network errors and oversized bodies are the URL's; OSErrors from the temp file are ours.
+                return _Outcome(
+                    cand,
+                    time_kst,
+                    "DOWNLOAD_FAIL",
+                    f"{type(exc).__name__}: {exc}",
+                    remote=isinstance(exc, (httpx.HTTPError, _BodyTooLarge)),
+                    host_fault=isinstance(exc, httpx.TransportError),
+                )
+            finally:
+                await self.byte_budget.release(reserved)
+        finally:
+            await resp.aclose()
+        await self._observe_fetch(fetch_started, size_bytes)
+        return _Fetched(cand, time_kst, tmp_path, save_dir, content_type, sha256_hex, size_bytes)
+
+    async def _observe_fetch(self, started: float, nbytes: int, *, throttled: bool = False) -> None:
+        if self.concurrency is not None:
+            await self.concurrency.record(latency_s=time.monotonic() - started, nbytes=nbytes, throttled=throttled)
+
+    async def _stream_to_file(self, resp: httpx.Response, tmp_path: Path) -> tuple[str, int]:
+        """Write the response body to `tmp_path` chunk by chunk (by the writer thread), hashing as we go.
+
+        Raises `_BodyTooLarge` once the body passes `max_image_bytes`, whatever Content-Length said.
+        """
+        trace = tracer()
+        hasher = hashlib.sha256()
+        size_bytes = 0
+        async for chunk in resp.aiter_bytes(_CHUNK_BYTES):
+            size_bytes += len(chunk)
+            if size_bytes > self.max_image_bytes:
+                raise _BodyTooLarge(f"body passed max_image_bytes={self.max_image_bytes}")
+            with trace.span("sha256", "cpu"):
+                hasher.update(chunk)
+            with trace.span("disk_write", "io"):
+                await self.writer.append(tmp_path, chunk)
+        with trace.span("fsync", "io"):
+            await self.writer.close_temp(tmp_path)
+        return hasher.hexdigest(), size_bytes
+
+    async def _process(self, item: _Fetched) -> _Fetched | _Outcome:
+        """Process stage: header, quality gate and fingerprint, decoded in a worker thread."""
+        try:
+            return await asyncio.to_thread(self._inspect, item)
+        except Exception as exc:  # noqa: BLE001
+            _discard(item)
+            return _Outcome(item.cand, item.time_kst, "IMAGE_DECODE_FAIL", f"{type(exc).__name__}: {exc}")
+
+    def _inspect(self, item: _Fetched) -> _Fetched | _Outcome:
+        trace = tracer()
+        # Lazy open: only the header is parsed; pixels are decoded (at draft size) for the fingerprint.
+        with trace.span("decode_header", "cpu"):
+            img = Image.open(item.tmp_path)
+        with img:
+            item.width, item.height = img.size
+            item.img_format = img.format or ""
+            if not is_quality_ok(item.width, item.height, min_short_side_px=self.min_short_side_px):
+                _discard(item)
+                return _Outcome(
+                    item.cand,
+                    item.time_kst,
+                    "RESOLUTION_TOO_SMALL",
+                    f"{item.width}x{item.height} (min_short_side_px={self.min_short_side_px})",
+                )
+            if self.smart_dedup is not None:
+                try:
+                    with trace.span("fingerprint", "cpu"):
+                        item.fingerprint = fingerprint(img)
+                except Exception as exc:  # noqa: BLE001
+                    # Do not fail the download due to dedup errors.
+                    item.smart_error = f"{type(exc).__name__}: {exc}"
+        return item
+
+    async def _persist(self, item: _Fetched) -> str:
+        """Persist stage: dedup indexes, rename into place, Organized copies and logs."""
+        try:
+            return await self._accept_file(item)
+        finally:
+            # No-op once the file has been renamed into place.
+            item.tmp_path.unlink(missing_ok=True)
+
+    async def _accept_file(self, item: _Fetched) -> str:
+        trace = tracer()
+        cand, time_kst, sha256_hex = item.cand, item.time_kst, item.sha256_hex
+
+        # Insert-if-absent: two workers (or processes) that fetched the same bytes never both save them.
+        with trace.span("dedup_claim", "io"):
+            claimed = self.dedup_store.claim(sha256_hex, time_kst)
+        if not claimed:
+            return self._fail(cand, time_kst, "DUPLICATE", sha256_hex)
+        saved = False
+        try:
+            ext = _guess_extension(cand.url, item.content_type, item.tmp_path, img_format=item.img_format)
+            filename = f"{sha256_hex[:20]}{ext}"
+            save_path = item.save_dir / filename
+
+            # Smart (perceptual) dedup: catches re-encodes/resizes of the same underlying image.
+            # If an "upgrade" is found, we keep the better one and optionally remove the old file.
+            # A read-only check skips writing known duplicates; the index itself is only updated
+            # once the file is in place, so it never points at a file whose rename failed.
+            # Both run off the loop: the shared (redis) index makes network round-trips under a lock.
+            smart_action = None
+            old_path = None
+            smart_update = False
+            if item.smart_error is not None:
+                self._fail(cand, time_kst, "SMART_DEDUP_ERROR", item.smart_error)
+            elif self.smart_dedup is not None and item.fingerprint is not None:
+                try:
+                    with trace.span("smart_dedup_check", "cpu"):
+                        smart_action, old_path = await asyncio.to_thread(
+                            self.smart_dedup.check_fingerprint, *item.fingerprint
+                        )
+                except Exception as exc:  # noqa: BLE001
+                    # Do not fail the run due to dedup errors.
+                    self._fail(cand, time_kst, "SMART_DEDUP_ERROR", f"{type(exc).__name__}: {exc}")
+                    smart_action = None
+                else:
+                    smart_update = smart_action != "DUPLICATE"
+
+                if smart_action == "DUPLICATE":
+                    self._fail(cand, time_kst, "DUPLICATE_SMART", old_path or "")
+                    return "DUPLICATE"
+
+            with trace.span("rename", "io"):
+                await self.writer.commit(item.tmp_path, save_path)
+
+            if smart_update:
+                try:
+                    with trace.span("smart_dedup", "cpu") as span:
+                        smart_action, old_path = await asyncio.to_thread(
+                            self.smart_dedup.check_and_update_fingerprint, *item.fingerprint, str(save_path)
+                        )
+                        span["action"] = smart_action
+                except Exception as exc:  # noqa: BLE001
+                    self._fail(cand, time_kst, "SMART_DEDUP_ERROR", f"{type(exc).__name__}: {exc}")
+                    smart_action, old_path = None, None
+                if smart_action == "DUPLICATE":
+                    # Another process indexed a better copy between the check and the rename.
+                    await self.writer.remove(save_path)
+                    self._fail(cand, time_kst, "DUPLICATE_SMART", old_path or "")
+                    return "DUPLICATE"
+            saved = True
+        finally:
+            if not saved:
+                self.dedup_store.release(sha256_hex)
+
+        # Organized copies (classification shared with reorganize.py), written by the writer thread.
+        from app.organize import BUCKETS, classify
+
+        # If smart dedup decided this is an upgrade, best-effort remove the older inferior file
+        # and its Organized copies (they carry the same file name).
+        if smart_action == "UPGRADE" and old_path:
+            old = Path(old_path)
+            stale = [old, *(self.root / bucket / old.name for bucket in BUCKETS)]
+            await asyncio.gather(*(self.writer.remove(path) for path in stale), return_exceptions=True)
+
+        subpaths = classify(item.width, item.height, item.size_bytes)
+        if subpaths:
+            with trace.span("save_copies", "io"):
+                await asyncio.gather(
+                    *(self.writer.copy(save_path, self.root / subpath / filename) for subpath in subpaths)
+                )
 
-        for subpath in classify(width, height, len(data)):
-            self._save_copy(data, filename, subpath)
+        row = {
+            "time_kst": time_kst,
+            "provider": cand.provider,
+            "query": cand.query,
+            "url": cand.url,
+            "source_url": cand.source_url,
+            "saved_path": str(save_path),
+            "width": item.width,
+            "height": item.height,
+            "sha256": sha256_hex,
+            "content_type": item.content_type,
+            "content_length": item.size_bytes,
+            "smart_dedup": smart_action,
+            "smart_dedup_old_path": old_path,
+        }
+        self.items_logger.append(row)
+        if self.catalog is not None:
+            self.catalog.add(row)
+        if self.thumbnails is not None:
+            self.thumbnails.submit(save_path, sha256_hex)
+        return "OK"
 
-        self.items_logger.append(
+    def _fail(self, cand: Candidate, time_kst: str, reason: str, detail: str) -> str:
+        self.failed_logger.append(
             {
                 "time_kst": time_kst,
                 "provider": cand.provider,
-                "query": cand.query,
                 "url": cand.url,
                 "source_url": cand.source_url,
-                "saved_path": str(save_path),
-                "width": width,
-                "height": height,
-                "sha256": sha256_hex,
-                "content_type": content_type,
-                "content_length": len(data),
-                "smart_dedup": smart_action,
-                "smart_dedup_old_path": old_path,
+                "reason": reason,
+                "detail": detail,
             }
         )
-        return "OK"
+        return reason
 
-    def _save_copy(self, data: bytes, filename: str, subpath: str) -> None:
-        target_dir = self.root / subpath
-        target_dir.mkdir(parents=True, exist_ok=True)
-        (target_dir / filename).write_bytes(data)
+
+def _discard(item: Any) -> None:
+    """Remove the temp file of an item dropped between stages."""
+    if isinstance(item, _Fetched):
+        try:
+            item.tmp_path.unlink(missing_ok=True)
+        except OSError:
+            pass
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable
+
+from app.tracing import NULL_TRACER, tracer
+
+
+class FileWriter:
+    """Write-behind file writer: one thread does all image file I/O for a downloader.
+
+    Jobs are queued from the event loop and run in order on the writer thread, so the
+    loop never blocks on mkdir, write or fsync. Every file is written under a temporary
+    `.part` name in its target directory and renamed into place, so a crash never leaves
+    a partial file under a final name (dedup would otherwise treat it as present).
+    Created directories are cached. With `fsync`, a file's contents are flushed to disk
+    before its rename, and the directories renamed into during one batch of queued jobs
+    are fsynced once at the end of the batch; the awaiting caller resumes only after that.
+    """
+
+    def __init__(self, *, fsync: bool = True, batch_size: int = 32) -> None:
+        self.fsync = fsync
+        self.batch_size = max(1, int(batch_size))
+        self._jobs: queue.SimpleQueue[tuple[Callable[..., Any], tuple, Future] | None] = queue.SimpleQueue()
+        self._open: dict[Path, Any] = {}  # temp path -> file object, only touched by the writer thread
+        self._dirs: set[Path] = set()
+        self._thread: threading.Thread | None = None
+        self._tracer = NULL_TRACER
+        self._reset_stats()
+
+    def _reset_stats(self) -> None:
+        self.files = 0
+        self.copies = 0
+        self.bytes = 0
+        self.mkdirs = 0
+        self.fsyncs = 0
+        self.batches = 0
+        self.busy_s = 0.0
+
+    def start(self) -> None:
+        if self._thread is None:
+            # The writer thread does not inherit the run's context, so pass the tracer along.
+            self._tracer = tracer()
+            self._thread = threading.Thread(target=self._run, name="file-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Finish every queued job, then end the thread (blocking; run it off the loop)."""
+        if self._thread is not None:
+            self._jobs.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def take_stats(self) -> dict[str, Any]:
+        """Counters since the last call; MB/s is over the thread's busy time."""
+        out = {
+            "files": self.files,
+            "copies": self.copies,
+            "bytes": self.bytes,
+            "mkdirs": self.mkdirs,
+            "fsyncs": self.fsyncs,
+            "batches": self.batches,
+            "busy_s": round(self.busy_s, 3),
+        }
+        self._reset_stats()
+        return out
+
+    # --- event-loop side ---
+
+    def _submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        self.start()
+        fut: Future = Future()
+        self._jobs.put((fn, args, fut))
+        return fut
+
+    async def _call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.wrap_future(self._submit(fn, *args))
+
+    async def open_temp(self, directory: Path) -> Path:
+        """Create (and keep open) an empty temp file in `directory`; returns its path."""
+        return await self._call(self._open_temp, directory)
+
+    async def append(self, tmp: Path, data: bytes) -> None:
+        await self._call(self._append, tmp, data)
+
+    async def close_temp(self, tmp: Path) -> None:
+        """Flush and close a temp file; with `fsync`, its contents are on disk afterwards."""
+        await self._call(self._close_temp, tmp)
+
+    async def commit(self, tmp: Path, dest: Path) -> None:
+        """Atomically rename a closed temp file to its final name."""
+        await self._call(self._commit, tmp, dest)
+
+    async def copy(self, src: Path, dest: Path) -> None:
+        """Copy `src` to `dest` through a temp file in dest's directory."""
+        await self._call(self._copy, src, dest)
+
+    async def remove(self, path: Path) -> None:
+        await self._call(self._remove, path)
+
+    def abort(self, tmp: Path) -> None:
+        """Close and delete a temp file without waiting (safe from cancellation handlers)."""
+        if self._thread is None:
+            tmp.unlink(missing_ok=True)
+        else:
+            self._submit(self._abort, tmp)
+
+    # --- writer thread ---
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            job = self._jobs.get()
+            if job is None:
+                break
+            batch = [job]
+            while len(batch) < self.batch_size:
+                try:
+                    job = self._jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    stopping = True
+                    break
+                batch.append(job)
+            self._run_batch(batch)
+        for fh in self._open.values():
+            fh.close()
+        self._open.clear()
+
+    def _run_batch(self, batch: list[tuple[Callable[..., Any], tuple, Future]]) -> None:
+        started = time.monotonic()
+        with self._tracer.span("write_batch", "io", jobs=len(batch)):
+            done: list[tuple[Future, Any, Path | None]] = []
+            for fn, args, fut in batch:
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                try:
+                    result, synced_dir = fn(*args)
+                except BaseException as exc:  # noqa: BLE001
+                    fut.set_exception(exc)
+                else:
+                    done.append((fut, result, synced_dir))
+            # One fsync per directory renamed into, however many files landed there.
+            failed: dict[Path, OSError] = {}
+            if self.fsync:
+                for directory in {d for _, _, d in done if d is not None}:
+                    try:
+                        self._fsync_dir(directory)
+                    except OSError as exc:
+                        failed[directory] = exc
+            for fut, result, synced_dir in done:
+                if synced_dir in failed:
+                    fut.set_exception(failed[synced_dir])
+                else:
+                    fut.set_result(result)
+        self.batches += 1
+        self.busy_s += time.monotonic() - started
+
+    def _ensure_dir(self, directory: Path) -> None:
+        if directory not in self._dirs:
+            directory.mkdir(parents=True, exist_ok=True)
+            self._dirs.add(directory)
+            self.mkdirs += 1
+
+    def _open_file(self, directory: Path, path: Path, mode: str):
+        self._ensure_dir(directory)
+        try:
+            return open(path, mode)
+        except FileNotFoundError:
+            # The directory was removed behind the cache's back (e.g. by compaction).
+            self._dirs.discard(directory)
+            self._ensure_dir(directory)
+            return open(path, mode)
+
+    def _fsync_file(self, fh) -> None:
+        fh.flush()
+        if self.fsync:
+            os.fsync(fh.fileno())
+            self.fsyncs += 1
+
+    def _fsync_dir(self, directory: Path) -> None:
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        self.fsyncs += 1
+
+    def _open_temp(self, directory: Path) -> tuple[Path, None]:
+        tmp = directory / f".{uuid.uuid4().hex}.part"
+        self._open[tmp] = self._open_file(directory, tmp, "wb")
+        return tmp, None
+
+    def _append(self, tmp: Path, data: bytes) -> tuple[None, None]:
+        self._open[tmp].write(data)
+        self.bytes += len(data)
+        return None, None
+
+    def _close_temp(self, tmp: Path) -> tuple[None, None]:
+        fh = self._open.pop(tmp)
+        try:
+            self._fsync_file(fh)
+        finally:
+            fh.close()
+        return None, None
+
+    def _commit(self, tmp: Path, dest: Path) -> tuple[None, Path]:
+        os.replace(tmp, dest)
+        self.files += 1
+        return None, dest.parent
+
+    def _copy(self, src: Path, dest: Path) -> tuple[None, Path]:
+        tmp = dest.parent / f".{dest.name}.{uuid.uuid4().hex}.part"
+        try:
+            with open(src, "rb") as fin, self._open_file(dest.parent, tmp, "wb") as fout:
+                shutil.copyfileobj(fin, fout, 1024 * 1024)
+                self._fsync_file(fout)
+                self.bytes += fout.tell()
+            os.replace(tmp, dest)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        self.copies += 1
+        return None, dest.parent
+
+    def _remove(self, path: Path) -> tuple[None, None]:
+        path.unlink(missing_ok=True)
+        return None, None
+
+    def _abort(self, tmp: Path) -> tuple[None, None]:
+        fh = self._open.pop(tmp, None)
+        if fh is not None:
+            fh.close()
+        tmp.unlink(missing_ok=True)
+        return None, None
+
+
+def merge_writer_stats(a: dict[str, Any], b: dict[str, Any]) -> dict[str, Any]:
+    if not a:
+        return dict(b)
+    if not b:
+        return dict(a)
+    out = {key: a[key] + b[key] for key in a}
+    out["busy_s"] = round(out["busy_s"], 3)
+    return out
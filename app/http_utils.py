@@ -2,10 +2,15 @@ from __future__ import annotations
 
 import asyncio
 import random
-from typing import Any
+import time
+from typing import Any, Callable
+from urllib.parse import urlparse
 
 import httpx
 
+from app.time_utils import kst_timestamp_str
+from app.tracing import tracer
+
 
 DEFAULT_HEADERS = {
     "User-Agent": (
@@ -16,6 +21,160 @@ DEFAULT_HEADERS = {
 }
 
 
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to a host whose circuit is open."""
+
+
+class CircuitBreaker:
+    """Per-host breaker: closed -> open after N consecutive failures -> half-open after cooldown.
+
+    In half-open state a single trial request is let through; its outcome closes or
+    re-opens the circuit.
+    """
+
+    def __init__(self, *, failure_threshold: int = 5, cooldown_seconds: float = 60.0) -> None:
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.cooldown_seconds = float(cooldown_seconds)
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+
+    def allow(self, now: float) -> tuple[bool, str | None]:
+        """Return (allowed, new_state_if_changed)."""
+        if self.state == STATE_OPEN:
+            if now - self.opened_at < self.cooldown_seconds:
+                return False, None
+            self.state = STATE_HALF_OPEN
+            self.trial_in_flight = True
+            return True, STATE_HALF_OPEN
+        if self.state == STATE_HALF_OPEN:
+            if self.trial_in_flight:
+                return False, None
+            self.trial_in_flight = True
+        return True, None
+
+    def on_success(self) -> str | None:
+        self.failures = 0
+        self.trial_in_flight = False
+        if self.state != STATE_CLOSED:
+            self.state = STATE_CLOSED
+            return STATE_CLOSED
+        return None
+
+    def release_trial(self) -> None:
+        """The half-open trial ended without an outcome (cancelled); let the next request try."""
+        self.trial_in_flight = False
+
+    def on_failure(self, now: float) -> str | None:
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.state == STATE_HALF_OPEN or (self.state == STATE_CLOSED and self.failures >= self.failure_threshold):
+            self.state = STATE_OPEN
+            self.opened_at = now
+            return STATE_OPEN
+        return None
+
+
+class RetryBudget:
+    """Per-run cap on retries: at most `min_retries + ratio * requests` retries in total."""
+
+    def __init__(self, *, ratio: float = 0.2, min_retries: int = 10) -> None:
+        self.ratio = float(ratio)
+        self.min_retries = int(min_retries)
+        self.requests = 0
+        self.retries = 0
+
+    def try_spend(self) -> bool:
+        if self.retries >= self.min_retries + self.ratio * self.requests:
+            return False
+        self.retries += 1
+        return True
+
+
+class RequestGuard:
+    """Shared per-run state for `request_with_retry`: host circuit breakers and the retry budget.
+
+    Breaker transitions are appended to the failed logger (reasons CIRCUIT_OPEN,
+    CIRCUIT_HALF_OPEN, CIRCUIT_CLOSED) so they show up in failed.jsonl.
+    """
+
+    def __init__(
+        self,
+        failed_logger=None,
+        *,
+        failure_threshold: int = 5,
+        cooldown_seconds: float = 60.0,
+        retry_budget: RetryBudget | None = None,
+    ) -> None:
+        self.failed_logger = failed_logger
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.retry_budget = retry_budget or RetryBudget()
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self._budget_exhausted_logged = False
+
+    def _breaker(self, host: str) -> CircuitBreaker:
+        breaker = self.breakers.get(host)
+        if breaker is None:
+            breaker = CircuitBreaker(failure_threshold=self.failure_threshold, cooldown_seconds=self.cooldown_seconds)
+            self.breakers[host] = breaker
+        return breaker
+
+    def allow_request(self, url: str) -> bool:
+        host = (urlparse(url).hostname or "").lower()
+        allowed, changed = self._breaker(host).allow(time.monotonic())
+        self._log_transition(host, changed)
+        if allowed:
+            self.retry_budget.requests += 1
+        return allowed
+
+    def record(self, url: str, ok: bool) -> None:
+        host = (urlparse(url).hostname or "").lower()
+        breaker = self._breaker(host)
+        changed = breaker.on_success() if ok else breaker.on_failure(time.monotonic())
+        self._log_transition(host, changed)
+
+    def abandon(self, url: str) -> None:
+        """A request allowed by `allow_request` was cancelled before it had an outcome."""
+        self._breaker((urlparse(url).hostname or "").lower()).release_trial()
+
+    def allow_retry(self) -> bool:
+        if self.retry_budget.try_spend():
+            return True
+        if not self._budget_exhausted_logged and self.failed_logger is not None:
+            self._budget_exhausted_logged = True
+            self.failed_logger.append(
+                {
+                    "time_kst": kst_timestamp_str(),
+                    "provider": None,
+                    "url": None,
+                    "reason": "RETRY_BUDGET_EXHAUSTED",
+                    "detail": f"retries={self.retry_budget.retries} requests={self.retry_budget.requests}",
+                }
+            )
+        return False
+
+    def _log_transition(self, host: str, state: str | None) -> None:
+        if state is None or self.failed_logger is None:
+            return
+        self.failed_logger.append(
+            {
+                "time_kst": kst_timestamp_str(),
+                "provider": None,
+                "url": None,
+                "host": host,
+                "reason": f"CIRCUIT_{state.upper()}",
+                "detail": f"host={host} failures={self.breakers[host].failures}",
+            }
+        )
+
+
 async def request_with_retry(
     client: httpx.AsyncClient,
     method: str,
@@ -25,17 +184,54 @@ async def request_with_retry(
     polite_delay: bool = False,
     backoff_base_seconds: float = 1.0,
     backoff_jitter_seconds: float = 0.3,
+    stream: bool = False,
+    guard: RequestGuard | None = None,
+    give_up: Callable[[httpx.Response], bool] | None = None,
     **kwargs: Any,
 ) -> httpx.Response:
+    """Send a request, retrying transient failures with exponential backoff.
+
+    With `stream=True` the body is not read; the caller must consume it
+    (e.g. `aiter_bytes`) and `aclose()` the response.
+
+    With a `guard`, requests to a host whose circuit is open fail fast with
+    `CircuitOpenError`, and retries stop once the run's retry budget is spent.
+
+    `give_up(response)` is called on every response received; when it returns True the
+    response is returned as is, without retrying (e.g. an API quota error that a retry
+    would only spend again). With `stream=True` it sees the headers only.
+    """
+    follow_redirects = kwargs.pop("follow_redirects", httpx.USE_CLIENT_DEFAULT) if stream else None
+    trace = tracer()
+    if trace.enabled:
+        kwargs["extensions"] = {**(kwargs.get("extensions") or {}), "trace": trace.httpx_hook()}
     last_exc: Exception | None = None
     for attempt in range(1, retries + 1):
         if polite_delay:
-            await asyncio.sleep(random.uniform(0.8, 1.6))
+            with trace.span("polite_delay", "http"):
+                await asyncio.sleep(random.uniform(0.8, 1.6))
+        if guard is not None and not guard.allow_request(url):
+            if last_exc is not None:
+                # The circuit opened while we were retrying: report the real failure.
+                break
+            raise CircuitOpenError(f"circuit open for host {urlparse(url).hostname}")
         try:
-            response = await client.request(method, url, **kwargs)
+            with trace.span("request", "http", url=url, attempt=attempt):
+                if stream:
+                    request = client.build_request(method, url, **kwargs)
+                    response = await client.send(request, stream=True, follow_redirects=follow_redirects)
+                else:
+                    response = await client.request(method, url, **kwargs)
+
+            if give_up is not None and give_up(response):
+                if guard is not None:
+                    # The host answered; the caller deals with what it said (e.g. a quota error).
+                    guard.record(url, ok=True)
+                return response
 
             # Retry on server errors and common throttling responses.
             if response.status_code >= 500 or response.status_code in {429, 408}:
+                await response.aclose()
                 raise httpx.HTTPStatusError(
                     f"retryable http error: {response.status_code}", request=response.request, response=response
                 )
@@ -43,16 +239,33 @@ async def request_with_retry(
             # For 403, do NOT attempt to bypass; but transient blocks can happen.
             # Retry a little, then give up.
             if response.status_code == 403 and attempt < retries:
+                await response.aclose()
                 raise httpx.HTTPStatusError(
                     f"transient forbidden: {response.status_code}", request=response.request, response=response
                 )
 
+            if guard is not None:
+                guard.record(url, ok=response.status_code != 403)
             return response
         except (httpx.TimeoutException, httpx.ConnectError, httpx.NetworkError, httpx.HTTPStatusError) as exc:
             last_exc = exc
+            if guard is not None:
+                guard.record(url, ok=False)
             if attempt < retries:
+                if guard is not None and not guard.allow_retry():
+                    break
                 sleep_for = backoff_base_seconds * (2 ** (attempt - 1)) + random.uniform(0.0, backoff_jitter_seconds)
                 await asyncio.sleep(sleep_for)
+        except asyncio.CancelledError:
+            # Cancelled by us (e.g. the run deadline), not a host failure; free a half-open trial.
+            if guard is not None:
+                guard.abandon(url)
+            raise
+        except Exception:
+            # Non-retryable errors still settle the breaker (e.g. a half-open trial).
+            if guard is not None:
+                guard.record(url, ok=False)
+            raise
 
     if last_exc is None:
         raise RuntimeError("unknown request failure")
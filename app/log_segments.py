@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import gzip
+import io
+import json
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import timedelta
+from pathlib import Path
+from typing import IO, Any, Iterator
+
+from app.sqlite_utils import connect
+from app.time_utils import now_kst
+
+SEGMENTS_DIR = "segments"
+
+_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+# A compression claim older than this belongs to a process that died; it may be taken over.
+_CLAIM_STALE_SECONDS = 15 * 60
+
+
+@dataclass
+class Segment:
+    path: Path
+    first_ts: str
+    last_ts: str
+    lines: int
+
+
+class SegmentIndex:
+    """Time range of every compressed log segment (meta/log_segments.sqlite)."""
+
+    def __init__(self, meta_dir: Path, *, wal: bool | None = True) -> None:
+        self.meta_dir = meta_dir
+        self.conn = connect(meta_dir / "log_segments.sqlite", wal=wal)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS log_segments (
+                log TEXT NOT NULL,
+                name TEXT NOT NULL,
+                first_ts TEXT NOT NULL,
+                last_ts TEXT NOT NULL,
+                lines INTEGER NOT NULL,
+                raw_bytes INTEGER NOT NULL,
+                stored_bytes INTEGER NOT NULL,
+                PRIMARY KEY (log, name)
+            )
+            """
+        )
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS log_segment_claims (
+                log TEXT NOT NULL,
+                name TEXT NOT NULL,
+                owner TEXT NOT NULL,
+                claimed_at REAL NOT NULL,
+                PRIMARY KEY (log, name)
+            )
+            """
+        )
+        self.conn.commit()
+
+    def add(self, log: str, name: str, first_ts: str, last_ts: str, lines: int, raw_bytes: int, stored_bytes: int) -> None:
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO log_segments VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (log, name, first_ts, last_ts, lines, raw_bytes, stored_bytes),
+            )
+
+    def claim(self, log: str, name: str, owner: str, *, now: float | None = None) -> bool:
+        """Take the right to compress one segment; False while another live process holds it."""
+        now = time.time() if now is None else now
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            row = self.conn.execute(
+                "SELECT owner, claimed_at FROM log_segment_claims WHERE log = ? AND name = ?", (log, name)
+            ).fetchone()
+            if row is not None and row[0] != owner and row[1] > now - _CLAIM_STALE_SECONDS:
+                return False
+            self.conn.execute(
+                "INSERT OR REPLACE INTO log_segment_claims VALUES (?, ?, ?, ?)", (log, name, owner, now)
+            )
+        return True
+
+    def release(self, log: str, name: str) -> None:
+        with self.conn:
+            self.conn.execute("DELETE FROM log_segment_claims WHERE log = ? AND name = ?", (log, name))
+
+    def has(self, log: str, name: str) -> bool:
+        row = self.conn.execute("SELECT 1 FROM log_segments WHERE log = ? AND name = ?", (log, name)).fetchone()
+        return row is not None
+
+    def segments(self, log: str, *, since: str | None = None, until: str | None = None) -> list[Segment]:
+        """Segments overlapping [since, until], oldest first. Rows without a time sort first ("")."""
+        sql = "SELECT name, first_ts, last_ts, lines FROM log_segments WHERE log = ?"
+        params: list[Any] = [log]
+        if since:
+            sql += " AND last_ts >= ?"
+            params.append(since)
+        if until:
+            sql += " AND first_ts <= ?"
+            params.append(until + "\uffff")
+        sql += " ORDER BY first_ts, name"
+        directory = self.meta_dir / SEGMENTS_DIR / log
+        return [Segment(directory / name, a, b, int(n)) for name, a, b, n in self.conn.execute(sql, params)]
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def _codec(preferred: str) -> str:
+    if preferred == "zstd":
+        try:
+            import zstandard  # noqa: F401  (optional)
+        except ImportError:
+            return "gzip"
+    return preferred if preferred in _SUFFIXES else "gzip"
+
+
+def _open_compressed_writer(path: Path, codec: str) -> IO[bytes]:
+    if codec == "zstd":
+        import zstandard
+
+        return zstandard.ZstdCompressor(level=10).stream_writer(path.open("wb"), closefd=True)
+    return gzip.open(path, "wb", compresslevel=6)
+
+
+def _open_segment(path: Path) -> IO[str]:
+    if path.suffix == ".zst":
+        try:
+            import zstandard
+        except ImportError as exc:
+            raise RuntimeError(f"{path.name} needs the 'zstandard' package (pip install zstandard)") from exc
+        raw = zstandard.ZstdDecompressor().stream_reader(path.open("rb"), closefd=True)
+        return io.TextIOWrapper(raw, encoding="utf-8")
+    return gzip.open(path, "rt", encoding="utf-8")
+
+
+def _first_time(path: Path) -> str | None:
+    try:
+        with path.open("r", encoding="utf-8") as fh:
+            line = fh.readline()
+        return str(json.loads(line).get("time_kst") or "") or None
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _compress(raw: Path, log: str, index: SegmentIndex, codec: str) -> Segment | None:
+    """Compress one detached raw segment, index its time range, then delete the raw file.
+
+    Several processes (--processes partitions, nodes sharing the root) may find the same
+    raw segment; a claim row in the index lets only one of them compress it. Returns None
+    when another process owns it or has already finished it.
+    """
+    name = raw.name + _SUFFIXES[codec]
+    dest = raw.with_name(name)
+    owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    if not index.claim(log, name, owner):
+        return None
+    try:
+        if not raw.exists():
+            return None  # finished by another process between our listing and the claim
+        if index.has(log, name):
+            # Compressed and indexed before an interruption; only the raw file is left to delete.
+            raw.unlink()
+            return next(s for s in index.segments(log) if s.path == dest)
+        # Leftovers of a process that died while holding an (now stale) claim on this segment.
+        for stale in raw.parent.glob(f".{name}.*.part"):
+            stale.unlink(missing_ok=True)
+        tmp = raw.with_name(f".{name}.{owner}.part")
+        first_ts, last_ts, lines = "", "", 0
+        try:
+            with raw.open("rb") as src, _open_compressed_writer(tmp, codec) as out:
+                for line in src:
+                    out.write(line)
+                    lines += 1
+                    try:
+                        ts = str(json.loads(line).get("time_kst") or "")
+                    except (ValueError, AttributeError):
+                        ts = ""
+                    if ts:
+                        first_ts = ts if not first_ts else min(first_ts, ts)
+                        last_ts = max(last_ts, ts)
+            os.replace(tmp, dest)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        index.add(log, name, first_ts, last_ts, lines, raw.stat().st_size, dest.stat().st_size)
+        raw.unlink()
+        return Segment(dest, first_ts, last_ts, lines)
+    finally:
+        index.release(log, name)
+
+
+def rotate(
+    meta_dir: Path,
+    log: str,
+    *,
+    max_bytes: int,
+    max_age_days: float,
+    codec: str = "zstd",
+    wal: bool = True,
+) -> Segment | None:
+    """Move meta/<log>.jsonl into a compressed segment once it is too big or too old.
+
+    The active file is renamed first, so writers that open it afterwards start a new
+    file under the usual name. A raw segment left by an interrupted rotation is
+    compressed on the next call. Safe to call from several processes at once. Returns
+    the new segment, if any.
+    """
+    active = meta_dir / f"{log}.jsonl"
+    directory = meta_dir / SEGMENTS_DIR / log
+    index = SegmentIndex(meta_dir, wal=wal)
+    try:
+        if directory.is_dir():
+            for raw in sorted(directory.glob(f"{log}-*.jsonl")):
+                _compress(raw, log, index, _codec(codec))
+        try:
+            size = active.stat().st_size
+        except FileNotFoundError:
+            return None
+        if size == 0:
+            return None
+        first = _first_time(active)
+        too_old = first is not None and first < (now_kst() - timedelta(days=max_age_days)).isoformat()
+        if size < max_bytes and not too_old:
+            return None
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = now_kst().strftime("%Y%m%dT%H%M%S")
+        raw = directory / f"{log}-{stamp}-{os.getpid()}-{uuid.uuid4().hex[:8]}.jsonl"
+        try:
+            os.replace(active, raw)
+        except FileNotFoundError:
+            return None  # another process rotated it first
+        return _compress(raw, log, index, _codec(codec))
+    finally:
+        index.close()
+
+
+def _rows(fh: IO[str], since: str | None, until: str | None) -> Iterator[dict[str, Any]]:
+    for line in fh:
+        try:
+            row = json.loads(line)
+        except ValueError:
+            continue
+        if not isinstance(row, dict):
+            continue
+        if since or until:
+            ts = str(row.get("time_kst") or "")
+            if since and ts < since:
+                continue
+            if until and ts > until + "\uffff":
+                continue
+        yield row
+
+
+def iter_log(
+    meta_dir: Path,
+    log: str,
+    *,
+    since: str | None = None,
+    until: str | None = None,
+    include_active: bool = True,
+) -> Iterator[dict[str, Any]]:
+    """Stream the rows of meta/<log>.jsonl and its compressed segments, oldest segment first.
+
+    `since`/`until` are KST timestamps or dates (`until` is inclusive); segments whose
+    indexed time range lies outside them are not opened at all.
+    """
+    segments: list[Segment] = []
+    if (meta_dir / "log_segments.sqlite").exists():
+        # Readers keep the index's journal mode (shared roots use a rollback journal).
+        index = SegmentIndex(meta_dir, wal=None)
+        try:
+            segments = index.segments(log, since=since, until=until)
+        finally:
+            index.close()
+    for segment in segments:
+        if not segment.path.exists():
+            continue
+        with _open_segment(segment.path) as fh:
+            yield from _rows(fh, since, until)
+    active = meta_dir / f"{log}.jsonl"
+    if include_active and active.exists():
+        with active.open("r", encoding="utf-8") as fh:
+            yield from _rows(fh, since, until)
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+from typing import Any
+
+from app.jsonl_logger import JsonlLogger
+from app.time_utils import kst_timestamp_str
+
+_STACK_FRAMES = 25
+
+
+class LoopWatchdog:
+    """Detects callbacks that block the event loop and records where they were stuck.
+
+    A heartbeat task wakes every `interval_s`; a watchdog thread notices when the next
+    wake-up is overdue by `threshold_s`, captures the loop thread's stack at that moment
+    (the blocking call is on it), and when the loop comes back appends one record with
+    the stall duration to meta/loop_stalls.jsonl. Only the first `max_records` stalls of
+    a run are logged; all of them are counted in `stats()`.
+    """
+
+    def __init__(
+        self,
+        log_path: Path,
+        *,
+        threshold_s: float = 0.25,
+        interval_s: float = 0.05,
+        max_records: int = 200,
+    ) -> None:
+        self.logger = JsonlLogger(log_path)
+        self.threshold_s = float(threshold_s)
+        self.interval_s = float(interval_s)
+        self.max_records = int(max_records)
+        self.count = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self._expected = time.monotonic()
+        self._last_lag: tuple[float, float] = (0.0, 0.0)  # (expected wake-up, lag) of the latest wake-up
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id = 0
+        self._heartbeat: asyncio.Task | None = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._expected = time.monotonic() + self.interval_s
+        self._heartbeat = self._loop.create_task(self._beat(), name="loop-watchdog")
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            await asyncio.gather(self._heartbeat, return_exceptions=True)
+        if self._thread is not None:
+            self._thread.join()
+
+    async def _beat(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval_s
+            self._expected = expected
+            await asyncio.sleep(self.interval_s)
+            self._last_lag = (expected, time.monotonic() - expected)
+
+    def _watch(self) -> None:
+        poll = min(self.interval_s, self.threshold_s / 4)
+        stalled: dict[str, Any] | None = None
+        while not self._stop.wait(poll):
+            expected = self._expected
+            if stalled is not None and stalled["expected"] != expected:
+                # The loop is running again: the heartbeat measured the full lag on wake-up.
+                last_expected, lag = self._last_lag
+                self._record(stalled, lag if last_expected == stalled["expected"] else stalled["seen_s"])
+                stalled = None
+            lag = time.monotonic() - expected
+            if lag < self.threshold_s:
+                continue
+            if stalled is None:
+                stalled = {"expected": expected, "stack": self._loop_stack(), "task": self._loop_task()}
+            stalled["seen_s"] = lag
+        if stalled is not None:
+            self._record(stalled, stalled["seen_s"])
+
+    def _loop_stack(self) -> list[str]:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return []
+        return [
+            f"{fs.filename}:{fs.lineno} in {fs.name}" + (f": {fs.line}" if fs.line else "")
+            for fs in traceback.extract_stack(frame, limit=_STACK_FRAMES)
+        ]
+
+    def _loop_task(self) -> str | None:
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            return None
+        return task.get_name() if task is not None else None
+
+    def _record(self, stalled: dict[str, Any], duration_s: float) -> None:
+        self.count += 1
+        self.total_s += duration_s
+        self.max_s = max(self.max_s, duration_s)
+        if self.count > self.max_records:
+            return
+        try:
+            self.logger.append(
+                {
+                    "time_kst": kst_timestamp_str(),
+                    "pid": os.getpid(),
+                    "duration_ms": round(duration_s * 1000, 1),
+                    "threshold_ms": round(self.threshold_s * 1000, 1),
+                    "task": stalled["task"],
+                    "stack": stalled["stack"],
+                }
+            )
+        except OSError:
+            pass
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_s * 1000, 1),
+            "max_ms": round(self.max_s * 1000, 1),
+            "threshold_ms": round(self.threshold_s * 1000, 1),
+        }
+
+
+def merge_stall_stats(a: dict[str, Any], b: dict[str, Any]) -> dict[str, Any]:
+    if not a:
+        return dict(b)
+    if not b:
+        return dict(a)
+    return {
+        "count": a["count"] + b["count"],
+        "total_ms": round(a["total_ms"] + b["total_ms"], 1),
+        "max_ms": max(a["max_ms"], b["max_ms"]),
+        "threshold_ms": a["threshold_ms"],
+    }
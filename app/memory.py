@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import linecache
+import os
+import threading
+import tracemalloc
+from typing import Any
+
+_MB = 1024 * 1024
+
+# Take a new tracemalloc snapshot only when RSS has grown this much past the last one.
+_SNAPSHOT_GROWTH = 1.10
+
+# Allocation sites inside these modules are bookkeeping, not the collector's memory.
+_IGNORED_SITES = (
+    tracemalloc.__file__,
+    linecache.__file__,
+    "<frozen importlib._bootstrap>",
+    "<frozen importlib._bootstrap_external>",
+)
+
+
+def current_rss_bytes() -> int | None:
+    """Resident set size of this process, or None if the platform gives no way to read it."""
+    try:
+        with open("/proc/self/statm", "rb") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil  # optional (macOS/Windows)
+    except ImportError:
+        return None
+    return int(psutil.Process().memory_info().rss)
+
+
+class MemoryMonitor:
+    """Samples RSS in a background thread and keeps the peak per run stage.
+
+    The runner switches `stage` as the run moves on (discovery, download, ...). With
+    `trace_memory`, tracemalloc runs for the whole run and a snapshot is taken whenever
+    RSS reaches a new peak, so `stats()` can list the allocation sites that were live
+    at the peak.
+    """
+
+    def __init__(self, *, interval_s: float = 0.5, trace_memory: bool = False, top_n: int = 15) -> None:
+        self.interval_s = float(interval_s)
+        self.trace_memory = trace_memory
+        self.top_n = int(top_n)
+        self.stage = "setup"
+        self.samples = 0
+        self.peak_bytes = 0
+        self.peak_stage = ""
+        self.stage_peaks: dict[str, int] = {}
+        self._snapshot: tracemalloc.Snapshot | None = None
+        self._snapshot_rss = 0
+        self._started_tracemalloc = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            self._started_tracemalloc = True
+        self.sample()
+        self._thread = threading.Thread(target=self._run, name="memory-monitor", daemon=True)
+        self._thread.start()
+
+    def set_stage(self, stage: str) -> None:
+        self.sample()  # the previous stage's last value
+        self.stage = stage
+        self.sample()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            self.sample()
+
+    def sample(self) -> None:
+        rss = current_rss_bytes()
+        if rss is None:
+            return
+        with self._lock:
+            self.samples += 1
+            stage = self.stage
+            if rss > self.stage_peaks.get(stage, 0):
+                self.stage_peaks[stage] = rss
+            if rss <= self.peak_bytes:
+                return
+            self.peak_bytes = rss
+            self.peak_stage = stage
+            take_snapshot = self.trace_memory and tracemalloc.is_tracing() and (
+                self._snapshot is None or rss >= self._snapshot_rss * _SNAPSHOT_GROWTH
+            )
+        if take_snapshot:
+            snapshot = tracemalloc.take_snapshot()
+            with self._lock:
+                self._snapshot, self._snapshot_rss = snapshot, rss
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.sample()
+
+    def top_allocations(self) -> list[dict[str, Any]]:
+        """Largest allocation sites (file:line) live at the last peak snapshot."""
+        if self._snapshot is None:
+            return []
+        snapshot = self._snapshot.filter_traces([tracemalloc.Filter(False, pattern) for pattern in _IGNORED_SITES])
+        rows = []
+        for stat in snapshot.statistics("lineno")[: self.top_n]:
+            frame = stat.traceback[0]
+            rows.append(
+                {
+                    "site": f"{frame.filename}:{frame.lineno}",
+                    "size_mb": round(stat.size / _MB, 2),
+                    "count": stat.count,
+                }
+            )
+        return rows
+
+    def stats(self) -> dict[str, Any]:
+        out: dict[str, Any] = {
+            "peak_rss_mb": round(self.peak_bytes / _MB, 1),
+            "peak_stage": self.peak_stage,
+            "stage_peaks_mb": {stage: round(n / _MB, 1) for stage, n in self.stage_peaks.items()},
+            "samples": self.samples,
+        }
+        if self.trace_memory and tracemalloc.is_tracing():
+            out["traced_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / _MB, 1)
+            out["top_allocations"] = self.top_allocations()
+        return out
+
+    def close(self) -> None:
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        self._snapshot = None
+
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable
+
+import httpx
+
+from app.sqlite_utils import connect
+from app.time_utils import now_kst
+
+# Naver search OpenAPI: 25,000 calls per application per day, reset at midnight KST.
+DEFAULT_DAILY_LIMIT = 25_000
+# errorCode for "사용 한도 초과" (quota exceeded); 012 is the per-second rate limit, which is retryable.
+QUOTA_ERROR_CODE = "010"
+# The image search API rejects start > 1000, which bounds how deep a keyword can be paged.
+MAX_START = 1000
+
+
+def is_quota_error(response: httpx.Response) -> bool:
+    if response.status_code != 429:
+        return False
+    try:
+        return str(response.json().get("errorCode")) == QUOTA_ERROR_CODE
+    except (ValueError, AttributeError):
+        return False
+
+
+class NaverQuota:
+    """Daily Naver API call ledger plus per-(keyword, page) yield history.
+
+    The ledger counts every response (retries included) per KST day and remembers when
+    Naver reported the quota as exhausted. A run makes as many calls as its configured
+    page plan (keywords x pages), never more than its share of what is left of the day's
+    quota, but picks them from every page the API can reach: the (keyword, page) calls
+    with the best expected yield, i.e. new URLs per call (URLs not returned within
+    `seen_ttl_days`) times the keyword's historical download OK rate.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        *,
+        daily_limit: int = DEFAULT_DAILY_LIMIT,
+        run_interval_hours: float = 4.0,
+        prior_calls: float = 2.0,
+        ok_rate: Callable[[str], float] | None = None,
+        seen_ttl_days: float = 30.0,
+        wal: bool = True,
+    ) -> None:
+        self.db_path = db_path
+        self.daily_limit = int(daily_limit)
+        self.run_interval_hours = max(0.1, float(run_interval_hours))
+        self.prior_calls = float(prior_calls)
+        self.ok_rate = ok_rate
+        # Per-run stats for the summary.
+        self.calls = 0
+        self.new_urls = 0
+        self.planned = 0
+        self.exhausted = False
+        self.conn = connect(self.db_path, wal=wal)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS naver_quota (
+                day TEXT PRIMARY KEY,
+                used INTEGER NOT NULL DEFAULT 0,
+                exhausted INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS naver_yield (
+                query TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                calls INTEGER NOT NULL DEFAULT 0,
+                new_urls INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (query, page)
+            );
+            CREATE TABLE IF NOT EXISTS naver_seen (
+                url_hash TEXT PRIMARY KEY,
+                seen_at REAL NOT NULL DEFAULT 0
+            );
+            """
+        )
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(naver_seen)")}
+        if "seen_at" not in columns:  # ledgers from before expiry; their rows age out on this open
+            self.conn.execute("ALTER TABLE naver_seen ADD COLUMN seen_at REAL NOT NULL DEFAULT 0")
+        self.conn.execute("DELETE FROM naver_seen WHERE seen_at < ?", (time.time() - seen_ttl_days * 86400,))
+        self.conn.commit()
+
+    @staticmethod
+    def _day(now: datetime | None = None) -> str:
+        return (now or now_kst()).strftime("%Y-%m-%d")
+
+    def used(self, now: datetime | None = None) -> int:
+        row = self.conn.execute("SELECT used FROM naver_quota WHERE day = ?", (self._day(now),)).fetchone()
+        return int(row[0]) if row else 0
+
+    def is_exhausted(self, now: datetime | None = None) -> bool:
+        row = self.conn.execute(
+            "SELECT used, exhausted FROM naver_quota WHERE day = ?", (self._day(now),)
+        ).fetchone()
+        return bool(row) and (bool(row[1]) or int(row[0]) >= self.daily_limit)
+
+    def spend(self, n: int = 1, now: datetime | None = None) -> None:
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO naver_quota (day, used) VALUES (?, ?)
+                ON CONFLICT(day) DO UPDATE SET used = used + excluded.used
+                """,
+                (self._day(now), int(n)),
+            )
+        self.calls += n
+
+    def mark_exhausted(self, now: datetime | None = None) -> None:
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO naver_quota (day, exhausted) VALUES (?, 1)
+                ON CONFLICT(day) DO UPDATE SET exhausted = 1
+                """,
+                (self._day(now),),
+            )
+        self.exhausted = True
+
+    def on_response(self, response: httpx.Response) -> bool:
+        """`give_up` hook for request_with_retry: counts the call; True stops retrying a quota error."""
+        self.spend(1)
+        if is_quota_error(response):
+            self.mark_exhausted()
+            return True
+        return False
+
+    def record_call(self, query: str, page: int, urls: list[str], now: float | None = None) -> int:
+        """Remember a successful call's links; returns how many were not seen recently."""
+        now = time.time() if now is None else now
+        rows = [(hashlib.sha1(u.encode("utf-8")).hexdigest(), now) for u in urls]
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany("INSERT OR IGNORE INTO naver_seen (url_hash, seen_at) VALUES (?, ?)", rows)
+            new = self.conn.total_changes - before
+            # URLs Naver keeps returning stay "seen"; the rest expire after seen_ttl_days.
+            self.conn.executemany("UPDATE naver_seen SET seen_at = ? WHERE url_hash = ?", [(t, h) for h, t in rows])
+            self.conn.execute(
+                """
+                INSERT INTO naver_yield (query, page, calls, new_urls) VALUES (?, ?, 1, ?)
+                ON CONFLICT(query, page) DO UPDATE SET calls = calls + 1, new_urls = new_urls + excluded.new_urls
+                """,
+                (query, int(page), new),
+            )
+        self.new_urls += new
+        return new
+
+    def run_budget(self, now: datetime | None = None) -> int:
+        """This run's share of today's remaining quota (remaining / runs left before midnight KST)."""
+        now = now or now_kst()
+        if self.is_exhausted(now):
+            return 0
+        remaining = max(0, self.daily_limit - self.used(now))
+        midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        hours_left = (midnight - now).total_seconds() / 3600.0
+        runs_left = max(1, math.ceil(hours_left / self.run_interval_hours))
+        return remaining // runs_left
+
+    def plan(self, keywords: list[str], pages: int, *, display: int, now: datetime | None = None) -> list[tuple[str, int]]:
+        """(keyword, page) calls for this run, best expected yield first.
+
+        The run makes len(keywords) * pages calls (capped by `run_budget`), chosen from
+        every page up to MAX_START, so a keyword whose first pages stopped yielding new
+        URLs gives its calls to deeper pages or to other keywords.
+        """
+        history = {
+            (q, int(p)): (int(c), int(n))
+            for q, p, c, n in self.conn.execute("SELECT query, page, calls, new_urls FROM naver_yield")
+        }
+        # Unseen (keyword, page) pairs start at the average new URLs per call (a full page if no history).
+        calls_total = sum(c for c, _ in history.values())
+        prior = sum(n for _, n in history.values()) / calls_total if calls_total else float(display)
+
+        def expected_new_images(call: tuple[str, int]) -> float:
+            calls, new = history.get(call, (0, 0))
+            new_per_call = (new + prior * self.prior_calls) / (calls + self.prior_calls)
+            return new_per_call * (self.ok_rate(call[0]) if self.ok_rate is not None else 1.0)
+
+        depth = (MAX_START - 1) // max(1, display) + 1
+        candidates = [(kw, page) for page in range(depth) for kw in keywords]
+        candidates.sort(key=expected_new_images, reverse=True)
+        planned = candidates[: min(len(keywords) * pages, self.run_budget(now))]
+        self.planned = len(planned)
+        return planned
+
+    def stats(self) -> dict[str, int | bool]:
+        return {
+            "used_today": self.used(),
+            "daily_limit": self.daily_limit,
+            "planned": self.planned,
+            "calls": self.calls,
+            "new_urls": self.new_urls,
+            "exhausted": self.exhausted or self.is_exhausted(),
+        }
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import json
+import shutil
+import time
+from itertools import combinations
+from math import comb
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from app.time_utils import kst_date_str, kst_timestamp_str
+
+MASK64 = (1 << 64) - 1
+
+# Candidate pairs compared per vectorized block (bounds the temporary index/XOR arrays).
+_BLOCK_ELEMS = 4_000_000
+
+# Cost of one sorted-key probe relative to one XOR/popcount comparison (measured).
+_PROBE_COST = 40.0
+
+
+def _chunk_bounds(chunks: int) -> list[tuple[int, int]]:
+    """Split 64 bits into `chunks` (shift, bits) ranges of near-equal width."""
+    edges = [round(i * 64 / chunks) for i in range(chunks + 1)]
+    return [(edges[i], edges[i + 1] - edges[i]) for i in range(chunks)]
+
+
+def _plan(n: int, threshold: int) -> tuple[int, int]:
+    """Pick (chunks, radius) for multi-index search.
+
+    Pigeonhole: if two hashes differ in <= threshold bits, some chunk differs in
+    <= threshold // chunks bits. More chunks mean fewer neighbour keys to probe but
+    bigger buckets; this picks the cheapest mix for n hashes.
+    """
+    best: tuple[float, int, int] | None = None
+    for chunks in range(1, min(64, threshold + 1) + 1):
+        bits = 64 // chunks
+        radius = threshold // chunks
+        probes = sum(comb(bits, i) for i in range(radius + 1))
+        cost = chunks * probes * n * (_PROBE_COST + n / 2.0**bits)
+        if best is None or cost < best[0]:
+            best = (cost, chunks, radius)
+    assert best is not None
+    return best[1], best[2]
+
+
+def _masks(bits: int, radius: int) -> list[int]:
+    out = []
+    for r in range(radius + 1):
+        for positions in combinations(range(bits), r):
+            out.append(sum(1 << p for p in positions))
+    return out
+
+
+class _UnionFind:
+    def __init__(self, n: int) -> None:
+        self.parent = list(range(n))
+
+    def find(self, x: int) -> int:
+        root = x
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[x] != root:
+            self.parent[x], x = root, self.parent[x]
+        return root
+
+    def union(self, a: int, b: int) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def _pairs_numpy(values: list[int], threshold: int, uf: _UnionFind) -> None:
+    import numpy as np
+
+    arr = np.array(values, dtype=np.uint64)
+    if hasattr(np, "bitwise_count"):
+        popcount = np.bitwise_count
+    else:  # numpy < 2.0
+        table = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+        def popcount(x):
+            return table[x.view(np.uint8)].reshape(*x.shape, 8).sum(axis=-1, dtype=np.uint8)
+
+    n = len(arr)
+    chunks, radius = _plan(n, threshold)
+    positions = np.arange(n)
+    for shift, bits in _chunk_bounds(chunks):
+        keys = (arr >> np.uint64(shift)) & np.uint64((1 << bits) - 1)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys, sorted_vals = keys[order], arr[order]
+        for mask in _masks(bits, radius):
+            # For every hash, the sorted range [lo, hi) of hashes whose chunk equals chunk ^ mask.
+            if mask == 0:
+                lo = positions + 1  # same bucket: only later positions, each pair once
+                hi = np.searchsorted(sorted_keys, sorted_keys, side="right")
+            else:
+                probe = sorted_keys ^ np.uint64(mask)
+                lo = np.searchsorted(sorted_keys, probe, side="left")
+                hi = np.searchsorted(sorted_keys, probe, side="right")
+                hi = np.where(sorted_keys < probe, hi, lo)  # visit each bucket pair once
+            counts = np.maximum(hi - lo, 0)
+            if not counts.any():
+                continue
+            ends = np.cumsum(counts)
+            # Expand the ranges into (src, dst) pairs in blocks to bound memory.
+            a = 0
+            while a < n:
+                b = int(np.searchsorted(ends, (ends[a - 1] if a else 0) + _BLOCK_ELEMS, side="right"))
+                b = min(n, max(b, a + 1))
+                c = counts[a:b]
+                total = int(c.sum())
+                if total:
+                    src = np.repeat(positions[a:b], c)
+                    first = np.repeat(np.cumsum(c) - c, c)
+                    dst = np.repeat(lo[a:b], c) + (np.arange(total) - first)
+                    hit = popcount(sorted_vals[src] ^ sorted_vals[dst]) <= threshold
+                    for x, y in zip(order[src[hit]].tolist(), order[dst[hit]].tolist()):
+                        uf.union(x, y)
+                a = b
+
+
+def _pairs_python(values: list[int], threshold: int, uf: _UnionFind) -> None:
+    # threshold + 1 chunks: near pairs share one chunk exactly, so only bucket-mates are compared.
+    for shift, bits in _chunk_bounds(min(64, threshold + 1)):
+        mask = (1 << bits) - 1
+        buckets: dict[int, list[int]] = {}
+        for idx, value in enumerate(values):
+            buckets.setdefault((value >> shift) & mask, []).append(idx)
+        for members in buckets.values():
+            for pos, a in enumerate(members):
+                va = values[a]
+                for b in members[pos + 1 :]:
+                    if (va ^ values[b]).bit_count() <= threshold:
+                        uf.union(a, b)
+
+
+def numpy_available() -> bool:
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def cluster_hashes(hashes: list[int], threshold: int, *, use_numpy: bool | None = None) -> list[list[int]]:
+    """Group indices of `hashes` whose 64-bit Hamming distance is <= threshold (transitively).
+
+    Identical hashes are collapsed first, then candidate pairs come from multi-index
+    hashing (hashes that agree on one chunk, up to a small radius), so the work grows
+    with bucket sizes instead of n^2. The candidate pairs are checked with numpy (listed in
+    requirements.txt); without it the much slower pure-Python path runs.
+    Returns clusters of two or more indices.
+    """
+    if use_numpy is None:
+        use_numpy = numpy_available()
+
+    unique: dict[int, list[int]] = {}
+    for idx, value in enumerate(hashes):
+        unique.setdefault(value & MASK64, []).append(idx)
+    values = list(unique)
+    uf = _UnionFind(len(values))
+    if threshold > 0 and len(values) > 1:
+        (_pairs_numpy if use_numpy else _pairs_python)(values, threshold, uf)
+
+    groups: dict[int, list[int]] = {}
+    for pos, value in enumerate(values):
+        groups.setdefault(uf.find(pos), []).extend(unique[value])
+    return [sorted(members) for members in groups.values() if len(members) > 1]
+
+
+@dataclass
+class NearDupReport:
+    threshold: int
+    images: int
+    clusters: list[dict[str, Any]] = field(default_factory=list)
+    elapsed_s: float = 0.0
+    quarantined: int = 0
+
+    @property
+    def redundant(self) -> int:
+        return sum(len(c["members"]) - 1 for c in self.clusters)
+
+
+def build_report(entries: list[tuple[str, str, int]], threshold: int) -> NearDupReport:
+    """entries: (phash hex, path, area) rows from the dedup index."""
+    started = time.monotonic()
+    hashes = [int(ph, 16) for ph, _, _ in entries]
+    clusters = []
+    for members in cluster_hashes(hashes, threshold):
+        best = max(members, key=lambda i: (entries[i][2], entries[i][1]))
+        rows = [
+            {
+                "path": entries[i][1],
+                "area": entries[i][2],
+                "phash": entries[i][0],
+                "distance": (hashes[i] ^ hashes[best]).bit_count(),
+            }
+            for i in sorted(members, key=lambda i: (-entries[i][2], entries[i][1]))
+        ]
+        clusters.append({"best": entries[best][1], "members": rows})
+    clusters.sort(key=lambda c: (-len(c["members"]), c["best"]))
+    return NearDupReport(
+        threshold=threshold,
+        images=len(entries),
+        clusters=clusters,
+        elapsed_s=time.monotonic() - started,
+    )
+
+
+def quarantine(root: Path, report: NearDupReport) -> int:
+    """Move every non-best cluster member to Quarantine/<date>/, keeping its relative path."""
+    dest_root = root / "Quarantine" / kst_date_str()
+    moved = 0
+    for cluster in report.clusters:
+        for member in cluster["members"]:
+            src = Path(member["path"])
+            if member["path"] == cluster["best"] or not src.exists():
+                continue
+            try:
+                rel = src.relative_to(root)
+            except ValueError:
+                rel = Path(src.name)
+            dest = dest_root / rel
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            shutil.move(str(src), str(dest))
+            member["quarantined_to"] = str(dest)
+            moved += 1
+    report.quarantined = moved
+    return moved
+
+
+def write_report(root: Path, report: NearDupReport, *, max_listed: int = 200) -> tuple[Path, Path]:
+    out_dir = root / "reports"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stem = f"Near_Duplicates_{kst_date_str()}"
+    json_path, md_path = out_dir / f"{stem}.json", out_dir / f"{stem}.md"
+
+    payload = {
+        "generated_kst": kst_timestamp_str(),
+        "threshold": report.threshold,
+        "images": report.images,
+        "clusters": len(report.clusters),
+        "redundant": report.redundant,
+        "quarantined": report.quarantined,
+        "elapsed_s": round(report.elapsed_s, 3),
+        "items": report.clusters,
+    }
+    json_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    with md_path.open("w", encoding="utf-8") as f:
+        f.write(f"# 🔁 Near-Duplicate Report ({kst_date_str()})\n\n")
+        f.write(f"- **Images:** {report.images}\n")
+        f.write(f"- **Hamming threshold:** {report.threshold}\n")
+        f.write(f"- **Clusters:** {len(report.clusters)}\n")
+        f.write(f"- **Redundant copies:** {report.redundant}\n")
+        if report.quarantined:
+            f.write(f"- **Quarantined:** {report.quarantined}\n")
+        for n, cluster in enumerate(report.clusters[:max_listed], start=1):
+            f.write(f"\n## {n}. {len(cluster['members'])} images\n\n")
+            for member in cluster["members"]:
+                mark = "⭐ " if member["path"] == cluster["best"] else ""
+                f.write(f"- {mark}`{member['path']}` ({member['area']} px, d={member['distance']})\n")
+        if len(report.clusters) > max_listed:
+            f.write(f"\n… {len(report.clusters) - max_listed} more clusters in {json_path.name}\n")
+    return json_path, md_path
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import time
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from app.models import Candidate
+from app.sqlite_utils import connect
+
+# Outcomes that mark a URL as dead for a while. Everything else (OK, DUPLICATE,
+# RESOLUTION_TOO_SMALL, ...) means the host served a real image.
+NEGATIVE_REASONS = {"DOWNLOAD_FAIL", "NOT_IMAGE", "IMAGE_DECODE_FAIL"}
+# Outcomes where the URL was never actually fetched.
+NEUTRAL_REASONS = {"CIRCUIT_OPEN_SKIP"}
+
+# Escalating TTLs: 1h, 6h, 24h, 7d.
+DEFAULT_TTLS_SECONDS = (3600, 6 * 3600, 24 * 3600, 7 * 24 * 3600)
+# A host is skipped for at most this long: it usually serves many other, live URLs.
+DEFAULT_HOST_TTL_MAX_SECONDS = 6 * 3600
+
+# Entries expired for this long are forgotten (the TTL ladder restarts from 1h).
+_FORGET_AFTER_SECONDS = 30 * 24 * 3600
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonical_url(url: str) -> str:
+    """Normalize a URL so trivially different spellings share one cache entry."""
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or "").lower()
+    if parsed.port and parsed.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parsed.port}"
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+    return urlunparse((scheme, host, parsed.path or "/", "", query, ""))
+
+
+def _host(url: str) -> str:
+    return (urlparse(url).hostname or "").lower()
+
+
+class NegativeCache:
+    """Persisted skip-list of failing URLs and hosts with escalating TTLs.
+
+    A URL enters the cache on its first negative outcome; each further failure after
+    expiry moves it one step up the TTL ladder, which for hosts stops at
+    `host_ttl_max_seconds`. A host enters the cache when `host_failure_threshold` of
+    its candidates fail in a row within a run with `host_fault=True` (transport error,
+    timeout or 5xx); a dead link (404, NOT_IMAGE, ...) only caches its URL and, since
+    the host answered, resets the streak. Any non-negative outcome clears the URL and
+    host entries. Failures on our side (`remote=False`, e.g. a full disk) are ignored:
+    they say nothing about the host.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        *,
+        ttls_seconds: tuple[int, ...] = DEFAULT_TTLS_SECONDS,
+        host_failure_threshold: int = 5,
+        host_ttl_max_seconds: int = DEFAULT_HOST_TTL_MAX_SECONDS,
+        wal: bool = True,
+    ) -> None:
+        self.db_path = db_path
+        self.ttls_seconds = tuple(int(t) for t in ttls_seconds) or DEFAULT_TTLS_SECONDS
+        self.host_failure_threshold = max(1, int(host_failure_threshold))
+        self.host_ttl_max_seconds = max(1, int(host_ttl_max_seconds))
+        self._host_streak: dict[str, int] = {}
+        self.conn = connect(self.db_path, wal=wal)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS negative_urls (
+                url TEXT PRIMARY KEY,
+                failures INTEGER NOT NULL,
+                reason TEXT,
+                expires_at REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS negative_hosts (
+                host TEXT PRIMARY KEY,
+                failures INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """
+        )
+        cutoff = time.time() - _FORGET_AFTER_SECONDS
+        self.conn.execute("DELETE FROM negative_urls WHERE expires_at < ?", (cutoff,))
+        self.conn.execute("DELETE FROM negative_hosts WHERE expires_at < ?", (cutoff,))
+        self.conn.commit()
+
+    def _ttl(self, failures: int) -> int:
+        return self.ttls_seconds[min(failures, len(self.ttls_seconds)) - 1]
+
+    def check(self, cand: Candidate, now: float | None = None) -> str | None:
+        """Return "url" or "host" if the candidate should be skipped, else None."""
+        now = time.time() if now is None else now
+        row = self.conn.execute(
+            "SELECT 1 FROM negative_hosts WHERE host = ? AND expires_at > ?", (_host(cand.url), now)
+        ).fetchone()
+        if row is not None:
+            return "host"
+        row = self.conn.execute(
+            "SELECT 1 FROM negative_urls WHERE url = ? AND expires_at > ?", (canonical_url(cand.url), now)
+        ).fetchone()
+        if row is not None:
+            return "url"
+        return None
+
+    def record(
+        self,
+        cand: Candidate,
+        reason: str,
+        now: float | None = None,
+        *,
+        remote: bool = True,
+        host_fault: bool = False,
+    ) -> None:
+        now = time.time() if now is None else now
+        url = canonical_url(cand.url)
+        host = _host(cand.url)
+
+        if reason in NEUTRAL_REASONS or (reason in NEGATIVE_REASONS and not remote):
+            return
+        if reason not in NEGATIVE_REASONS:
+            self._host_streak[host] = 0
+            with self.conn:
+                self.conn.execute("DELETE FROM negative_urls WHERE url = ?", (url,))
+                self.conn.execute("DELETE FROM negative_hosts WHERE host = ?", (host,))
+            return
+
+        with self.conn:
+            row = self.conn.execute("SELECT failures FROM negative_urls WHERE url = ?", (url,)).fetchone()
+            failures = (int(row[0]) if row else 0) + 1
+            self.conn.execute(
+                """
+                INSERT INTO negative_urls (url, failures, reason, expires_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    failures = excluded.failures, reason = excluded.reason, expires_at = excluded.expires_at
+                """,
+                (url, failures, reason, now + self._ttl(failures)),
+            )
+
+            if not host_fault:
+                self._host_streak[host] = 0
+                return
+            streak = self._host_streak.get(host, 0) + 1
+            self._host_streak[host] = streak
+            if host and streak == self.host_failure_threshold:
+                row = self.conn.execute("SELECT failures FROM negative_hosts WHERE host = ?", (host,)).fetchone()
+                host_failures = (int(row[0]) if row else 0) + 1
+                self.conn.execute(
+                    """
+                    INSERT INTO negative_hosts (host, failures, expires_at) VALUES (?, ?, ?)
+                    ON CONFLICT(host) DO UPDATE SET failures = excluded.failures, expires_at = excluded.expires_at
+                    """,
+                    (host, host_failures, now + min(self._ttl(host_failures), self.host_ttl_max_seconds)),
+                )
+
+    def close(self) -> None:
+        self.conn.close()
@@ -14,6 +14,16 @@ class OrganizeResult:
     targets: list[str]
 
 
+# Every folder classify() can return.
+BUCKETS = (
+    "Organized/Best_Cuts",
+    "Organized/Mobile_Wallpapers",
+    "Organized/Desktop_Wallpapers",
+    "Organized/General_HQ",
+    "Organized/Archive_LowRes",
+)
+
+
 def classify(width: int, height: int, size_bytes: int) -> list[str]:
     """Return subpaths (relative to photo_root) to copy the image into."""
     targets: list[str] = []
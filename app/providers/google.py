@@ -18,9 +18,10 @@ LOGGER = logging.getLogger(__name__)
 class GoogleProvider:
     name = "google"
 
-    def __init__(self, keywords: list[str], max_pages: int = 1):
+    def __init__(self, keywords: list[str], max_pages: int = 1, guard=None):
         self.keywords = keywords
         self.max_pages = max_pages
+        self.guard = guard
 
     async def collect(self, client: httpx.AsyncClient, failed_logger, now_ts: str) -> list[Candidate]:
         candidates: list[Candidate] = []
@@ -37,6 +38,7 @@ class GoogleProvider:
                         retries=3,
                         polite_delay=False,
                         follow_redirects=True,
+                        guard=self.guard,
                     )
                     if resp.status_code != 200:
                         failed_logger.append(
@@ -1,25 +1,62 @@
 from __future__ import annotations
 
+import asyncio
+import html
+import re
 from pathlib import Path
 from urllib.parse import urlparse
 
 import httpx
-from bs4 import BeautifulSoup
 
 from app.http_utils import request_with_retry
 from app.models import Candidate
 
+# og:image lives in <head>; nothing after it is needed (and pages are often several hundred KB).
+_HEAD_END = re.compile(rb"</head\s*>", re.IGNORECASE)
+_META_TAG = re.compile(rb"<meta\b[^>]*>", re.IGNORECASE)
+_ATTR = re.compile(rb"""([\w:-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""")
+
 
 def _is_direct_image_url(url: str) -> bool:
     path = urlparse(url).path.lower()
     return path.endswith((".jpg", ".jpeg", ".png", ".webp", ".gif"))
 
 
+def find_og_image(head: bytes) -> str | None:
+    """`content` of the first <meta property="og:image"> in an HTML fragment."""
+    for tag in _META_TAG.finditer(head):
+        attrs = {name.lower(): a or b or c for name, a, b, c in _ATTR.findall(tag.group(0))}
+        if attrs.get(b"property", b"").strip().lower() == b"og:image" and b"content" in attrs:
+            return html.unescape(attrs[b"content"].decode("utf-8", "replace")).strip()
+    return None
+
+
+async def read_head(resp: httpx.Response, *, max_bytes: int) -> bytes:
+    """Body of a streamed response up to and including `</head>` (or `max_bytes`); the rest is not read."""
+    buf = bytearray()
+    async for chunk in resp.aiter_bytes():
+        # Only rescan the tail that could hold a `</head>` split across chunks.
+        start = max(0, len(buf) - 16)
+        buf += chunk
+        match = _HEAD_END.search(buf, start)
+        if match is not None:
+            return bytes(buf[: match.end()])
+        if len(buf) >= max_bytes:
+            break
+    return bytes(buf[:max_bytes])
+
+
 class InstagramSeedProvider:
     name = "instagram_seed"
 
-    def __init__(self, seed_path: Path) -> None:
+    def __init__(
+        self, seed_path: Path, guard=None, cache=None, *, concurrency: int = 4, max_head_bytes: int = 512 * 1024
+    ) -> None:
         self.seed_path = seed_path
+        self.guard = guard
+        self.cache = cache
+        self.concurrency = max(1, int(concurrency))
+        self.max_head_bytes = int(max_head_bytes)
 
     async def collect(self, client: httpx.AsyncClient, failed_logger, now_ts: str) -> list[Candidate]:
         if not self.seed_path.exists():
@@ -32,22 +69,35 @@ class InstagramSeedProvider:
                 continue
             seeds.append(line)
 
-        candidates: list[Candidate] = []
-        for seed in seeds:
+        # Seeds resolve concurrently (each still with its polite delay); results keep seed order.
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def resolve(seed: str) -> list[Candidate]:
             if _is_direct_image_url(seed):
-                candidates.append(Candidate(url=seed, provider=self.name, source_url=seed))
-                continue
+                return [Candidate(url=seed, provider=self.name, source_url=seed)]
+            if self.cache is not None:
+                cached = self.cache.get(self.name, seed, 0)
+                if cached is not None:
+                    return cached
+            async with limit:
+                return await self._resolve(client, seed, failed_logger, now_ts)
 
-            try:
-                resp = await request_with_retry(
-                    client,
-                    "GET",
-                    seed,
-                    retries=3,
-                    polite_delay=True,
-                    follow_redirects=True,
-                )
+        results = await asyncio.gather(*(resolve(seed) for seed in seeds))
+        return [c for found in results for c in found]
 
+    async def _resolve(self, client: httpx.AsyncClient, seed: str, failed_logger, now_ts: str) -> list[Candidate]:
+        try:
+            resp = await request_with_retry(
+                client,
+                "GET",
+                seed,
+                retries=3,
+                polite_delay=True,
+                stream=True,
+                follow_redirects=True,
+                guard=self.guard,
+            )
+            try:
                 if resp.status_code in {401, 403, 429}:
                     failed_logger.append(
                         {
@@ -58,33 +108,35 @@ class InstagramSeedProvider:
                             "detail": f"status={resp.status_code}",
                         }
                     )
-                    continue
-
-                html = resp.text
-                soup = BeautifulSoup(html, "lxml")
-                meta = soup.find("meta", attrs={"property": "og:image"})
-                content = meta.get("content") if meta else None
-                if isinstance(content, str) and content.startswith("http"):
-                    candidates.append(Candidate(url=content, provider=self.name, source_url=seed))
-                else:
-                    failed_logger.append(
-                        {
-                            "time_kst": now_ts,
-                            "provider": self.name,
-                            "url": seed,
-                            "reason": "OG_IMAGE_NOT_FOUND",
-                            "detail": "og:image meta를 찾지 못함",
-                        }
-                    )
-            except Exception as exc:  # noqa: BLE001
-                failed_logger.append(
-                    {
-                        "time_kst": now_ts,
-                        "provider": self.name,
-                        "url": seed,
-                        "reason": "DOWNLOAD_FAIL",
-                        "detail": f"error={type(exc).__name__}: {exc}",
-                    }
-                )
-
-        return candidates
+                    return []
+                head = await read_head(resp, max_bytes=self.max_head_bytes)
+            finally:
+                # Closing before the body is fully read drops the connection instead of downloading the rest.
+                await resp.aclose()
+
+            content = find_og_image(head)
+            if isinstance(content, str) and content.startswith("http"):
+                found = Candidate(url=content, provider=self.name, source_url=seed)
+                if self.cache is not None:
+                    self.cache.put(self.name, seed, 0, [found])
+                return [found]
+            failed_logger.append(
+                {
+                    "time_kst": now_ts,
+                    "provider": self.name,
+                    "url": seed,
+                    "reason": "OG_IMAGE_NOT_FOUND",
+                    "detail": "og:image meta를 찾지 못함",
+                }
+            )
+        except Exception as exc:  # noqa: BLE001
+            failed_logger.append(
+                {
+                    "time_kst": now_ts,
+                    "provider": self.name,
+                    "url": seed,
+                    "reason": "DOWNLOAD_FAIL",
+                    "detail": f"error={type(exc).__name__}: {exc}",
+                }
+            )
+        return []
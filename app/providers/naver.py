@@ -13,9 +13,11 @@ class NaverImageProvider:
     name = "naver"
     endpoint = "https://openapi.naver.com/v1/search/image"
 
-    def __init__(self, display: int = 100, pages: int = 5) -> None:
+    def __init__(self, display: int = 100, pages: int = 5, guard=None, quota=None) -> None:
         self.display = display
         self.pages = pages
+        self.guard = guard
+        self.quota = quota
 
     async def collect(
         self,
@@ -44,36 +46,68 @@ class NaverImageProvider:
             "X-Naver-Client-Secret": client_secret,
         }
 
+        if self.quota is not None:
+            calls = self.quota.plan(keywords, self.pages, display=self.display)
+            if not calls and self.quota.is_exhausted():
+                failed_logger.append(
+                    {
+                        "time_kst": now_ts,
+                        "provider": self.name,
+                        "url": None,
+                        "reason": "NAVER_QUOTA_EXCEEDED",
+                        "detail": "daily quota exhausted; skipped until midnight KST",
+                    }
+                )
+                return []
+        else:
+            calls = [(kw, page) for kw in keywords for page in range(self.pages)]
+
         candidates: list[Candidate] = []
-        for kw in keywords:
-            for page in range(self.pages):
-                start = page * self.display + 1
-                params = {"query": kw, "display": self.display, "start": start, "sort": "sim"}
-                try:
-                    resp = await request_with_retry(
-                        client,
-                        "GET",
-                        self.endpoint,
-                        headers=headers,
-                        params=params,
-                        retries=3,
-                        polite_delay=True,
-                    )
-                    resp.raise_for_status()
-                    data: dict[str, Any] = resp.json()
-                    items = data.get("items", [])
-                    for item in items:
-                        link = item.get("link")
-                        if isinstance(link, str) and link.startswith("http"):
-                            candidates.append(Candidate(url=link, provider=self.name, query=kw))
-                except Exception as exc:  # noqa: BLE001
+        for kw, page in calls:
+            start = page * self.display + 1
+            params = {"query": kw, "display": self.display, "start": start, "sort": "sim"}
+            try:
+                resp = await request_with_retry(
+                    client,
+                    "GET",
+                    self.endpoint,
+                    headers=headers,
+                    params=params,
+                    retries=3,
+                    polite_delay=True,
+                    guard=self.guard,
+                    give_up=self.quota.on_response if self.quota is not None else None,
+                )
+                if self.quota is not None and self.quota.exhausted:
                     failed_logger.append(
                         {
                             "time_kst": now_ts,
                             "provider": self.name,
                             "url": None,
-                            "reason": "DOWNLOAD_FAIL",
-                            "detail": f"query={kw}, start={start}, error={type(exc).__name__}: {exc}",
+                            "reason": "NAVER_QUOTA_EXCEEDED",
+                            "detail": f"query={kw}, start={start}, status={resp.status_code}, body={resp.text[:200]}",
                         }
                     )
+                    break
+                resp.raise_for_status()
+                data: dict[str, Any] = resp.json()
+                items = data.get("items", [])
+                links: list[str] = []
+                for item in items:
+                    link = item.get("link")
+                    if isinstance(link, str) and link.startswith("http"):
+                        links.append(link)
+                        candidates.append(Candidate(url=link, provider=self.name, query=kw))
+                if self.quota is not None:
+                    self.quota.record_call(kw, page, links)
+            except Exception as exc:  # noqa: BLE001
+                failed_logger.append(
+                    {
+                        "time_kst": now_ts,
+                        "provider": self.name,
+                        "url": None,
+                        "reason": "DOWNLOAD_FAIL",
+                        "detail": f"query={kw}, start={start}, error={type(exc).__name__}: {exc}",
+                    }
+                )
         return candidates
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import html
+import re
+from typing import AsyncIterator
+from xml.etree import ElementTree
+
+# <img ... src="..."> inside an item description (already unescaped from the XML once).
+_IMG_SRC = re.compile(r"""<img\b[^>]*?\bsrc\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""", re.IGNORECASE)
+
+# Twitter media size parameter (name=small, name=900x900, ...); name=orig is the original upload.
+_NAME_PARAM = re.compile(r"name=[\w]+")
+
+# Bytes handed to the XML parser at a time when parsing a document already in memory.
+_CHUNK_BYTES = 64 * 1024
+
+
+def image_urls(description: str) -> list[str]:
+    """`src` of every <img> in an HTML description, entity-decoded."""
+    return [html.unescape(a or b or c) for a, b, c in _IMG_SRC.findall(description)]
+
+
+def orig_media_url(url: str) -> str:
+    """Twitter media URL rewritten to ask for the original size (name=orig)."""
+    if not url:
+        return ""
+    if "name=" in url:
+        return _NAME_PARAM.sub("name=orig", url)
+    if "?" not in url:
+        return url + "?name=orig"
+    return url + "&name=orig"
+
+
+class RSSImageParser:
+    """Incremental RSS parser yielding (link, image URLs) per <item>.
+
+    Bytes are fed as they arrive; each finished <item> is read and then dropped from
+    the tree, so memory stays at one item however long the feed is. After `limit`
+    items `done` is set and the rest of the document can be skipped.
+    """
+
+    def __init__(self, limit: int | None = None) -> None:
+        self.limit = limit
+        self.items = 0
+        self.done = limit is not None and limit <= 0
+        self._parser = ElementTree.XMLPullParser(events=("start", "end"))
+        self._channel: ElementTree.Element | None = None
+
+    def feed(self, data: bytes) -> list[tuple[str, list[str]]]:
+        if self.done:
+            return []
+        self._parser.feed(data)
+        return self._drain()
+
+    def close(self) -> list[tuple[str, list[str]]]:
+        if self.done:
+            return []
+        self._parser.close()
+        return self._drain()
+
+    def _drain(self) -> list[tuple[str, list[str]]]:
+        out: list[tuple[str, list[str]]] = []
+        for event, elem in self._parser.read_events():
+            if event == "start":
+                if elem.tag == "channel":
+                    self._channel = elem
+                continue
+            if elem.tag != "item":
+                continue
+            out.append((elem.findtext("link") or "", image_urls(elem.findtext("description") or "")))
+            elem.clear()
+            if self._channel is not None:
+                try:
+                    self._channel.remove(elem)
+                except ValueError:
+                    pass  # not a direct child of <channel>; cleared is enough
+            self.items += 1
+            if self.limit is not None and self.items >= self.limit:
+                self.done = True
+                break
+        return out
+
+
+def parse_rss_images(content: bytes, *, limit: int | None = None) -> list[tuple[str, list[str]]]:
+    """(link, image URLs) of the first `limit` items of an RSS document."""
+    parser = RSSImageParser(limit)
+    out: list[tuple[str, list[str]]] = []
+    for start in range(0, len(content), _CHUNK_BYTES):
+        out.extend(parser.feed(content[start : start + _CHUNK_BYTES]))
+        if parser.done:
+            return out
+    out.extend(parser.close())
+    return out
+
+
+async def read_rss_images(
+    chunks: AsyncIterator[bytes], *, limit: int | None = None, first_chunk: bytes = b""
+) -> list[tuple[str, list[str]]]:
+    """Feed a streamed response body through `RSSImageParser`, stopping once `limit` items are parsed.
+
+    `chunks` is e.g. `resp.aiter_bytes()`; `first_chunk` is data the caller already took
+    from it (to sniff the content). Returning early leaves the rest of the body unread,
+    so closing the response drops the connection instead of downloading the whole feed.
+    """
+    parser = RSSImageParser(limit)
+    out = parser.feed(first_chunk) if first_chunk else []
+    if parser.done:
+        return out
+    async for chunk in chunks:
+        out.extend(parser.feed(chunk))
+        if parser.done:
+            return out
+    out.extend(parser.close())
+    return out
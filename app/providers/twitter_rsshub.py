@@ -2,26 +2,13 @@ from __future__ import annotations
 
 import logging
 import os
-import re
-from xml.etree import ElementTree
-
-from bs4 import BeautifulSoup
 
 from app.models import Candidate
+from app.providers.rss import orig_media_url, read_rss_images
 
 LOGGER = logging.getLogger(__name__)
 
 
-def _normalize_media_url(url: str) -> str:
-    if not url:
-        return ""
-    if "name=" in url:
-        return re.sub(r"name=[\w]+", "name=orig", url)
-    if "?" not in url:
-        return url + "?name=orig"
-    return url + "&name=orig"
-
-
 class TwitterRSSHubProvider:
     """Twitter keyword search via RSSHub.
 
@@ -33,6 +20,7 @@ class TwitterRSSHubProvider:
     Notes:
       - Twitter routes on RSSHub typically require auth configuration on the RSSHub side.
       - This provider only parses RSS XML and extracts pbs.twimg.com images from item descriptions.
+      - The feed is parsed while it streams in and abandoned after `limit_per_keyword` items.
     """
 
     name = "twitter_rsshub"
@@ -49,36 +37,29 @@ class TwitterRSSHubProvider:
         for kw in self.keywords:
             url = f"{self.base}/twitter/keyword/{kw}"
             try:
-                resp = await client.get(url, follow_redirects=True)
-                if resp.status_code != 200:
-                    LOGGER.warning("RSSHub twitter keyword failed: status=%s url=%s", resp.status_code, url)
-                    try:
-                        failed_logger.append(
-                            {
-                                "time_kst": now_ts,
-                                "provider": self.name,
-                                "url": url,
-                                "reason": "RSSHUB_HTTP",
-                                "detail": f"status={resp.status_code}",
-                            }
-                        )
-                    except Exception:
-                        pass
-                    continue
-
-                root = ElementTree.fromstring(resp.content)
-                items = root.findall(".//item")[: self.limit_per_keyword]
-                for item in items:
-                    desc = item.findtext("description") or ""
-                    link = item.findtext("link") or ""
-                    if not desc:
+                async with client.stream("GET", url, follow_redirects=True) as resp:
+                    if resp.status_code != 200:
+                        LOGGER.warning("RSSHub twitter keyword failed: status=%s url=%s", resp.status_code, url)
+                        try:
+                            failed_logger.append(
+                                {
+                                    "time_kst": now_ts,
+                                    "provider": self.name,
+                                    "url": url,
+                                    "reason": "RSSHUB_HTTP",
+                                    "detail": f"status={resp.status_code}",
+                                }
+                            )
+                        except Exception:
+                            pass
                         continue
-                    soup = BeautifulSoup(desc, "lxml")
-                    for img in soup.find_all("img"):
-                        src = img.get("src") or ""
+                    # Parsed item by item; the rest of the feed is not downloaded once the limit is reached.
+                    items = await read_rss_images(resp.aiter_bytes(), limit=self.limit_per_keyword)
+                for link, srcs in items:
+                    for src in srcs:
                         if "pbs.twimg.com" not in src:
                             continue
-                        src = _normalize_media_url(src)
+                        src = orig_media_url(src)
                         candidates.append(Candidate(url=src, provider=self.name, source_url=link, query=kw))
             except Exception as exc:
                 LOGGER.warning("RSSHub twitter error (%s): %s", kw, exc)
@@ -10,50 +10,166 @@ from app.models import Candidate
 
 
 class WikimediaProvider:
+    """Commons file search, newest uploads first, resumed across runs.
+
+    With a watermark store, each query remembers the newest file it has seen and a
+    continuation token into older results. A run pages through new uploads until it
+    reaches the watermark (at most `new_pages` pages), then fetches `backfill_pages`
+    older pages from where the previous run stopped, so coverage grows run by run
+    without multiplying requests. Without a store it fetches the newest page only.
+    """
+
     name = "wikimedia"
     endpoint = "https://commons.wikimedia.org/w/api.php"
 
+    def __init__(
+        self,
+        guard=None,
+        cache=None,
+        watermarks=None,
+        *,
+        page_size: int = 50,
+        new_pages: int = 3,
+        backfill_pages: int = 1,
+    ) -> None:
+        self.guard = guard
+        self.cache = cache
+        self.watermarks = watermarks
+        self.page_size = page_size
+        self.new_pages = max(1, new_pages)
+        self.backfill_pages = max(0, backfill_pages)
+        self.requests = 0
+
+    async def _search(self, client: httpx.AsyncClient, q: str, cont: dict[str, Any] | None) -> dict[str, Any]:
+        params: dict[str, Any] = {
+            "action": "query",
+            "format": "json",
+            "generator": "search",
+            "gsrsearch": f"filetype:bitmap {q}",
+            "gsrnamespace": 6,
+            "gsrlimit": self.page_size,
+            "gsrsort": "create_timestamp_desc",
+            "prop": "imageinfo",
+            "iiprop": "url|mime|size|timestamp",
+        }
+        if cont:
+            params.update(cont)
+        self.requests += 1
+        resp = await request_with_retry(
+            client,
+            "GET",
+            self.endpoint,
+            params=params,
+            retries=3,
+            polite_delay=True,
+            guard=self.guard,
+        )
+        resp.raise_for_status()
+        return resp.json()
+
+    def _parse(self, data: dict[str, Any], q: str) -> list[tuple[tuple[str, int], Candidate]]:
+        """((upload timestamp, pageid), candidate) for every image in a result page."""
+        pages = (data.get("query") or {}).get("pages") or {}
+        found = []
+        for pageid, page in pages.items():
+            infos = page.get("imageinfo") or []
+            if not infos:
+                continue
+            info = infos[0]
+            url = info.get("url")
+            if isinstance(url, str) and url.startswith("http"):
+                title = page.get("title")
+                source_url = f"https://commons.wikimedia.org/wiki/{quote(title)}" if isinstance(title, str) else None
+                key = (str(info.get("timestamp") or ""), int(page.get("pageid") or pageid))
+                found.append((key, Candidate(url=url, provider=self.name, query=q, source_url=source_url)))
+        return found
+
+    async def _collect_new(
+        self, client: httpx.AsyncClient, q: str, state: dict[str, Any], found: list[Candidate]
+    ) -> dict[str, Any]:
+        """Fetch uploads newer than the watermark; returns the query's state with the new watermark."""
+        mark = tuple(state["newest"]) if state.get("newest") else None
+        newest = mark
+        backfill = state.get("backfill")
+        backfill_done = bool(state.get("backfill_done"))
+
+        # Results are newest first, so stop at the first page reaching the watermark.
+        cont: dict[str, Any] | None = None
+        reached = False
+        new = 0
+        for _ in range(self.new_pages if mark is not None else 1):
+            data = await self._search(client, q, cont)
+            for key, cand in self._parse(data, q):
+                if mark is not None and key <= mark:
+                    reached = True
+                    continue
+                found.append(cand)
+                new += 1
+                newest = key if newest is None else max(newest, key)
+            cont = data.get("continue")
+            if reached or not cont:
+                reached = True
+                break
+        if mark is None:
+            # First run: the backfill starts right after the newest page.
+            backfill, backfill_done = cont, not cont
+        elif not reached:
+            # More new uploads than new_pages could cover: backfill from here to close the gap.
+            backfill, backfill_done = cont, False
+        elif backfill and "gsroffset" in backfill and new:
+            # New uploads pushed the older results down by `new` positions.
+            backfill = {**backfill, "gsroffset": int(backfill["gsroffset"]) + new}
+        return {
+            "newest": list(newest) if newest is not None else None,
+            "backfill": backfill if not backfill_done else None,
+            "backfill_done": backfill_done,
+        }
+
+    async def _collect_backfill(
+        self, client: httpx.AsyncClient, q: str, state: dict[str, Any], found: list[Candidate]
+    ) -> dict[str, Any]:
+        """A few older pages per run, resumed from the saved continuation token."""
+        newest = tuple(state["newest"]) if state.get("newest") else None
+        backfill = state.get("backfill")
+        backfill_done = bool(state.get("backfill_done"))
+        for _ in range(self.backfill_pages):
+            if backfill_done or not backfill:
+                break
+            data = await self._search(client, q, backfill)
+            for key, cand in self._parse(data, q):
+                found.append(cand)
+                newest = key if newest is None else max(newest, key)
+            backfill = data.get("continue")
+            backfill_done = not backfill
+        return {
+            "newest": list(newest) if newest is not None else None,
+            "backfill": backfill if not backfill_done else None,
+            "backfill_done": backfill_done,
+        }
+
     async def collect(self, client: httpx.AsyncClient, failed_logger, now_ts: str) -> list[Candidate]:
         queries = ["Go Yoon-jung", "고윤정"]
         candidates: list[Candidate] = []
 
         for q in queries:
-            params = {
-                "action": "query",
-                "format": "json",
-                "generator": "search",
-                "gsrsearch": f"filetype:bitmap {q}",
-                "gsrnamespace": 6,
-                "gsrlimit": 50,
-                "prop": "imageinfo",
-                "iiprop": "url|mime|size",
-            }
+            found: list[Candidate] = []
             try:
-                resp = await request_with_retry(
-                    client,
-                    "GET",
-                    self.endpoint,
-                    params=params,
-                    retries=3,
-                    polite_delay=True,
-                )
-                resp.raise_for_status()
-                data: dict[str, Any] = resp.json()
-                pages = (data.get("query") or {}).get("pages") or {}
-                for _, page in pages.items():
-                    infos = page.get("imageinfo") or []
-                    if not infos:
-                        continue
-                    info = infos[0]
-                    url = info.get("url")
-                    if isinstance(url, str) and url.startswith("http"):
-                        title = page.get("title")
-                        source_url = (
-                            f"https://commons.wikimedia.org/wiki/{quote(title)}" if isinstance(title, str) else None
-                        )
-                        candidates.append(
-                            Candidate(url=url, provider=self.name, query=q, source_url=source_url)
-                        )
+                state = self.watermarks.get(self.name, q) if self.watermarks is not None else {}
+                # The discovery cache holds only the new-uploads part: the run that cached it also
+                # moved the watermark, so a hit skips straight to the backfill, which keeps going
+                # from the saved continuation token every run.
+                cached = self.cache.get(self.name, q, 0) if self.cache is not None else None
+                if cached is not None:
+                    found.extend(cached)
+                    fresh = None
+                else:
+                    state = await self._collect_new(client, q, state, found)
+                    fresh = list(found)
+                state = await self._collect_backfill(client, q, state, found)
+                if self.watermarks is not None:
+                    self.watermarks.put(self.name, q, state)
+                if self.cache is not None and fresh is not None:
+                    self.cache.put(self.name, q, 0, fresh)
             except Exception as exc:  # noqa: BLE001
                 failed_logger.append(
                     {
@@ -64,4 +180,6 @@ class WikimediaProvider:
                         "detail": f"query={q}, error={type(exc).__name__}: {exc}",
                     }
                 )
+            # Pages fetched before a failure are still used; the watermark only moves on success.
+            candidates.extend(found)
         return candidates
@@ -1,25 +1,32 @@
-import os
 from pathlib import Path
-from datetime import datetime
+
+from app.catalog import open_catalog
+from app.time_utils import kst_date_str
 
 def generate_report(root_dir):
-    today = datetime.now().strftime('%Y-%m-%d')
+    today = kst_date_str()  # same day boundary as the download folders
     report_path = Path(root_dir) / "reports" / f"Photo_Report_{today}.md"
     report_path.parent.mkdir(exist_ok=True)
     
-    # 오늘 날짜 폴더 탐색
-    today_folder = Path(root_dir) / today
-    count = 0
-    if today_folder.exists():
-        count = sum(1 for _ in today_folder.rglob('*') if _.is_file())
-        
-    organized_dir = Path(root_dir) / "Organized"
-    best_cuts = sum(1 for _ in (organized_dir / "Best_Cuts").glob('*') if _.is_file())
+    # 폴더를 훑지 않고 사진 목록(meta/catalog.sqlite)에서 개수를 셈
+    catalog = open_catalog(Path(root_dir))
+    try:
+        count = catalog.count(day=today)
+        best_cuts = catalog.count(bucket="Organized/Best_Cuts")
+        by_provider = catalog.count_by("provider", day=today)
+    finally:
+        catalog.close()
     
     with open(report_path, 'w', encoding='utf-8') as f:
         f.write(f"# 📸 Photo Collection Report ({today})\n\n")
         f.write(f"## 📥 Collection Stats\n")
         f.write(f"- **Total Collected Today:** {count} images\n")
+        for provider, n, _ in by_provider:
+            f.write(f"  - {provider}: {n}\n")
         f.write(f"- **Total Best Cuts (All time):** {best_cuts}\n")
+
+        contact_sheet = report_path.parent / f"Contact_Sheet_{today}.html"
+        if contact_sheet.exists():
+            f.write(f"- **Contact Sheet:** [{contact_sheet.name}]({contact_sheet.name})\n")
         
     return str(report_path)
@@ -2,19 +2,34 @@ from __future__ import annotations
 
 import asyncio
 import json
+import multiprocessing
+import sqlite3
+import time
+import zlib
 from collections import Counter
-from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
 from pathlib import Path
 from typing import Any
+from urllib.parse import urlparse
 
 import httpx
 
+from app.catalog import ItemCatalog, open_catalog
+from app.concurrency import AIMDController
 from app.config import RunConfig
+from app.coordination import CoordinationBackend, LeasedFrontier, default_node_id, default_run_id, open_backend
 from app.dedup import DedupStore
-from app.downloader import ImageDownloader
-from app.http_utils import DEFAULT_HEADERS
+from app.discovery_cache import DiscoveryCache
+from app.downloader import PIPELINE_STAGES, ImageDownloader, merge_pipeline_stats
+from app.http_utils import DEFAULT_HEADERS, STATE_CLOSED, RequestGuard, RetryBudget
 from app.jsonl_logger import JsonlLogger
+from app.log_segments import rotate
+from app.loop_watchdog import LoopWatchdog, merge_stall_stats
+from app.memory import MemoryMonitor
 from app.models import Candidate
+from app.naver_quota import NaverQuota
+from app.negative_cache import NegativeCache
 from app.paths import get_photo_root
 from app.providers.google import GoogleProvider
 from app.providers.instagram_seed import InstagramSeedProvider
@@ -25,6 +40,11 @@ from app.providers.twitter_rsshub import TwitterRSSHubProvider
 from app.providers.wikimedia import WikimediaProvider
 from app.time_utils import kst_date_str, kst_timestamp_str
 from app.smart_dedup import SmartDedupStore
+from app.thumbnails import ThumbnailCache, ThumbnailPool
+from app.tracing import Tracer, activate, deactivate, trace_path, tracer
+from app.watermarks import WatermarkStore
+from app.work_queue import WorkQueue
+from app.yield_stats import YieldStatsStore
 
 EXIT_OK = 0
 EXIT_DEGRADED = 1
@@ -41,6 +61,19 @@ class RunReport:
     counts: Counter
     provider_ok: dict[str, int]
     failures_by_reason: dict[str, int]
+    resumed: bool = False
+    concurrency_trajectory: list[dict[str, Any]] = field(default_factory=list)
+    negative_cache_skips: dict[str, int] = field(default_factory=dict)
+    http_stats: dict[str, Any] = field(default_factory=dict)
+    processes: int = 1
+    coordination: dict[str, Any] = field(default_factory=dict)
+    discovery_cache: dict[str, dict[str, int]] = field(default_factory=dict)
+    naver_quota: dict[str, Any] = field(default_factory=dict)
+    trace_file: str = ""
+    trace_events: int = 0
+    loop_stalls: dict[str, Any] = field(default_factory=dict)
+    memory: dict[str, Any] = field(default_factory=dict)
+    pipeline: dict[str, Any] = field(default_factory=dict)
 
     @property
     def ok_count(self) -> int:
@@ -61,16 +94,53 @@ class MetricsFailedLogger:
         self.base.append(data)
 
 
-def _build_provider_tasks(config: RunConfig, project_root: Path) -> list[tuple[str, Any]]:
+def _build_provider_tasks(
+    config: RunConfig,
+    project_root: Path,
+    *,
+    guard: RequestGuard | None = None,
+    discovery_cache: DiscoveryCache | None = None,
+    naver_quota: NaverQuota | None = None,
+    watermarks: WatermarkStore | None = None,
+) -> list[tuple[str, Any]]:
     tasks: list[tuple[str, Any]] = []
     if "naver" in config.providers:
-        tasks.append(("naver", NaverImageProvider(display=config.naver_display, pages=config.naver_pages)))
+        tasks.append(
+            (
+                "naver",
+                NaverImageProvider(
+                    display=config.naver_display, pages=config.naver_pages, guard=guard, quota=naver_quota
+                ),
+            )
+        )
     if "wikimedia" in config.providers:
-        tasks.append(("wikimedia", WikimediaProvider()))
+        tasks.append(
+            (
+                "wikimedia",
+                WikimediaProvider(
+                    guard=guard,
+                    cache=discovery_cache,
+                    watermarks=watermarks,
+                    new_pages=config.wikimedia_new_pages,
+                    backfill_pages=config.wikimedia_backfill_pages,
+                ),
+            )
+        )
     if "instagram_seed" in config.providers:
-        tasks.append(("instagram_seed", InstagramSeedProvider(project_root / "seeds" / "instagram_urls.txt")))
+        tasks.append(
+            (
+                "instagram_seed",
+                InstagramSeedProvider(
+                    project_root / "seeds" / "instagram_urls.txt",
+                    guard=guard,
+                    cache=discovery_cache,
+                    concurrency=config.instagram_seed_concurrency,
+                    max_head_bytes=config.instagram_head_max_kb * 1024,
+                ),
+            )
+        )
     if "google" in config.providers:
-        tasks.append(("google", GoogleProvider(config.keywords, max_pages=config.google_max_pages)))
+        tasks.append(("google", GoogleProvider(config.keywords, max_pages=config.google_max_pages, guard=guard)))
     if "twitter_rss" in config.providers:
         tasks.append(("twitter_rss", TwitterRSSProvider()))
     if "twitter_snscrape" in config.providers:
@@ -90,9 +160,13 @@ async def _collect_with_isolation(
     run_ts: str,
 ) -> list[Candidate]:
     try:
-        if provider_name == "naver":
-            return await provider.collect(client, config.keywords, failed_logger=failed_logger, now_ts=run_ts)
-        return await provider.collect(client, failed_logger=failed_logger, now_ts=run_ts)
+        with tracer().span("provider_query", "discovery", provider=provider_name) as span:
+            if provider_name == "naver":
+                found = await provider.collect(client, config.keywords, failed_logger=failed_logger, now_ts=run_ts)
+            else:
+                found = await provider.collect(client, failed_logger=failed_logger, now_ts=run_ts)
+            span["candidates"] = len(found)
+        return found
     except Exception as exc:  # noqa: BLE001
         failed_logger.append(
             {
@@ -110,6 +184,8 @@ def _build_summary(report: RunReport) -> list[str]:
     lines = [
         f"--- Batch Summary [{report.run_ts}] ---",
         f"dry_run: {report.dry_run}",
+        f"resumed: {report.resumed}",
+        f"processes: {report.processes}",
         f"providers: {','.join(report.providers)}",
         f"candidates_total: {report.candidates_total}",
         f"unique_urls: {report.unique_urls}",
@@ -119,6 +195,14 @@ def _build_summary(report: RunReport) -> list[str]:
         f"NOT_IMAGE: {report.counts['NOT_IMAGE']}",
         f"IMAGE_DECODE_FAIL: {report.counts['IMAGE_DECODE_FAIL']}",
         f"DOWNLOAD_FAIL: {report.counts['DOWNLOAD_FAIL']}",
+        f"CIRCUIT_OPEN_SKIP: {report.counts['CIRCUIT_OPEN_SKIP']}",
+        f"DEADLINE_DEFERRED: {report.counts['DEADLINE_DEFERRED']}",
+        f"NEGATIVE_CACHE_SKIP: {report.counts['NEGATIVE_CACHE_SKIP']}"
+        + (
+            f" (url={report.negative_cache_skips.get('url', 0)}, host={report.negative_cache_skips.get('host', 0)})"
+            if report.negative_cache_skips
+            else ""
+        ),
         "provider_ok:",
     ]
 
@@ -128,6 +212,84 @@ def _build_summary(report: RunReport) -> list[str]:
     else:
         lines.append("  (no success)")
 
+    by_process: dict[int, list[int]] = {}
+    for point in report.concurrency_trajectory:
+        by_process.setdefault(int(point.get("process", 0)), []).append(point["limit"])
+    for index, limits in sorted(by_process.items()):
+        label = "concurrency" if len(by_process) == 1 else f"concurrency[p{index}]"
+        lines.append(
+            f"{label}: start={limits[0]} final={limits[-1]} min={min(limits)} max={max(limits)} "
+            f"changes={len(limits) - 1}"
+        )
+
+    if report.pipeline:
+        wall = report.pipeline["wall_s"] or 1.0
+        parts = []
+        for stage in PIPELINE_STAGES:
+            st = report.pipeline[stage]
+            busy = st["busy_s"] / (st["workers"] * wall) if st["workers"] else 0.0
+            parts.append(
+                f"{stage} x{st['workers']} items={st['items']} busy={busy:.0%} "
+                f"queue_max={st['queue_max']} wait={st['put_wait_s']:.1f}s"
+            )
+        lines.append("pipeline: " + " | ".join(parts))
+        writer = report.pipeline.get("writer")
+        if writer:
+            mb = writer["bytes"] / (1024 * 1024)
+            rate = mb / writer["busy_s"] if writer["busy_s"] else 0.0
+            lines.append(
+                f"writer: files={writer['files']} copies={writer['copies']} {mb:.1f}MB "
+                f"{rate:.1f}MB/s busy={writer['busy_s']:.1f}s fsync={writer['fsyncs']} "
+                f"batches={writer['batches']} mkdir={writer['mkdirs']}"
+            )
+
+    if report.coordination:
+        lines.append(
+            f"coordination: backend={report.coordination['backend']} node={report.coordination['node_id']} "
+            f"run_id={report.coordination['run_id']} enqueued={report.coordination['enqueued']}"
+        )
+
+    if report.discovery_cache:
+        lines.append(
+            "discovery_cache: "
+            + ", ".join(f"{p} hit={v['hit']} miss={v['miss']}" for p, v in report.discovery_cache.items())
+        )
+
+    if report.naver_quota:
+        q = report.naver_quota
+        lines.append(
+            f"naver_quota: used_today={q['used_today']}/{q['daily_limit']} planned={q['planned']} "
+            f"calls={q['calls']} new_urls={q['new_urls']} exhausted={q['exhausted']}"
+        )
+
+    if report.loop_stalls:
+        st = report.loop_stalls
+        lines.append(
+            f"loop_stalls: count={st['count']} max_ms={st['max_ms']} total_ms={st['total_ms']} "
+            f"(threshold={st['threshold_ms']}ms)"
+        )
+
+    if report.memory:
+        mem = report.memory
+        stages = " ".join(f"{stage}={mb}" for stage, mb in mem["stage_peaks_mb"].items())
+        line = f"memory: peak_rss={mem['peak_rss_mb']}MB ({mem['peak_stage']}) stages_mb: {stages}"
+        if mem.get("process_peaks_mb"):
+            line += f" processes_mb={','.join(str(mb) for mb in mem['process_peaks_mb'])}"
+        lines.append(line)
+        if "traced_peak_mb" in mem:
+            lines.append(f"memory_top (tracemalloc peak={mem['traced_peak_mb']}MB):")
+            for row in mem["top_allocations"][:5]:
+                lines.append(f"  {row['size_mb']}MB x{row['count']} {row['site']}")
+
+    if report.trace_file:
+        lines.append(f"trace: {report.trace_file} events={report.trace_events}")
+
+    if report.http_stats:
+        lines.append(
+            f"http: requests={report.http_stats.get('requests', 0)} retries={report.http_stats.get('retries', 0)} "
+            f"open_circuits={','.join(report.http_stats.get('open_circuits') or []) or '(none)'}"
+        )
+
     lines.append("failures_by_reason:")
     if report.failures_by_reason:
         for reason, value in sorted(report.failures_by_reason.items()):
@@ -155,11 +317,22 @@ def _write_status(root: Path, report: RunReport, exit_code: int) -> None:
         "last_ok_count": report.ok_count,
         "last_exit_code": exit_code,
         "dry_run": report.dry_run,
+        "resumed": report.resumed,
+        "processes": report.processes,
         "providers": report.providers,
         "candidates_total": report.candidates_total,
         "unique_urls": report.unique_urls,
         "counts": dict(report.counts),
         "failures_by_reason": report.failures_by_reason,
+        "concurrency_trajectory": report.concurrency_trajectory,
+        "negative_cache_skips": report.negative_cache_skips,
+        "http_stats": report.http_stats,
+        "coordination": report.coordination,
+        "discovery_cache": report.discovery_cache,
+        "naver_quota": report.naver_quota,
+        "loop_stalls": report.loop_stalls,
+        "memory": report.memory,
+        "pipeline": report.pipeline,
         "consecutive_error": consecutive_error,
         "consecutive_degraded": consecutive_degraded,
         "min_short_side_px": report.counts.get("_min_short_side_px") or None,
@@ -178,74 +351,783 @@ def read_status() -> dict[str, Any] | None:
         return None
 
 
-async def run_once(config: RunConfig, project_root: Path) -> RunReport:
-    root = get_photo_root()
-    (root / "meta").mkdir(parents=True, exist_ok=True)
-    (root / "logs").mkdir(parents=True, exist_ok=True)
-
-    run_ts = kst_timestamp_str()
+async def _discover(
+    config: RunConfig,
+    project_root: Path,
+    *,
+    client: httpx.AsyncClient,
+    guard: RequestGuard,
+    failed_logger: MetricsFailedLogger,
+    run_ts: str,
+    timeout: float | None,
+    discovery_cache: DiscoveryCache | None = None,
+    naver_quota: NaverQuota | None = None,
+    watermarks: WatermarkStore | None = None,
+) -> list[Candidate]:
+    # Collect providers concurrently (isolation keeps failures local)
+    tasks: dict[asyncio.Task, str] = {}
+    providers = _build_provider_tasks(
+        config,
+        project_root,
+        guard=guard,
+        discovery_cache=discovery_cache,
+        naver_quota=naver_quota,
+        watermarks=watermarks,
+    )
+    for provider_name, provider in providers:
+        task = asyncio.create_task(
+            _collect_with_isolation(
+                provider_name,
+                provider,
+                client=client,
+                config=config,
+                failed_logger=failed_logger,
+                run_ts=run_ts,
+            ),
+            name=f"provider:{provider_name}",
+        )
+        tasks[task] = provider_name
+    if not tasks:
+        return []
 
-    items_logger = JsonlLogger(root / "meta" / "items.jsonl")
-    failed_logger = MetricsFailedLogger(JsonlLogger(root / "meta" / "failed.jsonl"))
-    dedup_store = DedupStore(root / "meta" / "dedup.sqlite")
-    smart_dedup = SmartDedupStore(str(root / "meta" / "smart_dedup.pkl"))
+    _, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        task.cancel()
+        failed_logger.append(
+            {
+                "time_kst": run_ts,
+                "provider": tasks[task],
+                "url": None,
+                "reason": "PROVIDER_DEADLINE",
+                "detail": f"discovery budget exhausted after {timeout:.0f}s",
+            }
+        )
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
 
     candidates: list[Candidate] = []
+    for task in tasks:
+        if task not in pending:
+            candidates.extend(task.result())
+    return candidates
+
+
+def _new_guard(config: RunConfig, failed_logger: MetricsFailedLogger) -> RequestGuard:
+    return RequestGuard(
+        failed_logger,
+        failure_threshold=config.circuit_failure_threshold,
+        cooldown_seconds=config.circuit_cooldown_seconds,
+        retry_budget=RetryBudget(ratio=config.retry_budget_ratio, min_retries=config.retry_budget_min),
+    )
+
+
+def _http_stats(guard: RequestGuard) -> dict[str, Any]:
+    return {
+        "requests": guard.retry_budget.requests,
+        "retries": guard.retry_budget.retries,
+        "open_circuits": sorted(h for h, b in guard.breakers.items() if b.state != STATE_CLOSED),
+    }
+
+
+def _start_watchdog(config: RunConfig, root: Path) -> LoopWatchdog | None:
+    if not config.loop_watchdog:
+        return None
+    watchdog = LoopWatchdog(root / "meta" / "loop_stalls.jsonl", threshold_s=config.loop_stall_threshold_ms / 1000)
+    watchdog.start()
+    return watchdog
+
+
+async def _stop_watchdog(watchdog: LoopWatchdog | None) -> dict[str, Any]:
+    if watchdog is None:
+        return {}
+    await watchdog.stop()
+    return watchdog.stats()
+
+
+def _start_memory_monitor(config: RunConfig) -> MemoryMonitor | None:
+    if not config.memory_sampling:
+        return None
+    monitor = MemoryMonitor(
+        interval_s=config.memory_sample_interval_s,
+        trace_memory=config.trace_memory,
+        top_n=config.trace_memory_top,
+    )
+    monitor.start()
+    return monitor
+
+
+def _stop_memory_monitor(monitor: MemoryMonitor | None) -> dict[str, Any]:
+    if monitor is None:
+        return {}
+    monitor.stop()
+    try:
+        return monitor.stats() if monitor.samples else {}  # no RSS source on this platform
+    finally:
+        monitor.close()
+
+
+def _sqlite_wal(config: RunConfig) -> bool:
+    """WAL needs shared memory, so a photo root shared by several nodes (coordination) uses a rollback journal."""
+    return not config.coordination
+
+
+def _open_coordination(config: RunConfig, root: Path) -> CoordinationBackend | None:
+    if not config.coordination:
+        return None
+    return open_backend(config.coordination, root, url=config.coordination_url)
+
+
+def _coordination_run_id(config: RunConfig) -> str:
+    return config.coordination_run_id or default_run_id(config.coordination_cycle_hours)
+
+
+@dataclass
+class DownloadResult:
+    counts: Counter
+    provider_ok: dict[str, int]
+    concurrency_trajectory: list[dict[str, Any]]
+    trace_events: list[dict[str, Any]] = field(default_factory=list)
+    loop_stalls: dict[str, Any] = field(default_factory=dict)
+    process_peaks_mb: list[float] = field(default_factory=list)
+    pipeline: dict[str, Any] = field(default_factory=dict)
+
+
+async def _download_partition(
+    config: RunConfig,
+    root: Path,
+    candidates: list[Candidate],
+    *,
+    client: httpx.AsyncClient,
+    guard: RequestGuard,
+    items_logger: JsonlLogger,
+    failed_logger: MetricsFailedLogger,
+    deadline: float | None,
+    frontier: WorkQueue | None = None,
+) -> DownloadResult:
+    """Download one set of candidates with its own downloader and store handles.
+
+    Used directly for single-process runs and inside each worker process with --processes.
+    A single-process run passes its already open `frontier`; worker processes open their own.
+    With a coordination backend, `candidates` is ignored: batches are leased from the shared
+    queue until it is empty, and the dedup indexes come from the backend.
+    """
+    backend = _open_coordination(config, root)
+    wal = _sqlite_wal(config)
+    own_frontier: WorkQueue | None = None
+    leases: Any = frontier
+    if backend is not None:
+        dedup_store = backend.dedup_store()
+        smart_dedup = backend.smart_dedup()
+        leases = LeasedFrontier(backend, _coordination_run_id(config))
+    else:
+        dedup_store = DedupStore(root / "meta" / "dedup.sqlite")
+        smart_dedup = SmartDedupStore(str(root / "meta" / "smart_dedup.pkl"))
+        if frontier is None:
+            leases = own_frontier = WorkQueue(
+                root / "meta" / "frontier.sqlite", lease_seconds=config.frontier_lease_seconds
+            )
+    negative_cache: NegativeCache | None = None
+    if config.negative_cache:
+        negative_cache = NegativeCache(
+            root / "meta" / "negative_cache.sqlite",
+            ttls_seconds=config.negative_cache_ttls_seconds,
+            host_failure_threshold=config.negative_cache_host_failure_threshold,
+            host_ttl_max_seconds=config.negative_cache_host_ttl_max_seconds,
+            wal=wal,
+        )
+    yield_stats: YieldStatsStore | None = None
+    if config.priority_scheduling:
+        yield_stats = YieldStatsStore(
+            root / "meta" / "yield_stats.sqlite",
+            weights=config.priority_weights,
+            prior_strength=config.priority_prior_strength,
+            wal=wal,
+        )
+        yield_stats.load()
+    thumbnails: ThumbnailPool | None = None
+    if config.thumbnails:
+        thumbnails = ThumbnailPool(
+            ThumbnailCache(root / "meta" / "thumbs", max_bytes=config.thumbnail_cache_mb * 1024 * 1024, wal=wal),
+            workers=config.thumbnail_workers,
+        )
+    catalog: ItemCatalog | None = None
+    if config.item_catalog:
+        catalog = ItemCatalog(root / "meta" / "catalog.sqlite", wal=wal)
+    concurrency: AIMDController | None = None
+    if config.adaptive_concurrency:
+        concurrency = AIMDController(
+            initial=config.initial_workers,
+            min_limit=config.min_workers,
+            max_limit=config.max_workers,
+        )
+
+    try:
+        downloader = ImageDownloader(
+            root=root,
+            dedup_store=dedup_store,
+            smart_dedup=smart_dedup,
+            items_logger=items_logger,
+            failed_logger=failed_logger,
+            min_short_side_px=config.min_short_side_px,
+            inflight_byte_budget=config.inflight_byte_budget_mb * 1024 * 1024,
+            max_image_bytes=config.max_image_mb * 1024 * 1024,
+            concurrency=concurrency,
+            yield_stats=yield_stats,
+            negative_cache=negative_cache,
+            guard=guard,
+            thumbnails=thumbnails,
+            process_workers=config.process_workers,
+            stage_queue_size=config.stage_queue_size,
+            durable_writes=config.durable_writes,
+            write_batch_size=config.write_batch_size,
+            catalog=catalog,
+        )
+        pipeline: dict[str, Any] = {}
+        schedule_deadline = deadline - config.deadline_drain_seconds if deadline is not None else None
+        if backend is None:
+            counts, provider_ok = await downloader.process_candidates(
+                client,
+                candidates,
+                workers=config.initial_workers,
+                frontier=leases,
+                deadline=schedule_deadline,
+                drain_seconds=config.deadline_drain_seconds,
+            )
+            pipeline = downloader.pipeline_stats
+        else:
+            counts, provider_ok = Counter(), {}
+            node_id = config.node_id or default_node_id()
+            while schedule_deadline is None or time.monotonic() < schedule_deadline:
+                batch = backend.lease(
+                    leases.run_id, node_id, config.coordination_batch_size, config.frontier_lease_seconds
+                )
+                if not batch:
+                    break
+                batch_counts, batch_ok = await downloader.process_candidates(
+                    client,
+                    batch,
+                    workers=config.initial_workers,
+                    frontier=leases,
+                    deadline=schedule_deadline,
+                    drain_seconds=config.deadline_drain_seconds,
+                )
+                counts.update(batch_counts)
+                pipeline = merge_pipeline_stats(pipeline, downloader.pipeline_stats)
+                for provider, n in batch_ok.items():
+                    provider_ok[provider] = provider_ok.get(provider, 0) + n
+                if batch_counts.get("DEADLINE_DEFERRED"):
+                    # Deferred items stay leased and return to the queue when the lease expires.
+                    break
+    finally:
+        if thumbnails is not None:
+            thumbnails.close()
+        if catalog is not None:
+            catalog.close()
+        if yield_stats is not None:
+            yield_stats.close()
+        if negative_cache is not None:
+            negative_cache.close()
+        if backend is not None:
+            backend.close()
+        if own_frontier is not None:
+            own_frontier.close()
+        dedup_store.close()
+        # smart_dedup persists every update under its inter-process lock; no unlocked final save,
+        # which could overwrite entries written meanwhile by other --processes workers.
+
+    return DownloadResult(
+        counts=counts,
+        provider_ok=provider_ok,
+        concurrency_trajectory=list(concurrency.trajectory) if concurrency is not None else [],
+        pipeline=pipeline,
+    )
+
+
+def _rotate_logs(config: RunConfig, root: Path) -> None:
+    """Move a too big / too old items.jsonl or failed.jsonl into a compressed segment."""
+    meta = root / "meta"
+    for log in ("items", "failed"):
+        try:
+            if log == "items" and config.item_catalog:
+                # The catalog reads items.jsonl by offset; let it catch up before the file moves.
+                open_catalog(root, wal=_sqlite_wal(config)).close()
+            segment = rotate(
+                meta,
+                log,
+                max_bytes=config.log_rotate_mb * 1024 * 1024,
+                max_age_days=config.log_rotate_days,
+                codec=config.log_compression,
+                wal=_sqlite_wal(config),
+            )
+        except (OSError, sqlite3.Error) as exc:
+            print(f"[Collector] Log rotation skipped for {log}.jsonl: {type(exc).__name__}: {exc}")
+            continue
+        if segment is not None:
+            print(f"[Collector] Rotated {log}.jsonl: lines={segment.lines} -> {segment.path.name}")
+
+
+def _partition_by_host(candidates: list[Candidate], n: int) -> list[list[Candidate]]:
+    """Split candidates into n groups; a host always lands in the same group (connection reuse)."""
+    parts: list[list[Candidate]] = [[] for _ in range(n)]
+    for cand in candidates:
+        host = (urlparse(cand.url).hostname or "").lower()
+        parts[zlib.crc32(host.encode("utf-8")) % n].append(cand)
+    return parts
+
 
-    async with httpx.AsyncClient(timeout=25.0, headers=DEFAULT_HEADERS) as client:
-        # Collect providers concurrently (isolation keeps failures local)
-        tasks = []
-        for provider_name, provider in _build_provider_tasks(config, project_root):
-            tasks.append(
-                _collect_with_isolation(
-                    provider_name,
-                    provider,
+def _download_process_main(
+    config: RunConfig,
+    root: str,
+    candidates: list[Candidate],
+    seconds_left: float | None,
+    index: int,
+) -> dict[str, Any]:
+    """Entry point of one --processes worker. Returns plain data for the parent to merge."""
+
+    async def _main() -> dict[str, Any]:
+        deadline = time.monotonic() + seconds_left if seconds_left is not None else None
+        trace = Tracer() if config.trace else None
+        if trace is not None:
+            activate(trace)
+        photo_root = Path(root)
+        failed_logger = MetricsFailedLogger(JsonlLogger(photo_root / "meta" / "failed.jsonl"))
+        guard = _new_guard(config, failed_logger)
+        watchdog: LoopWatchdog | None = None
+        memory: MemoryMonitor | None = None
+        try:
+            watchdog = _start_watchdog(config, photo_root)
+            memory = _start_memory_monitor(config)
+            async with httpx.AsyncClient(timeout=25.0, headers=DEFAULT_HEADERS) as client:
+                result = await _download_partition(
+                    config,
+                    photo_root,
+                    candidates,
                     client=client,
-                    config=config,
+                    guard=guard,
+                    items_logger=JsonlLogger(photo_root / "meta" / "items.jsonl"),
                     failed_logger=failed_logger,
-                    run_ts=run_ts,
+                    deadline=deadline,
                 )
+        finally:
+            loop_stalls = await _stop_watchdog(watchdog)
+            memory_stats = _stop_memory_monitor(memory)
+        return {
+            "counts": dict(result.counts),
+            "provider_ok": result.provider_ok,
+            "failures_by_reason": dict(failed_logger.failures_by_reason),
+            "concurrency_trajectory": [dict(point, process=index) for point in result.concurrency_trajectory],
+            "pipeline": result.pipeline,
+            "http_stats": _http_stats(guard),
+            "trace_events": trace.events if trace is not None else [],
+            "loop_stalls": loop_stalls,
+            "memory": memory_stats,
+        }
+
+    return asyncio.run(_main())
+
+
+async def _download_multiprocess(
+    config: RunConfig,
+    root: Path,
+    candidates: list[Candidate],
+    *,
+    failed_logger: MetricsFailedLogger,
+    deadline: float | None,
+) -> tuple[DownloadResult, dict[str, Any]]:
+    if config.coordination:
+        # Every worker leases from the shared queue itself.
+        parts: list[list[Candidate]] = [[] for _ in range(config.processes)]
+    else:
+        parts = [part for part in _partition_by_host(candidates, config.processes) if part]
+    seconds_left = deadline - time.monotonic() if deadline is not None else None
+    loop = asyncio.get_running_loop()
+    # spawn: children must not inherit the parent's event loop or open SQLite handles.
+    with ProcessPoolExecutor(max_workers=len(parts) or 1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        results = await asyncio.gather(
+            *(
+                loop.run_in_executor(pool, _download_process_main, config, str(root), part, seconds_left, index)
+                for index, part in enumerate(parts)
+            )
+        )
+
+    merged = DownloadResult(counts=Counter(), provider_ok={}, concurrency_trajectory=[])
+    http_stats: dict[str, Any] = {"requests": 0, "retries": 0, "open_circuits": []}
+    for res in results:
+        merged.counts.update(res["counts"])
+        for provider, n in res["provider_ok"].items():
+            merged.provider_ok[provider] = merged.provider_ok.get(provider, 0) + n
+        failed_logger.failures_by_reason.update(res["failures_by_reason"])
+        merged.concurrency_trajectory.extend(res["concurrency_trajectory"])
+        merged.trace_events.extend(res["trace_events"])
+        merged.pipeline = merge_pipeline_stats(merged.pipeline, res["pipeline"])
+        merged.loop_stalls = merge_stall_stats(merged.loop_stalls, res["loop_stalls"])
+        if res["memory"]:
+            merged.process_peaks_mb.append(res["memory"]["peak_rss_mb"])
+        http_stats["requests"] += res["http_stats"]["requests"]
+        http_stats["retries"] += res["http_stats"]["retries"]
+        http_stats["open_circuits"] = sorted(set(http_stats["open_circuits"]) | set(res["http_stats"]["open_circuits"]))
+    return merged, http_stats
+
+
+@dataclass
+class _Collected:
+    """What one run found and downloaded (everything the report needs besides the monitors)."""
+
+    candidates_total: int = 0
+    unique_urls: int = 0
+    resumed: bool = False
+    result: DownloadResult = field(
+        default_factory=lambda: DownloadResult(counts=Counter(), provider_ok={}, concurrency_trajectory=[])
+    )
+    http_stats: dict[str, Any] = field(default_factory=dict)
+    negative_skips: Counter = field(default_factory=Counter)
+    coordination: dict[str, Any] = field(default_factory=dict)
+    discovery_cache: dict[str, dict[str, int]] = field(default_factory=dict)
+    naver_quota: dict[str, Any] = field(default_factory=dict)
+
+
+async def _run_discovery(
+    config: RunConfig,
+    project_root: Path,
+    root: Path,
+    collected: _Collected,
+    *,
+    client: httpx.AsyncClient,
+    guard: RequestGuard,
+    failed_logger: MetricsFailedLogger,
+    run_ts: str,
+    timeout: float | None,
+) -> list[Candidate]:
+    """Ask every provider for candidates, with the discovery-side caches and quota open meanwhile."""
+    wal = _sqlite_wal(config)
+    discovery_cache: DiscoveryCache | None = None
+    if config.discovery_cache:
+        discovery_cache = DiscoveryCache(
+            root / "meta" / "discovery_cache.sqlite",
+            ttls_seconds=config.discovery_cache_ttl_seconds,
+            wal=wal,
+        )
+    naver_quota: NaverQuota | None = None
+    query_yield: YieldStatsStore | None = None
+    if config.naver_quota and "naver" in config.providers:
+        query_yield = YieldStatsStore(root / "meta" / "yield_stats.sqlite", wal=wal)
+        query_yield.load()
+        naver_quota = NaverQuota(
+            root / "meta" / "naver_quota.sqlite",
+            daily_limit=config.naver_daily_quota,
+            run_interval_hours=config.naver_run_interval_hours,
+            seen_ttl_days=config.naver_seen_days,
+            ok_rate=lambda kw: query_yield.rate("query", f"naver:{kw}"),
+            wal=wal,
+        )
+    watermarks: WatermarkStore | None = None
+    if config.wikimedia_incremental and "wikimedia" in config.providers:
+        watermarks = WatermarkStore(root / "meta" / "discovery_watermarks.sqlite", wal=wal)
+    try:
+        with tracer().span("discovery"):
+            return await _discover(
+                config,
+                project_root,
+                client=client,
+                guard=guard,
+                failed_logger=failed_logger,
+                run_ts=run_ts,
+                timeout=timeout,
+                discovery_cache=discovery_cache,
+                naver_quota=naver_quota,
+                watermarks=watermarks,
             )
+    finally:
+        if discovery_cache is not None:
+            collected.discovery_cache = discovery_cache.stats()
+            discovery_cache.close()
+        if naver_quota is not None:
+            collected.naver_quota = naver_quota.stats()
+            naver_quota.close()
+        if query_yield is not None:
+            query_yield.close()
+        if watermarks is not None:
+            watermarks.close()
 
-        results = await asyncio.gather(*tasks)
-        for provider_candidates in results:
-            candidates.extend(provider_candidates)
 
-        candidate_total = len(candidates)
-        unique_by_url: dict[str, Candidate] = {}
+def _skip_negative(config: RunConfig, root: Path, candidates: list[Candidate], skips: Counter) -> list[Candidate]:
+    """Candidates whose URL/host is not in the negative cache; skipped ones are counted by kind."""
+    if not config.negative_cache:
+        return candidates
+    negative_cache = NegativeCache(
+        root / "meta" / "negative_cache.sqlite",
+        ttls_seconds=config.negative_cache_ttls_seconds,
+        host_failure_threshold=config.negative_cache_host_failure_threshold,
+        host_ttl_max_seconds=config.negative_cache_host_ttl_max_seconds,
+        wal=_sqlite_wal(config),
+    )
+    queued = []
+    try:
         for cand in candidates:
-            unique_by_url[cand.url] = cand
+            kind = negative_cache.check(cand)
+            if kind is None:
+                queued.append(cand)
+            else:
+                skips[kind] += 1
+    finally:
+        negative_cache.close()
+    return queued
 
-        unique_candidates = list(unique_by_url.values())
-        unique_urls = len(unique_candidates)
 
-        counts: Counter = Counter()
-        provider_ok: dict[str, int] = {}
+def _enqueue_shared(config: RunConfig, root: Path, queued: list[Candidate]) -> dict[str, Any]:
+    """Put this node's candidates on the shared queue; those other nodes already enqueued for the run are skipped."""
+    backend = _open_coordination(config, root)
+    if backend is None:
+        return {}
+    try:
+        coordination = {
+            "backend": config.coordination,
+            "node_id": config.node_id or default_node_id(),
+            "run_id": _coordination_run_id(config),
+        }
+        coordination["enqueued"] = backend.enqueue(coordination["run_id"], queued)
+    finally:
+        backend.close()
+    return coordination
+
 
-        if config.dry_run:
-            counts["DRY_RUN_SKIPPED"] = unique_urls
+async def _run_downloads(
+    config: RunConfig,
+    root: Path,
+    queued: list[Candidate],
+    collected: _Collected,
+    *,
+    client: httpx.AsyncClient,
+    guard: RequestGuard,
+    items_logger: JsonlLogger,
+    failed_logger: MetricsFailedLogger,
+    deadline: float | None,
+    frontier: WorkQueue | None,
+) -> None:
+    if config.priority_scheduling:
+        yield_stats = YieldStatsStore(root / "meta" / "yield_stats.sqlite", wal=_sqlite_wal(config))
+        try:
+            if yield_stats.is_empty():
+                yield_stats.bootstrap_from_jsonl(root / "meta" / "items.jsonl", root / "meta" / "failed.jsonl")
+        finally:
+            yield_stats.close()
+
+    with tracer().span("download", queued=len(queued)):
+        if config.processes > 1:
+            collected.result, child_http = await _download_multiprocess(
+                config,
+                root,
+                queued,
+                failed_logger=failed_logger,
+                deadline=deadline,
+            )
+            http_stats = _http_stats(guard)
+            http_stats["requests"] += child_http["requests"]
+            http_stats["retries"] += child_http["retries"]
+            http_stats["open_circuits"] = sorted(set(http_stats["open_circuits"]) | set(child_http["open_circuits"]))
+            collected.http_stats = http_stats
         else:
-            downloader = ImageDownloader(
-                root=root,
-                dedup_store=dedup_store,
-                smart_dedup=smart_dedup,
+            collected.result = await _download_partition(
+                config,
+                root,
+                queued,
+                client=client,
+                guard=guard,
                 items_logger=items_logger,
                 failed_logger=failed_logger,
-                min_short_side_px=config.min_short_side_px,
+                deadline=deadline,
+                frontier=frontier,
             )
-            counts, provider_ok = await downloader.process_candidates(
-                client,
-                unique_candidates,
-                workers=config.max_workers,
+            collected.http_stats = _http_stats(guard)
+
+
+async def _collect(
+    config: RunConfig,
+    project_root: Path,
+    root: Path,
+    *,
+    run_ts: str,
+    started: float,
+    deadline: float | None,
+    failed_logger: MetricsFailedLogger,
+    memory: MemoryMonitor | None,
+) -> _Collected:
+    """Discovery (or resume) and downloads of one run."""
+    collected = _Collected()
+    if config.log_rotation:
+        _rotate_logs(config, root)
+    items_logger = JsonlLogger(root / "meta" / "items.jsonl")
+
+    # With coordination the shared backend queue replaces the local frontier.
+    frontier: WorkQueue | None = None
+    if not config.coordination:
+        frontier = WorkQueue(root / "meta" / "frontier.sqlite", lease_seconds=config.frontier_lease_seconds)
+    try:
+        # Resume: continue the previous run's frontier (pending + expired in-flight items)
+        # instead of re-running discovery.
+        resumed_candidates: list[Candidate] = []
+        if config.resume and not config.dry_run and frontier is not None:
+            reclaimed = frontier.reclaim_expired()
+            resumed_candidates = frontier.pending()
+            if resumed_candidates:
+                print(f"[Collector] Resuming frontier: pending={len(resumed_candidates)} reclaimed={reclaimed}")
+        collected.resumed = bool(resumed_candidates)
+
+        guard = _new_guard(config, failed_logger)
+        async with httpx.AsyncClient(timeout=25.0, headers=DEFAULT_HEADERS) as client:
+            if resumed_candidates:
+                candidates = resumed_candidates
+            else:
+                discovery_timeout = None
+                if deadline is not None:
+                    discovery_timeout = max(0.0, (deadline - started) * config.discovery_budget_fraction)
+                if memory is not None:
+                    memory.set_stage("discovery")
+                candidates = await _run_discovery(
+                    config,
+                    project_root,
+                    root,
+                    collected,
+                    client=client,
+                    guard=guard,
+                    failed_logger=failed_logger,
+                    run_ts=run_ts,
+                    timeout=discovery_timeout,
+                )
+
+            collected.http_stats = _http_stats(guard)
+            collected.candidates_total = len(candidates)
+            unique_candidates = list({cand.url: cand for cand in candidates}.values())
+            collected.unique_urls = len(unique_candidates)
+
+            if config.dry_run:
+                collected.result.counts["DRY_RUN_SKIPPED"] = collected.unique_urls
+                return collected
+
+            queued = _skip_negative(config, root, unique_candidates, collected.negative_skips)
+            if config.coordination:
+                collected.coordination = _enqueue_shared(config, root, queued)
+            elif frontier is not None and not resumed_candidates:
+                frontier.reset(queued, run_ts)
+            elif frontier is not None and len(queued) < len(unique_candidates):
+                # Resumed items the negative cache now skips would otherwise stay pending forever.
+                kept = {cand.url for cand in queued}
+                for cand in unique_candidates:
+                    if cand.url not in kept:
+                        frontier.complete(cand.url, "NEGATIVE_CACHE_SKIP")
+
+            if memory is not None:
+                memory.set_stage("download")
+            await _run_downloads(
+                config,
+                root,
+                queued,
+                collected,
+                client=client,
+                guard=guard,
+                items_logger=items_logger,
+                failed_logger=failed_logger,
+                deadline=deadline,
+                frontier=frontier,
             )
+            collected.result.counts["NEGATIVE_CACHE_SKIP"] = sum(collected.negative_skips.values())
+    finally:
+        if frontier is not None:
+            frontier.close()
+    return collected
+
+
+def _publish_coordination_report(config: RunConfig, root: Path, report: RunReport) -> None:
+    backend = _open_coordination(config, root)
+    if backend is None:
+        return
+    try:
+        backend.publish_report(
+            report.coordination["run_id"],
+            report.coordination["node_id"],
+            {
+                "run_ts": report.run_ts,
+                "providers": report.providers,
+                "candidates_total": report.candidates_total,
+                "unique_urls": report.unique_urls,
+                "counts": dict(report.counts),
+                "provider_ok": report.provider_ok,
+                "failures_by_reason": report.failures_by_reason,
+            },
+        )
+    finally:
+        backend.close()
+
+
+def _write_summary(root: Path, report: RunReport) -> None:
+    summary_text = "\n".join(_build_summary(report)) + "\n"
+    print(summary_text, end="")
+    summary_path = root / "logs" / f"summary_{kst_date_str()}.txt"
+    try:
+        with summary_path.open("a", encoding="utf-8") as fh:
+            fh.write(summary_text)
+    except OSError as exc:
+        print(f"[Collector] Warning: failed to write summary log: {exc}")
+
+
+async def run_once(config: RunConfig, project_root: Path, *, deadline: float | None = None) -> RunReport:
+    """Run one collection batch.
 
-    dedup_store.close()
-    # smart_dedup uses pickle; save is called on updates, but keep a final best-effort save.
+    `deadline` is a `time.monotonic()` value; if omitted it is derived from
+    `config.deadline_seconds`. With a deadline, discovery and downloads are budgeted so the
+    batch still writes its summary (with DEADLINE_DEFERRED) instead of being killed.
+    """
+    started = time.monotonic()
+    if deadline is None and config.deadline_seconds:
+        deadline = started + float(config.deadline_seconds)
+    if config.coordination and not config.coordination_run_id:
+        # Pin the cycle's run id once: a run crossing a slot boundary keeps (and reports on) one queue.
+        config = replace(config, coordination_run_id=_coordination_run_id(config))
+    root = get_photo_root()
+    (root / "meta").mkdir(parents=True, exist_ok=True)
+    (root / "logs").mkdir(parents=True, exist_ok=True)
+
+    run_ts = kst_timestamp_str()
+    failed_logger = MetricsFailedLogger(JsonlLogger(root / "meta" / "failed.jsonl"))
+    # Tracing (--trace): spans of this run's tasks, written to logs/trace_<run_ts>.json.
+    run_tracer = Tracer() if config.trace else None
+    trace_token = activate(run_tracer) if run_tracer is not None else None
+    watchdog: LoopWatchdog | None = None
+    memory: MemoryMonitor | None = None
+    # Stopped even when the run fails: run_loop would otherwise leak the watchdog/sampling
+    # threads, tracemalloc and the tracer context into the next cycle.
     try:
-        smart_dedup.save()
-    except Exception:
-        pass
+        watchdog = _start_watchdog(config, root)
+        memory = _start_memory_monitor(config)
+        collected = await _collect(
+            config,
+            project_root,
+            root,
+            run_ts=run_ts,
+            started=started,
+            deadline=deadline,
+            failed_logger=failed_logger,
+            memory=memory,
+        )
+    finally:
+        loop_stalls = await _stop_watchdog(watchdog)
+        memory_stats = _stop_memory_monitor(memory)
+        if trace_token is not None:
+            deactivate(trace_token)
+
+    result = collected.result
+    loop_stalls = merge_stall_stats(loop_stalls, result.loop_stalls)
+    if memory_stats and result.process_peaks_mb:
+        memory_stats["process_peaks_mb"] = result.process_peaks_mb
 
+    trace_file = ""
+    trace_events = 0
+    if run_tracer is not None:
+        events = run_tracer.events + result.trace_events
+        trace_file = str(run_tracer.write(trace_path(root, run_ts), extra_events=result.trace_events))
+        trace_events = sum(1 for e in events if e["ph"] == "X")
+
+    counts = result.counts
     # Attach config into counts for status/debug (kept simple & backward compatible)
     counts["_min_short_side_px"] = int(config.min_short_side_px)
 
@@ -257,6 +1139,9 @@ async def run_once(config: RunConfig, project_root: Path) -> RunReport:
         "IMAGE_DECODE_FAIL",
         "DOWNLOAD_FAIL",
         "DRY_RUN_SKIPPED",
+        "NEGATIVE_CACHE_SKIP",
+        "CIRCUIT_OPEN_SKIP",
+        "DEADLINE_DEFERRED",
     ]
     for key in required:
         counts.setdefault(key, 0)
@@ -265,22 +1150,29 @@ async def run_once(config: RunConfig, project_root: Path) -> RunReport:
         run_ts=run_ts,
         dry_run=config.dry_run,
         providers=config.providers,
-        candidates_total=candidate_total,
-        unique_urls=unique_urls,
+        candidates_total=collected.candidates_total,
+        unique_urls=collected.unique_urls,
         counts=counts,
-        provider_ok=provider_ok,
+        provider_ok=result.provider_ok,
         failures_by_reason=dict(sorted(failed_logger.failures_by_reason.items())),
+        resumed=collected.resumed,
+        concurrency_trajectory=result.concurrency_trajectory,
+        negative_cache_skips=dict(collected.negative_skips),
+        http_stats=collected.http_stats,
+        processes=max(1, config.processes),
+        coordination=collected.coordination,
+        discovery_cache=collected.discovery_cache,
+        naver_quota=collected.naver_quota,
+        trace_file=trace_file,
+        trace_events=trace_events,
+        loop_stalls=loop_stalls,
+        memory=memory_stats,
+        pipeline=result.pipeline,
     )
 
-    summary_text = "\n".join(_build_summary(report)) + "\n"
-    print(summary_text, end="")
-    summary_path = root / "logs" / f"summary_{kst_date_str()}.txt"
-    try:
-        with summary_path.open("a", encoding="utf-8") as fh:
-            fh.write(summary_text)
-    except OSError as exc:
-        print(f"[Collector] Warning: failed to write summary log: {exc}")
-
+    if report.coordination:
+        _publish_coordination_report(config, root, report)
+    _write_summary(root, report)
     return report
 
 
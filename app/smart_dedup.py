@@ -1,8 +1,14 @@
 import os
 import pickle
+from contextlib import contextmanager
 from pathlib import Path
 from PIL import Image
 
+try:  # 프로세스 간 잠금 (POSIX). 없으면 단일 프로세스 전제로 동작
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
 # import imagehash # 제거: 아래 try-except 안에서 import 시도
 
 # dhash 직접 구현 (라이브러리 의존성 제거용)
@@ -31,26 +37,100 @@ def dhash(image, hash_size=8):
             decimal_value = 0
     return ''.join(hex_string)
 
+def perceptual_hash(img) -> str:
+    """이미지 지문: imagehash 라이브러리가 있으면 phash, 없으면 내장 dhash."""
+    try:
+        import imagehash
+        return str(imagehash.phash(img))
+    except ImportError:
+        return dhash(img)
+    except Exception:
+        return dhash(img)
+
+
+# 지문 계산 방식의 버전. smart_dedup.pkl과 dedup_index.sqlite의 지문은 모두 이 방식으로 계산된 것이어야 하며,
+# 계산 방식을 바꾸면 올려서 dedup-index가 라이브러리 전체를 다시 계산하게 함.
+FINGERPRINT_VERSION = 1
+
+# 지문 계산용 축소 디코드 크기. JPEG은 DCT 단계에서 1/2~1/8로 줄여 읽어 훨씬 빠름.
+# 축소된 픽셀은 전체 디코드와 조금 달라 지문이 다를 수 있으므로, 다운로더와 dedup-index가
+# 반드시 이 함수 하나로 계산해야 함.
+DRAFT_SIZE = (256, 256)
+
+
+def fingerprint(img) -> tuple[str, int]:
+    """(지문, 원본 면적). 픽셀을 읽기 전의 이미지를 받아 축소 디코드(draft)로 계산."""
+    width, height = img.size  # draft 전에 원본 크기 기록
+    try:
+        img.draft("RGB", DRAFT_SIZE)
+    except Exception:
+        pass
+    return perceptual_hash(img), width * height
+
+
+def decide(old_info, new_area: int) -> str:
+    """같은 지문의 기존 항목(old_info, 없으면 None)과 비교해 NEW / UPGRADE / DUPLICATE 결정.
+
+    면적 기준 10% 이상 크면 업그레이드.
+    """
+    if old_info is None:
+        return "NEW"
+    if new_area > old_info.get("area", 0) * 1.1:
+        return "UPGRADE"
+    return "DUPLICATE"
+
+
 class SmartDedupStore:
     def __init__(self, db_path: str):
         self.db_path = db_path
         self.hashes = {} # {phash: {"path": str, "area": int}}
+        self._loaded_mtime = None
         self.load()
 
+    def _mtime(self):
+        try:
+            return os.stat(self.db_path).st_mtime_ns
+        except OSError:
+            return None
+
     def load(self):
         if os.path.exists(self.db_path):
             try:
                 with open(self.db_path, "rb") as f:
                     self.hashes = pickle.load(f)
+                self._loaded_mtime = self._mtime()
             except Exception:
                 self.hashes = {}
 
     def save(self):
+        # 임시 파일에 쓰고 rename: 다른 프로세스가 반쯤 쓰인 pickle을 읽지 않도록
+        tmp_path = f"{self.db_path}.{os.getpid()}.tmp"
         try:
-            with open(self.db_path, "wb") as f:
+            with open(tmp_path, "wb") as f:
                 pickle.dump(self.hashes, f)
+            os.replace(tmp_path, self.db_path)
+            self._loaded_mtime = self._mtime()
         except Exception:
-            pass
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    @contextmanager
+    def _locked(self):
+        """여러 수집 프로세스가 같은 pickle을 공유할 때 read-modify-write를 직렬화."""
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.db_path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                # 다른 프로세스가 저장했으면 최신 상태를 다시 읽는다
+                if self._mtime() != self._loaded_mtime:
+                    self.load()
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
 
     def check_and_update(self, img: Image.Image, new_path: str) -> str:
         """
@@ -60,38 +140,54 @@ class SmartDedupStore:
           "DUPLICATE": 기존보다 구려서 버림
         """
         # 1. pHash 계산 (이미지 지문)
-        try:
-            # imagehash 라이브러리가 있으면 쓰고, 없으면 내장 dhash 사용
-            import imagehash
-            ph = str(imagehash.phash(img))
-        except ImportError:
-            ph = dhash(img)
-        except Exception:
-            ph = dhash(img)
-
-        width, height = img.size
-        new_area = width * height
-
-        # 2. 중복 검사
-        if ph in self.hashes:
-            old_info = self.hashes[ph]
-            old_area = old_info.get("area", 0)
-            old_path = old_info.get("path", "")
-
-            # 3. 화질 비교 (면적 기준 10% 이상 크면 업그레이드)
-            if new_area > old_area * 1.1:
-                # 기존 파일 삭제 시도 (선택 사항: 백업하거나 지움)
-                # 여기서는 '교체'니까 기존 정보 덮어쓰기만 하고,
-                # 실제 파일 삭제는 Downloader에서 처리하도록 신호만 줌
-                
-                # DB 업데이트
-                self.hashes[ph] = {"path": new_path, "area": new_area}
+        ph, new_area = fingerprint(img)
+        return self.check_and_update_fingerprint(ph, new_area, new_path)
+
+    def check_and_update_fingerprint(self, ph: str, new_area: int, new_path: str):
+        """지문을 미리 계산해 둔 경우(다운로더의 처리 단계)의 check_and_update."""
+        with self._locked():
+            return self._check_and_update_hash(ph, new_area, new_path)
+
+    def check_fingerprint(self, ph: str, new_area: int):
+        """check_and_update_fingerprint와 같은 판정만 하고 색인은 바꾸지 않음 (파일 저장 전 사전 검사)."""
+        if self._mtime() != self._loaded_mtime:
+            self.load()
+        old_info = self.hashes.get(ph)
+        return decide(old_info, new_area), (old_info or {}).get("path")
+
+    def bulk_load(self, entries, forget_paths=()) -> int:
+        """(지문, 경로, 면적) 목록을 한 번에 반영. 같은 지문이면 더 큰 이미지가 남음. 반영 개수 리턴.
+
+        forget_paths: 삭제된 파일 경로. 이 경로를 가리키는 항목은 먼저 지움.
+        """
+        changed = 0
+        forget = set(forget_paths)
+        with self._locked():
+            if forget:
+                stale = [ph for ph, info in self.hashes.items() if info.get("path") in forget]
+                for ph in stale:
+                    del self.hashes[ph]
+                changed += len(stale)
+            for ph, path, area in entries:
+                if decide(self.hashes.get(ph), area) == "DUPLICATE":
+                    continue
+                self.hashes[ph] = {"path": path, "area": area}
+                changed += 1
+            if changed:
                 self.save()
-                return "UPGRADE", old_path # 구파일 경로 리턴
-            else:
-                return "DUPLICATE", old_path
-        
-        # 4. 신규 등록
+        return changed
+
+    def _check_and_update_hash(self, ph: str, new_area: int, new_path: str):
+        # 2. 중복 검사 + 3. 화질 비교
+        old_info = self.hashes.get(ph)
+        action = decide(old_info, new_area)
+        if action == "DUPLICATE":
+            return "DUPLICATE", old_info.get("path", "")
+
+        # 신규 등록 또는 업그레이드: 기존 정보 덮어쓰기만 하고,
+        # 실제 (구)파일 삭제는 Downloader에서 처리하도록 신호만 줌
         self.hashes[ph] = {"path": new_path, "area": new_area}
         self.save()
+        if action == "UPGRADE":
+            return "UPGRADE", old_info.get("path", "")  # 구파일 경로 리턴
         return "NEW", None
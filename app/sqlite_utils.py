@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+
+
+def connect(db_path: Path, *, wal: bool | None = True) -> sqlite3.Connection:
+    """Open a metadata database that several collector processes may use at once.
+
+    WAL lets readers proceed while another process writes; the busy timeout makes
+    concurrent writers wait for the lock instead of failing with "database is locked".
+    WAL needs shared memory, so databases used by several hosts over a network
+    filesystem must pass `wal=False` (rollback journal + file locks). `wal=None` keeps
+    whatever journal mode the database already has (for readers that do not know).
+    """
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30.0)
+    if wal is not None:
+        conn.execute(f"PRAGMA journal_mode={'WAL' if wal else 'DELETE'}")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
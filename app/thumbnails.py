@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import hashlib
+import html
+import os
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+from PIL import Image
+
+from app.log_segments import iter_log
+from app.sqlite_utils import connect
+
+THUMB_SIZE = 320
+THUMB_QUALITY = 70
+
+
+def render_thumbnail(src: str, dest: str, size: int = THUMB_SIZE, quality: int = THUMB_QUALITY) -> int:
+    """Write a WebP preview of `src` to `dest` (atomic). Returns the thumbnail size in bytes."""
+    with Image.open(src) as img:
+        img.draft("RGB", (size, size))  # JPEG: decode at 1/2..1/8 scale
+        img.thumbnail((size, size))
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+        out = Path(dest)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        tmp = out.with_name(f".{out.name}.{uuid.uuid4().hex}.part")
+        try:
+            img.save(tmp, "WEBP", quality=quality, method=4)
+            os.replace(tmp, out)
+        finally:
+            tmp.unlink(missing_ok=True)
+    return out.stat().st_size
+
+
+def _sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class ThumbnailCache:
+    """Content-addressed WebP previews: meta/thumbs/<sha[:2]>/<sha>.webp.
+
+    A small SQLite index tracks size and last use so the cache can be trimmed to
+    `max_bytes`, least recently used first.
+    """
+
+    def __init__(self, cache_dir: Path, *, max_bytes: int = 512 * 1024 * 1024, wal: bool = True) -> None:
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_bytes)
+        self.conn = connect(cache_dir / "index.sqlite", wal=wal)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS thumbs (
+                sha256 TEXT PRIMARY KEY,
+                bytes INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self.conn.commit()
+
+    def path_for(self, sha256_hex: str) -> Path:
+        return self.cache_dir / sha256_hex[:2] / f"{sha256_hex}.webp"
+
+    def has(self, sha256_hex: str) -> bool:
+        return self.path_for(sha256_hex).exists()
+
+    def record(self, sha256_hex: str, nbytes: int) -> None:
+        self.conn.execute(
+            """
+            INSERT INTO thumbs (sha256, bytes, last_used) VALUES (?, ?, ?)
+            ON CONFLICT(sha256) DO UPDATE SET bytes = excluded.bytes, last_used = excluded.last_used
+            """,
+            (sha256_hex, int(nbytes), time.time()),
+        )
+
+    def touch(self, sha256_hexes: list[str]) -> None:
+        now = time.time()
+        self.conn.executemany("UPDATE thumbs SET last_used = ? WHERE sha256 = ?", [(now, s) for s in sha256_hexes])
+
+    def evict(self) -> int:
+        """Delete least recently used thumbnails until the cache fits `max_bytes`."""
+        self.conn.commit()
+        total = int(self.conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM thumbs").fetchone()[0])
+        if total <= self.max_bytes:
+            return 0
+        removed = []
+        for sha, nbytes in self.conn.execute("SELECT sha256, bytes FROM thumbs ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            self.path_for(sha).unlink(missing_ok=True)
+            removed.append((sha,))
+            total -= int(nbytes)
+        with self.conn:
+            self.conn.executemany("DELETE FROM thumbs WHERE sha256 = ?", removed)
+        return len(removed)
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
+
+
+class ThumbnailPool:
+    """Renders thumbnails of freshly saved images in background threads.
+
+    `submit()` returns immediately so the download workers never wait on encoding
+    (Pillow releases the GIL while decoding/encoding). `close()` waits for the
+    queue, records results and trims the cache.
+    """
+
+    def __init__(self, cache: ThumbnailCache, *, workers: int = 2, size: int = THUMB_SIZE) -> None:
+        self.cache = cache
+        self.size = size
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="thumbs")
+        self._futures: list[tuple[str, Future]] = []
+        self.made = 0
+        self.failed = 0
+
+    def submit(self, src: Path, sha256_hex: str) -> None:
+        if self.cache.has(sha256_hex):
+            return
+        future = self._pool.submit(render_thumbnail, str(src), str(self.cache.path_for(sha256_hex)), self.size)
+        self._futures.append((sha256_hex, future))
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+        for sha, future in self._futures:
+            try:
+                self.cache.record(sha, future.result())
+                self.made += 1
+            except Exception:
+                self.failed += 1
+        self._futures.clear()
+        self.cache.evict()
+        self.cache.close()
+
+
+def _backfill_one(job: tuple[str, str | None, str, int]) -> tuple[str, str, int, str | None]:
+    """Worker: (path, sha256 or None, cache_dir, size) -> (path, sha256, bytes, error)."""
+    path, sha, cache_dir, size = job
+    try:
+        sha = sha or _sha256_file(path)
+        dest = Path(cache_dir) / sha[:2] / f"{sha}.webp"
+        nbytes = dest.stat().st_size if dest.exists() else render_thumbnail(path, str(dest), size)
+        return path, sha, nbytes, None
+    except Exception as exc:  # noqa: BLE001
+        return path, "", 0, f"{type(exc).__name__}: {exc}"
+
+
+def backfill(
+    cache: ThumbnailCache,
+    files: list[tuple[Path, str | None]],
+    *,
+    workers: int | None = None,
+    size: int = THUMB_SIZE,
+) -> tuple[int, int]:
+    """Make missing thumbnails in a process pool. Returns (made, errors).
+
+    `files` pairs each path with its sha256 when known (items.jsonl); unknown ones are
+    hashed in the worker. Known hashes that are already cached are skipped without
+    reading the file.
+    """
+    jobs = [(str(p), sha, str(cache.cache_dir), size) for p, sha in files if not (sha and cache.has(sha))]
+    made = errors = 0
+    if not jobs:
+        return made, errors
+    workers = max(1, workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunksize = max(1, min(64, len(jobs) // (workers * 4)))
+        for _path, sha, nbytes, error in pool.map(_backfill_one, jobs, chunksize=chunksize):
+            if error is None:
+                cache.record(sha, nbytes)
+                made += 1
+            else:
+                errors += 1
+    cache.conn.commit()
+    return made, errors
+
+
+def write_contact_sheet(out_path: Path, cache: ThumbnailCache, items: list[dict], *, title: str) -> Path:
+    """HTML grid of cached thumbnails (lazy-loaded), each linking to its original file."""
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    cells = []
+    used = []
+    for item in items:
+        sha = item.get("sha256") or ""
+        thumb = cache.path_for(sha)
+        if not sha or not thumb.exists():
+            continue
+        used.append(sha)
+        original = Path(item["saved_path"])
+        label = f"{item.get('provider', '')} · {item.get('width', '?')}×{item.get('height', '?')}"
+        cells.append(
+            f'<a href="{html.escape(os.path.relpath(original, out_path.parent))}" title="{html.escape(original.name)}">'
+            f'<img loading="lazy" src="{html.escape(os.path.relpath(thumb, out_path.parent))}" alt="">'
+            f"<span>{html.escape(label)}</span></a>"
+        )
+    cache.touch(used)
+    cache.conn.commit()
+
+    page = f"""<!doctype html>
+<html lang="ko"><head><meta charset="utf-8"><title>{html.escape(title)}</title>
+<style>
+body {{ font-family: sans-serif; margin: 16px; background: #111; color: #ddd; }}
+.grid {{ display: grid; grid-template-columns: repeat(auto-fill, minmax(180px, 1fr)); gap: 8px; }}
+.grid a {{ color: #aaa; text-decoration: none; font-size: 12px; }}
+.grid img {{ width: 100%; aspect-ratio: 1; object-fit: cover; background: #222; display: block; }}
+</style></head>
+<body><h1>{html.escape(title)}</h1><p>{len(cells)} images</p>
+<div class="grid">
+{chr(10).join(cells)}
+</div></body></html>
+"""
+    out_path.write_text(page, encoding="utf-8")
+    return out_path
+
+
+def load_items(items_path: Path, *, date: str | None = None) -> list[dict]:
+    """Saved items from items.jsonl and its segments (optionally one KST date) whose file still exists, newest first."""
+    by_path: dict[str, dict] = {}
+    # Rotated segments too; with a date only the segments covering that day are read.
+    for row in iter_log(items_path.parent, items_path.stem, since=date, until=date):
+        saved = row.get("saved_path")
+        if not isinstance(saved, str):
+            continue
+        if date and not str(row.get("time_kst", "")).startswith(date):
+            continue
+        by_path[saved] = row
+    rows = [row for path, row in by_path.items() if Path(path).exists()]
+    rows.sort(key=lambda r: str(r.get("time_kst", "")), reverse=True)
+    return rows
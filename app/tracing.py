@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+# Chrome trace timestamps are microseconds; anchor perf_counter to the wall clock so
+# traces written by several --processes workers line up on one timeline.
+_EPOCH_OFFSET_NS = time.time_ns() - time.perf_counter_ns()
+
+
+def _now_us() -> float:
+    return (time.perf_counter_ns() + _EPOCH_OFFSET_NS) / 1000.0
+
+
+class Tracer:
+    """Collects Chrome trace events ("X" complete spans) for one process.
+
+    Each asyncio task gets its own lane (tid), named after the task, so the download
+    workers and provider tasks show up side by side in chrome://tracing or Perfetto.
+    Code outside a task (threads, the main loop) uses the thread id.
+    """
+
+    enabled = True
+
+    def __init__(self) -> None:
+        self.pid = os.getpid()
+        self.events: list[dict[str, Any]] = []
+        self._lanes: weakref.WeakKeyDictionary[asyncio.Task, int] = weakref.WeakKeyDictionary()
+        self._next_lane = itertools.count(1)
+
+    def _tid(self) -> int:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        if task is None:
+            return threading.get_ident()
+        tid = self._lanes.get(task)
+        if tid is None:
+            tid = self._lanes[task] = next(self._next_lane)
+            self.events.append(
+                {"ph": "M", "name": "thread_name", "pid": self.pid, "tid": tid, "args": {"name": task.get_name()}}
+            )
+        return tid
+
+    def complete(self, name: str, cat: str, start_us: float, end_us: float, args: dict[str, Any] | None = None) -> None:
+        event = {"ph": "X", "name": name, "cat": cat, "ts": start_us, "dur": end_us - start_us, "pid": self.pid}
+        event["tid"] = self._tid()
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    @contextmanager
+    def span(self, name: str, cat: str = "run", **args: Any) -> Iterator[dict[str, Any]]:
+        """Time the block; the yielded dict can take extra args (e.g. the outcome)."""
+        start = _now_us()
+        try:
+            yield args
+        finally:
+            self.complete(name, cat, start, _now_us(), args)
+
+    def httpx_hook(self) -> Callable[[str, dict[str, Any]], Any]:
+        """An httpx/httpcore `trace` extension that records connect/TLS/send/receive spans.
+
+        DNS resolution happens inside httpcore's connect_tcp, so it is part of that span.
+        """
+        started: dict[str, float] = {}
+
+        async def hook(event_name: str, info: dict[str, Any]) -> None:
+            step, _, phase = event_name.rpartition(".")
+            if phase == "started":
+                started[step] = _now_us()
+            elif step in started:
+                self.complete(step, "http", started.pop(step), _now_us(), {"failed": True} if phase == "failed" else None)
+
+        return hook
+
+    def write(self, path: Path, *, extra_events: list[dict[str, Any]] | None = None) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"traceEvents": self.events + list(extra_events or []), "displayTimeUnit": "ms"}
+        tmp = path.with_name(f".{path.name}.part")
+        tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+        return path
+
+
+class NullTracer:
+    """Tracing disabled: every span is the same shared no-op context manager."""
+
+    enabled = False
+    _span = nullcontext({})
+
+    def span(self, name: str, cat: str = "run", **args: Any):
+        return self._span
+
+    def complete(self, *args: Any, **kwargs: Any) -> None:
+        return None
+
+    def httpx_hook(self) -> None:
+        return None
+
+
+NULL_TRACER = NullTracer()
+
+_current: contextvars.ContextVar[Tracer | NullTracer] = contextvars.ContextVar("tracer", default=NULL_TRACER)
+
+
+def tracer() -> Tracer | NullTracer:
+    """The tracer of the current run (tasks inherit it from the run that created them)."""
+    return _current.get()
+
+
+def activate(t: Tracer | NullTracer) -> contextvars.Token:
+    return _current.set(t)
+
+
+def deactivate(token: contextvars.Token) -> None:
+    _current.reset(token)
+
+
+def trace_path(root: Path, run_ts: str) -> Path:
+    # run_ts is an ISO timestamp; keep it filename-safe (no colons).
+    return root / "logs" / f"trace_{run_ts[:19].replace(':', '')}.json"
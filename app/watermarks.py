@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+from app.sqlite_utils import connect
+
+
+class WatermarkStore:
+    """Per-(provider, query) discovery progress kept between runs (meta/discovery_watermarks.sqlite).
+
+    A provider stores whatever JSON state it needs to resume: e.g. the newest item it has
+    seen and the continuation token of its backfill into older results.
+    """
+
+    def __init__(self, db_path: Path, *, wal: bool = True) -> None:
+        self.db_path = db_path
+        self.conn = connect(self.db_path, wal=wal)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS discovery_watermarks (
+                provider TEXT NOT NULL,
+                query TEXT NOT NULL,
+                state TEXT NOT NULL,
+                PRIMARY KEY (provider, query)
+            )
+            """
+        )
+        self.conn.commit()
+
+    def get(self, provider: str, query: str) -> dict[str, Any]:
+        row = self.conn.execute(
+            "SELECT state FROM discovery_watermarks WHERE provider = ? AND query = ?", (provider, query)
+        ).fetchone()
+        if row is None:
+            return {}
+        try:
+            state = json.loads(row[0])
+        except json.JSONDecodeError:
+            return {}
+        return state if isinstance(state, dict) else {}
+
+    def put(self, provider: str, query: str, state: dict[str, Any]) -> None:
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO discovery_watermarks (provider, query, state) VALUES (?, ?, ?)
+                ON CONFLICT(provider, query) DO UPDATE SET state = excluded.state
+                """,
+                (provider, query, json.dumps(state, ensure_ascii=False)),
+            )
+
+    def close(self) -> None:
+        self.conn.close()
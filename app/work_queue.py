@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import time
+from pathlib import Path
+from typing import Iterable
+
+from app.models import Candidate
+from app.sqlite_utils import connect
+
+STATE_PENDING = "pending"
+STATE_IN_FLIGHT = "in_flight"
+STATE_DONE = "done"
+
+
+class WorkQueue:
+    """Persistent candidate frontier.
+
+    Every unique candidate of a run is stored with a state (pending/in_flight/done).
+    If the process is killed mid-run, a later `--resume` run picks up the pending
+    items and reclaims in-flight items whose lease has expired.
+
+    `lease()`/`complete()` are buffered and written in one transaction per `batch_size`
+    updates (or after `flush_seconds`), not one commit per item. A kill loses at most the
+    last unflushed batch; those items are simply fetched again on resume (and deduplicated).
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        *,
+        lease_seconds: float = 300.0,
+        wal: bool = True,
+        batch_size: int = 64,
+        flush_seconds: float = 5.0,
+    ) -> None:
+        self.db_path = db_path
+        self.lease_seconds = float(lease_seconds)
+        self.batch_size = max(1, int(batch_size))
+        self.flush_seconds = float(flush_seconds)
+        self._updates: list[tuple[str, float | None, str | None, str]] = []
+        self._last_flush = time.monotonic()
+        self.conn = connect(self.db_path, wal=wal)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS frontier (
+                url TEXT PRIMARY KEY,
+                provider TEXT NOT NULL,
+                query TEXT,
+                source_url TEXT,
+                state TEXT NOT NULL,
+                lease_until REAL,
+                outcome TEXT,
+                run_ts TEXT NOT NULL,
+                seq INTEGER NOT NULL
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_frontier_state ON frontier (state, seq)")
+        self.conn.commit()
+
+    def reset(self, candidates: Iterable[Candidate], run_ts: str) -> None:
+        """Replace the frontier with a freshly discovered candidate set."""
+        rows = [
+            (c.url, c.provider, c.query, c.source_url, STATE_PENDING, run_ts, seq)
+            for seq, c in enumerate(candidates)
+        ]
+        self._updates.clear()  # they refer to the replaced frontier
+        with self.conn:
+            self.conn.execute("DELETE FROM frontier")
+            self.conn.executemany(
+                """
+                INSERT OR IGNORE INTO frontier (url, provider, query, source_url, state, run_ts, seq)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+
+    def reclaim_expired(self, now: float | None = None) -> int:
+        """Return in-flight items with an expired lease to the pending state."""
+        now = time.time() if now is None else now
+        self.flush()
+        with self.conn:
+            cur = self.conn.execute(
+                "UPDATE frontier SET state = ?, lease_until = NULL WHERE state = ? AND lease_until < ?",
+                (STATE_PENDING, STATE_IN_FLIGHT, now),
+            )
+        return int(cur.rowcount or 0)
+
+    def pending(self) -> list[Candidate]:
+        self.flush()
+        rows = self.conn.execute(
+            "SELECT url, provider, query, source_url FROM frontier WHERE state = ? ORDER BY seq",
+            (STATE_PENDING,),
+        ).fetchall()
+        return [Candidate(url=url, provider=provider, query=query, source_url=source_url) for url, provider, query, source_url in rows]
+
+    def lease(self, url: str) -> None:
+        self._buffer(STATE_IN_FLIGHT, time.time() + self.lease_seconds, None, url)
+
+    def complete(self, url: str, outcome: str) -> None:
+        self._buffer(STATE_DONE, None, outcome, url)
+
+    def _buffer(self, state: str, lease_until: float | None, outcome: str | None, url: str) -> None:
+        self._updates.append((state, lease_until, outcome, url))
+        if len(self._updates) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered lease/complete updates (in order) in one transaction."""
+        self._last_flush = time.monotonic()
+        if not self._updates:
+            return
+        updates, self._updates = self._updates, []
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE frontier SET state = ?, lease_until = ?, outcome = COALESCE(?, outcome) WHERE url = ?",
+                updates,
+            )
+
+    def counts(self) -> dict[str, int]:
+        self.flush()
+        rows = self.conn.execute("SELECT state, COUNT(*) FROM frontier GROUP BY state").fetchall()
+        return {state: int(n) for state, n in rows}
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            self.conn.close()
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from pathlib import Path
+from urllib.parse import urlparse
+
+from app.log_segments import iter_log
+from app.models import Candidate
+from app.sqlite_utils import connect
+
+DIMENSIONS = ("provider", "host", "query")
+
+# Outcomes that say nothing about the source's yield. Duplicates mean the source served
+# an image we already have: seen, neither a success nor a failure of the source.
+_IGNORED_REASONS = {"DRY_RUN_SKIPPED", "CIRCUIT_OPEN_SKIP", "DEADLINE_DEFERRED", "DUPLICATE", "DUPLICATE_SMART"}
+
+# failed.jsonl reasons that are a candidate's final download outcome. Other rows are
+# discovery errors, breaker transitions or notes such as SMART_DEDUP_ERROR (the download
+# itself went on and has its own row).
+_FAILED_OUTCOMES = {"DOWNLOAD_FAIL", "NOT_IMAGE", "IMAGE_DECODE_FAIL", "RESOLUTION_TOO_SMALL"}
+
+
+def _counts_as(reason: str | None) -> bool | None:
+    """True/False: an OK / failed attempt of the source; None: not counted."""
+    if reason is None or reason in _IGNORED_REASONS:
+        return None
+    return reason == "OK"
+
+
+def _keys(cand: Candidate) -> dict[str, str | None]:
+    return {
+        "provider": cand.provider,
+        "host": (urlparse(cand.url).hostname or "").lower() or None,
+        "query": f"{cand.provider}:{cand.query}" if cand.query else None,
+    }
+
+
+class YieldStatsStore:
+    """Historical OK rates per provider / host / query, used to order the download queue.
+
+    A candidate's score is the weighted sum of its smoothed OK rates. Unseen keys fall
+    back to the global OK rate, so new sources are neither starved nor favoured.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        *,
+        weights: dict[str, float] | None = None,
+        prior_strength: float = 5.0,
+        commit_every: int = 50,
+        wal: bool = True,
+    ) -> None:
+        self.db_path = db_path
+        self.weights = {dim: float((weights or {}).get(dim, 1.0)) for dim in DIMENSIONS}
+        self.prior_strength = float(prior_strength)
+        self.commit_every = max(1, int(commit_every))
+        self._pending = 0
+        self.conn = connect(self.db_path, wal=wal)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS yield_stats (
+                dimension TEXT NOT NULL,
+                key TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                ok INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (dimension, key)
+            )
+            """
+        )
+        self.conn.commit()
+        self._rates: dict[tuple[str, str], tuple[int, int]] = {}
+        self._global_rate = 0.5
+
+    def is_empty(self) -> bool:
+        return self.conn.execute("SELECT 1 FROM yield_stats LIMIT 1").fetchone() is None
+
+    def bootstrap_from_jsonl(self, items_path: Path, failed_path: Path) -> int:
+        """Seed provider/host stats from existing logs (failed.jsonl has no query field).
+
+        Rows are classified like live `record()` outcomes; failed.jsonl rows that are not
+        a download outcome are skipped.
+        """
+        seen = 0
+        for path, is_items in ((items_path, True), (failed_path, False)):
+            # Includes the compressed segments rotated out of the log.
+            for row in iter_log(path.parent, path.stem):
+                url, provider = row.get("url"), row.get("provider")
+                if not isinstance(url, str) or not isinstance(provider, str):
+                    continue
+                reason = "OK" if is_items else row.get("reason")
+                if not is_items and reason not in _FAILED_OUTCOMES:
+                    continue
+                ok = _counts_as(reason)
+                if ok is None:
+                    continue
+                self._bump(_keys(Candidate(url=url, provider=provider)), ok)
+                seen += 1
+        self.conn.commit()
+        return seen
+
+    def load(self) -> None:
+        rows = self.conn.execute("SELECT dimension, key, attempts, ok FROM yield_stats").fetchall()
+        self._rates = {(dim, key): (int(attempts), int(ok)) for dim, key, attempts, ok in rows}
+        provider_rows = [v for (dim, _), v in self._rates.items() if dim == "provider"]
+        attempts = sum(a for a, _ in provider_rows)
+        oks = sum(o for _, o in provider_rows)
+        self._global_rate = (oks + 0.5) / (attempts + 1.0)
+
+    def rate(self, dimension: str, key: str) -> float:
+        """Smoothed OK rate of one key (the global rate when unseen). Call `load()` first."""
+        attempts, ok = self._rates.get((dimension, key), (0, 0))
+        return (ok + self._global_rate * self.prior_strength) / (attempts + self.prior_strength)
+
+    def score(self, cand: Candidate) -> float:
+        total = 0.0
+        for dim, key in _keys(cand).items():
+            rate = self.rate(dim, key) if key else self._global_rate
+            total += self.weights[dim] * rate
+        return total
+
+    def record(self, cand: Candidate, reason: str) -> None:
+        ok = _counts_as(reason)
+        if ok is None:
+            return
+        self._bump(_keys(cand), ok)
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self.conn.commit()
+            self._pending = 0
+
+    def _bump(self, keys: dict[str, str | None], ok: bool) -> None:
+        rows = [(dim, key, int(ok)) for dim, key in keys.items() if key]
+        self.conn.executemany(
+            """
+            INSERT INTO yield_stats (dimension, key, attempts, ok) VALUES (?, ?, 1, ?)
+            ON CONFLICT(dimension, key) DO UPDATE SET attempts = attempts + 1, ok = ok + excluded.ok
+            """,
+            rows,
+        )
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
@@ -3,6 +3,7 @@ from __future__ import annotations
 import argparse
 import os
 import signal
+import socket
 import subprocess
 import sys
 import time
@@ -21,7 +22,8 @@ SMOKE_ROOT = PROJECT_ROOT / ".smoke_photo_root"
 if not PYTHON_EXE.exists():
     # fallback for older installs. Prefer venv/ to keep a single source of truth.
     PYTHON_EXE = FALLBACK_PY
-LOCK_FILE = PROJECT_ROOT / ".run_loop.lock"
+# One loop per host: the project directory may be shared by several collector nodes.
+LOCK_FILE = PROJECT_ROOT / f".run_loop.{socket.gethostname()}.lock"
 
 
 def _is_process_alive(pid: int) -> bool:
@@ -106,6 +108,14 @@ def _run_cycle(args: argparse.Namespace) -> int:
         cmd.extend(["--keywords", args.keywords])
     if args.dry_run:
         cmd.append("--dry-run")
+    if args.resume:
+        cmd.append("--resume")
+    if args.coordination:
+        cmd.extend(["--coordination", args.coordination])
+    # Let the collector wind down on its own (summary/status written) before we would kill it.
+    deadline = args.timeout_seconds - args.deadline_margin_seconds
+    if deadline > 0:
+        cmd.extend(["--deadline-seconds", str(deadline)])
 
     env = os.environ.copy()
     env["PYTHONPATH"] = str(PROJECT_ROOT)
@@ -158,6 +168,23 @@ def _parse_args() -> argparse.Namespace:
     parser.add_argument("--once", action="store_true", help="Run one cycle and exit")
     parser.add_argument("--skip-reorganize", action="store_true")
     parser.add_argument("--timeout-seconds", type=int, default=3600)
+    parser.add_argument(
+        "--deadline-margin-seconds",
+        type=int,
+        default=120,
+        help="Pass --deadline-seconds (timeout minus this margin) so runs finish before the hard kill",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue the previous (e.g. timed-out) run's pending frontier before discovering again",
+    )
+    parser.add_argument(
+        "--coordination",
+        choices=["sqlite", "redis"],
+        default=None,
+        help="Share the candidate queue and dedup indexes with other nodes (redis reads COORDINATION_URL)",
+    )
     return parser.parse_args()
 
 
@@ -0,0 +1,81 @@
+"""Compare whole-document RSS parsing with the streaming parser used by the Twitter providers.
+
+    python scripts/bench_rss_parse.py                  # synthetic 5000-item feed
+    python scripts/bench_rss_parse.py saved_feed.xml   # feeds saved from Nitter/RSSHub
+
+Prints time and peak Python memory for: the old approach (ElementTree.fromstring +
+BeautifulSoup per description, all items), streaming without a limit, and streaming
+with a limit of 20 items (twitter_rsshub's default limit_per_keyword).
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.providers.rss import parse_rss_images  # noqa: E402
+
+LIMIT = 20
+
+
+def synthetic_feed(items: int = 5000) -> bytes:
+    body = "".join(
+        "<item><title>t{i}</title><link>https://nitter.test/u/status/{i}</link>"
+        "<pubDate>Mon, 01 Jan 2026 00:00:00 GMT</pubDate><description>{d}</description></item>".format(
+            i=i,
+            d=escape(
+                f"<p>{'고윤정 ' * 40}</p>"
+                f'<img src="https://nitter.test/pic/media%2F{i}a.jpg%3Fname%3Dsmall" style="max-width:250px;" />'
+                f'<img src="https://nitter.test/pic/media%2F{i}b.jpg%3Fname%3Dsmall" style="max-width:250px;" />'
+            ),
+        )
+        for i in range(items)
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>search</title>{body}</channel></rss>'.encode()
+
+
+def tree_and_soup(content: bytes, limit: int | None = None) -> list[tuple[str, list[str]]]:
+    from bs4 import BeautifulSoup
+
+    out = []
+    for item in ElementTree.fromstring(content).findall(".//item")[:limit]:
+        desc = item.findtext("description") or ""
+        soup = BeautifulSoup(desc, "lxml")
+        out.append((item.findtext("link") or "", [img.get("src") or "" for img in soup.find_all("img")]))
+    return out
+
+
+def measure(name: str, fn, content: bytes, repeat: int) -> None:
+    tracemalloc.start()
+    fn(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        items = fn(content)
+    per_run = (time.perf_counter() - started) / repeat
+    print(f"  {name:<22} items={len(items):>5}  {per_run * 1000:8.1f} ms  peak={peak / 1e6:7.1f} MB")
+
+
+def main(paths: list[str]) -> None:
+    feeds = [(p, Path(p).read_bytes()) for p in paths] or [("synthetic", synthetic_feed())]
+    for label, content in feeds:
+        print(f"{label}: {len(content) / 1e6:.1f} MB")
+        try:
+            import bs4  # noqa: F401
+        except ImportError:
+            print("  tree+soup              (skipped: bs4 not installed)")
+        else:
+            measure("tree+soup (old)", tree_and_soup, content, repeat=1)
+        measure("stream, all items", parse_rss_images, content, repeat=3)
+        measure(f"stream, limit={LIMIT}", lambda c: parse_rss_images(c, limit=LIMIT), content, repeat=20)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,8 @@
+class ListLogger:
+    """Stand-in for the JSONL loggers: keeps appended rows in memory."""
+
+    def __init__(self):
+        self.rows = []
+
+    def append(self, row):
+        self.rows.append(row)
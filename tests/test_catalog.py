@@ -0,0 +1,61 @@
+import json
+
+from app.catalog import ItemCatalog, open_catalog
+from app.reporter import generate_report
+from app.time_utils import kst_date_str
+
+
+def _row(sha, provider, day, width, height, size=1000, **extra):
+    return {
+        "time_kst": f"{day}T10:00:00+09:00",
+        "provider": provider,
+        "query": "고윤정",
+        "url": f"https://img.test/{sha}.jpg",
+        "saved_path": f"/photos/{day}/{provider}/{sha}.jpg",
+        "width": width,
+        "height": height,
+        "sha256": sha,
+        "content_length": size,
+        **extra,
+    }
+
+
+def test_import_is_incremental_and_queries_use_filters(tmp_path):
+    items = tmp_path / "meta" / "items.jsonl"
+    items.parent.mkdir()
+    rows = [
+        _row("a", "naver", "2026-01-01", 800, 600),
+        _row("b", "naver", "2026-01-05", 4000, 3000, size=3_000_000),
+        _row("c", "wikimedia", "2026-01-05", 1200, 900),
+    ]
+    items.write_text("".join(json.dumps(r) + "\n" for r in rows) + '{"partial', encoding="utf-8")
+
+    catalog = open_catalog(tmp_path)
+    assert catalog.count() == 3
+    assert catalog.count(provider="naver", since="2026-01-02") == 1
+    assert catalog.count(until="2026-01-01") == 1
+    assert catalog.count(bucket="Organized/Best_Cuts") == 1
+    assert [r["sha256"] for r in catalog.select(order="largest", limit=2)] == ["b", "c"]
+    assert catalog.count_by("provider") == [("naver", 2, 3_001_000), ("wikimedia", 1, 1000)]
+
+    # Only the rest of the file is read next time; the upgrade hides the replaced row.
+    upgrade = _row("d", "naver", "2026-01-06", 1600, 1200, smart_dedup="UPGRADE", smart_dedup_old_path=rows[0]["saved_path"])
+    with items.open("w", encoding="utf-8") as fh:
+        fh.write("".join(json.dumps(r) + "\n" for r in rows) + json.dumps(upgrade) + "\n")
+    stats = catalog.import_jsonl(items)
+    assert (stats.lines, stats.imported) == (1, 1)
+    assert catalog.count() == 3
+    assert catalog.count(include_replaced=True) == 4
+    catalog.close()
+
+
+def test_report_counts_come_from_catalog(tmp_path):
+    catalog = ItemCatalog(tmp_path / "meta" / "catalog.sqlite")
+    today = kst_date_str()
+    catalog.add(_row("a", "naver", today, 4000, 3000))
+    catalog.add(_row("b", "wikimedia", today, 800, 600))
+    catalog.close()
+
+    report = open(generate_report(tmp_path), encoding="utf-8").read()
+    assert "**Total Collected Today:** 2 images" in report
+    assert "**Total Best Cuts (All time):** 1" in report
@@ -0,0 +1,46 @@
+from app.compaction import compact_library
+
+
+def _write(path, data=b"x" * 100):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+def test_orphaned_copies_are_removed_incrementally(tmp_path):
+    day = tmp_path / "2026-01-01" / "naver"
+    hq = tmp_path / "Organized" / "General_HQ"
+    best = tmp_path / "Organized" / "Best_Cuts"
+    for name in ("aaa.jpg", "bbb.jpg", "ccc.jpg"):
+        _write(day / name)
+        _write(hq / name)
+    _write(best / "aaa.jpg")
+    _write(hq / "old.jpg")  # primary already gone before the first compaction
+
+    stats = compact_library(tmp_path, dry_run=True)
+    assert (stats.orphans, stats.removed, stats.reclaimed_bytes) == (1, 0, 100)
+    assert (hq / "old.jpg").exists()
+
+    stats = compact_library(tmp_path)
+    assert (stats.primaries, stats.removed, stats.reclaimed_bytes) == (3, 1, 100)
+    assert not (hq / "old.jpg").exists()
+
+    # Nothing changed: no folder is listed again and nothing is checked.
+    stats = compact_library(tmp_path)
+    assert (stats.primary_dirs_listed, stats.checked, stats.removed) == (0, 0, 0)
+    assert stats.buckets_listed == 1  # General_HQ once more, after our own deletion
+
+    # An upgrade replaced aaa.jpg: only its copies are checked and removed.
+    (day / "aaa.jpg").unlink()
+    _write(day / "ddd.jpg")
+    _write(hq / "ddd.jpg")
+    stats = compact_library(tmp_path)
+    assert (stats.checked, stats.removed) == (2, 2)
+    assert sorted(p.name for p in hq.iterdir()) == ["bbb.jpg", "ccc.jpg", "ddd.jpg"]
+    assert not list(best.iterdir())
+
+
+def test_empty_library_removes_nothing(tmp_path):
+    _write(tmp_path / "Organized" / "General_HQ" / "aaa.jpg")
+    stats = compact_library(tmp_path)
+    assert (stats.primaries, stats.removed) == (0, 0)
+    assert (tmp_path / "Organized" / "General_HQ" / "aaa.jpg").exists()
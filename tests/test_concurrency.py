@@ -0,0 +1,34 @@
+import asyncio
+
+from app.concurrency import AIMDController
+
+
+def test_aimd_increases_on_healthy_window_and_halves_on_throttle():
+    async def scenario():
+        ctl = AIMDController(initial=4, min_limit=1, max_limit=6, window=2)
+        for _ in range(2):
+            await ctl.record(latency_s=0.1, nbytes=1000)
+        assert ctl.limit == 5
+
+        await ctl.record(latency_s=0.1, throttled=True)
+        assert ctl.limit == 2
+        # A second throttle within the same window does not compound the decrease.
+        await ctl.record(latency_s=0.1, throttled=True)
+        assert ctl.limit == 2
+        return [p["why"] for p in ctl.trajectory]
+
+    assert asyncio.run(scenario()) == ["start", "increase", "throttled"]
+
+
+def test_run_max_workers_option_raises_the_adaptive_ceiling(monkeypatch):
+    from typer.testing import CliRunner
+
+    import app.cli
+
+    seen = []
+    monkeypatch.setattr(app.cli, "run_sync", lambda config, root: seen.append(config) or 0)
+    runner = CliRunner()
+    assert runner.invoke(app.cli.app, ["run", "--max-workers", "12", "--min-workers", "3"]).exit_code == 0
+    assert runner.invoke(app.cli.app, ["run", "--max-workers", "2", "--min-workers", "1"]).exit_code == 0
+    assert runner.invoke(app.cli.app, ["run", "--max-workers", "2", "--min-workers", "3"]).exit_code != 0
+    assert [(c.min_workers, c.initial_workers, c.max_workers) for c in seen] == [(3, 5, 12), (1, 2, 2)]
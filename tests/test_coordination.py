@@ -0,0 +1,203 @@
+import json
+from datetime import datetime
+
+from app.coordination import (
+    _LEASE,
+    _RELEASE_LOCK,
+    RedisCoordination,
+    SQLiteCoordination,
+    default_run_id,
+    merge_reports,
+)
+from app.models import Candidate
+
+
+class FakeRedis:
+    """Just the commands RedisCoordination uses."""
+
+    def __init__(self):
+        self.data = {}
+
+    def hsetnx(self, name, key, value):
+        h = self.data.setdefault(name, {})
+        if key in h:
+            return 0
+        h[key] = value
+        return 1
+
+    def hset(self, name, key, value):
+        self.data.setdefault(name, {})[key] = value
+
+    def hget(self, name, key):
+        return self.data.get(name, {}).get(key)
+
+    def hdel(self, name, key):
+        return 1 if self.data.get(name, {}).pop(key, None) is not None else 0
+
+    def hgetall(self, name):
+        return dict(self.data.get(name, {}))
+
+    def rpush(self, name, value):
+        self.data.setdefault(name, []).append(value)
+
+    def lpop(self, name):
+        items = self.data.get(name) or []
+        return items.pop(0) if items else None
+
+    def set(self, name, value, nx=False, px=None):
+        if nx and name in self.data:
+            return None
+        self.data[name] = value
+        return True
+
+    def eval(self, script, numkeys, *args):
+        """Python equivalents of the Lua scripts (each runs atomically, like on a server)."""
+        keys, argv = args[:numkeys], args[numkeys:]
+        if script == _RELEASE_LOCK:
+            if self.data.get(keys[0]) == argv[0]:
+                del self.data[keys[0]]
+                return 1
+            return 0
+        if script == _LEASE:
+            queue, leases = keys
+            now, until, owner, limit = argv
+            for url, raw in list(self.hgetall(leases).items()):
+                lease = json.loads(raw)
+                if lease["until"] < now:
+                    self.hdel(leases, url)
+                    self.rpush(queue, json.dumps(lease["cand"]))
+            out = []
+            for _ in range(limit):
+                raw = self.lpop(queue)
+                if raw is None:
+                    break
+                cand = json.loads(raw)
+                self.hset(leases, cand["url"], json.dumps({"owner": owner, "until": until, "cand": cand}))
+                out.append(raw)
+            return out
+        raise NotImplementedError(script)
+
+
+def _cands(n):
+    return [Candidate(url=f"https://x/{i}.jpg", provider="naver") for i in range(n)]
+
+
+def test_sqlite_nodes_share_queue_and_reclaim(tmp_path):
+    a, b = SQLiteCoordination(tmp_path), SQLiteCoordination(tmp_path)
+    assert a.enqueue("r1", _cands(3)) == 3
+    assert b.enqueue("r1", _cands(4)) == 1  # only x/3 is new
+
+    first = a.lease("r1", "a", 2, lease_seconds=-1)  # node a dies with an already-expired lease
+    second = b.lease("r1", "b", 10, lease_seconds=60)
+    assert {c.url for c in first} <= {c.url for c in second}
+    assert len(second) == 4
+    assert b.lease("r1", "b", 10, lease_seconds=60) == []
+
+    b.publish_report("r1", "b", {"counts": {"OK": 2}, "provider_ok": {"naver": 2}})
+    a.publish_report("r1", "a", {"counts": {"OK": 1, "_min_short_side_px": 1000}})
+    assert merge_reports(a.reports("r1"))["counts"] == {"OK": 3}
+    a.close()
+    b.close()
+
+
+def test_redis_leases_and_claims(tmp_path):
+    client = FakeRedis()
+    coord = RedisCoordination(client)
+    assert coord.enqueue("r1", _cands(3)) == 3
+    assert coord.enqueue("r1", _cands(3)) == 0
+
+    leased = coord.lease("r1", "a", 2, lease_seconds=-1)
+    assert [c.url for c in leased] == ["https://x/0.jpg", "https://x/1.jpg"]
+    coord.complete("r1", leased[0].url, "OK")
+    # x/1 expired without completing and goes back to the end of the queue.
+    assert [c.url for c in coord.lease("r1", "b", 10, lease_seconds=60)] == ["https://x/2.jpg", "https://x/1.jpg"]
+
+    store = coord.dedup_store()
+    assert store.claim("abc", "t")
+    assert not RedisCoordination(client).dedup_store().claim("abc", "t")
+    store.release("abc")
+    assert store.claim("abc", "t")
+
+
+def test_redis_lease_moves_candidates_in_one_script():
+    client = FakeRedis()
+    coord = RedisCoordination(client)
+    coord.enqueue("r1", _cands(2))
+    in_script = []
+    real_eval, real_lpop = client.eval, client.lpop
+
+    def eval_(*args):
+        in_script.append(True)
+        try:
+            return real_eval(*args)
+        finally:
+            in_script.pop()
+
+    def lpop(name):
+        # A bare LPOP followed by a separate lease write loses the URL if the node dies in between.
+        assert in_script, "LPOP outside the lease script"
+        return real_lpop(name)
+
+    client.eval, client.lpop = eval_, lpop
+    assert [c.url for c in coord.lease("r1", "a", 1, lease_seconds=60)] == ["https://x/0.jpg"]
+    assert list(client.hgetall("photo_collector:leases:r1")) == ["https://x/0.jpg"]
+
+
+def test_redis_smart_dedup_does_not_release_a_lock_it_lost():
+    client = FakeRedis()
+    smart = RedisCoordination(client).smart_dedup()
+    real_hget = client.hget
+
+    def hget(name, key):
+        # Our lock expires mid-update and another node takes it.
+        client.data[smart.lock_key] = "other-node"
+        return real_hget(name, key)
+
+    client.hget = hget
+    assert smart.check_and_update_fingerprint("ff" * 8, 100, "/a.jpg") == ("NEW", None)
+    assert client.data[smart.lock_key] == "other-node"
+
+
+def test_default_run_id_changes_every_cycle():
+    assert default_run_id(4, datetime(2026, 1, 1, 9, 59)) == "2026-01-01T0800"
+    assert default_run_id(4, datetime(2026, 1, 1, 12, 0)) == "2026-01-01T1200"
+    assert default_run_id(0.5, datetime(2026, 1, 1, 0, 45)) == "2026-01-01T0030"
+
+
+def test_coordinated_partition_keeps_meta_databases_off_wal(tmp_path):
+    import asyncio
+    import sqlite3
+
+    import httpx
+
+    from app.config import RunConfig
+    from app.jsonl_logger import JsonlLogger
+    from app.log_segments import rotate
+    from app.runner import MetricsFailedLogger, _download_partition, _new_guard
+
+    config = RunConfig(coordination="sqlite", processes=1)
+    failed = MetricsFailedLogger(JsonlLogger(tmp_path / "meta" / "failed.jsonl"))
+    (tmp_path / "meta" / "items.jsonl").write_text('{"time_kst": "2020-01-01T00:00:00+09:00"}\n')
+    rotate(tmp_path / "meta", "items", max_bytes=1, max_age_days=1, codec="gzip", wal=False)
+
+    async def main():
+        async with httpx.AsyncClient() as client:
+            return await _download_partition(
+                config,
+                tmp_path,
+                [],
+                client=client,
+                guard=_new_guard(config, failed),
+                items_logger=JsonlLogger(tmp_path / "meta" / "items.jsonl"),
+                failed_logger=failed,
+                deadline=None,
+            )
+
+    asyncio.run(main())
+    databases = sorted((tmp_path / "meta").rglob("*.sqlite"))
+    assert not (tmp_path / "meta" / "frontier.sqlite").exists()
+    assert len(databases) >= 5
+    for path in databases:
+        conn = sqlite3.connect(path)
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete", path.name
+        conn.close()
@@ -0,0 +1,14 @@
+from app.dedup import DedupStore
+
+
+def test_claim_is_insert_if_absent_across_connections(tmp_path):
+    a = DedupStore(tmp_path / "dedup.sqlite")
+    b = DedupStore(tmp_path / "dedup.sqlite")
+
+    assert a.claim("abc", "t1") is True
+    assert b.claim("abc", "t2") is False
+
+    a.release("abc")
+    assert b.claim("abc", "t3") is True
+    a.close()
+    b.close()
@@ -0,0 +1,55 @@
+from PIL import Image
+
+from app.dedup_index import build_index
+from app.smart_dedup import SmartDedupStore
+
+
+def test_backfill_is_incremental_and_keeps_larger_copy(tmp_path):
+    day = tmp_path / "2026-01-01" / "naver"
+    day.mkdir(parents=True)
+    img = Image.linear_gradient("L").convert("RGB")
+    img.resize((400, 300)).save(day / "small.jpg")
+    img.resize((800, 600)).save(day / "large.jpg")
+    (tmp_path / "Organized").mkdir()
+    img.save(tmp_path / "Organized" / "copy.jpg")
+
+    stats = build_index(tmp_path, workers=1)
+    assert (stats.scanned, stats.hashed) == (2, 2)
+    store = SmartDedupStore(str(tmp_path / "meta" / "smart_dedup.pkl"))
+    assert [info["path"] for info in store.hashes.values()] == [str(day / "large.jpg")]
+
+    (day / "large.jpg").unlink()
+    stats = build_index(tmp_path, workers=1)
+    assert (stats.unchanged, stats.hashed, stats.removed) == (1, 0, 1)
+    store = SmartDedupStore(str(tmp_path / "meta" / "smart_dedup.pkl"))
+    assert [info["path"] for info in store.hashes.values()] == [str(day / "small.jpg")]
+
+
+def test_hashes_from_an_older_fingerprint_version_are_redone(tmp_path):
+    import sqlite3
+
+    from app.smart_dedup import fingerprint
+
+    day = tmp_path / "2026-01-01" / "naver"
+    day.mkdir(parents=True)
+    path = day / "a.jpg"
+    Image.radial_gradient("L").convert("RGB").resize((1600, 1200)).save(path)
+    with Image.open(path) as img:
+        current, area = fingerprint(img)
+        assert img.size[0] < 1600  # decoded at draft size
+
+    build_index(tmp_path, workers=1)
+    conn = sqlite3.connect(tmp_path / "meta" / "dedup_index.sqlite")
+    with conn:
+        conn.execute("UPDATE library_index SET phash = 'old-hash'")
+        conn.execute("DELETE FROM library_meta")  # written before the version was recorded
+    conn.close()
+    store = SmartDedupStore(str(tmp_path / "meta" / "smart_dedup.pkl"))
+    store.hashes = {"old-hash": {"path": str(path), "area": area}}
+    store.save()
+
+    stats = build_index(tmp_path, workers=1)
+    assert (stats.unchanged, stats.hashed) == (0, 1)
+    assert SmartDedupStore(str(tmp_path / "meta" / "smart_dedup.pkl")).hashes == {
+        current: {"path": str(path), "area": 1600 * 1200}
+    }
@@ -0,0 +1,15 @@
+from app.discovery_cache import DiscoveryCache
+from app.models import Candidate
+
+
+def test_entries_expire_per_provider_ttl(tmp_path):
+    cache = DiscoveryCache(tmp_path / "d.sqlite", ttls_seconds={"wikimedia": 100})
+    found = [Candidate(url="https://x/1.jpg", provider="wikimedia", query="q", source_url="https://x/p")]
+    cache.put("wikimedia", "q", 0, found, now=1000)
+    cache.put("naver", "q", 0, found, now=1000)  # no TTL -> never cached
+
+    assert cache.get("wikimedia", "q", 0, now=1050) == found
+    assert cache.get("wikimedia", "q", 0, now=1101) is None
+    assert cache.get("naver", "q", 0, now=1001) is None
+    assert cache.stats() == {"wikimedia": {"hit": 1, "miss": 1}}
+    cache.close()
@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+
+from app.file_writer import FileWriter
+
+
+def test_files_land_whole_via_rename_and_dirs_are_created_once(tmp_path):
+    writer = FileWriter(fsync=True, batch_size=8)
+    final = tmp_path / "day" / "final.jpg"
+
+    async def main():
+        tmp = await writer.open_temp(final.parent)
+        await writer.append(tmp, b"x" * 10)
+        assert tmp.name.endswith(".part") and not final.exists()
+        await writer.close_temp(tmp)
+        await writer.commit(tmp, final)
+        await asyncio.gather(*(writer.copy(final, tmp_path / "Organized" / f"{i}.jpg") for i in range(5)))
+        writer.abort(await writer.open_temp(final.parent))
+        with pytest.raises(FileNotFoundError):
+            await writer.commit(tmp, final)  # already renamed
+
+    asyncio.run(main())
+    writer.stop()
+    stats = writer.take_stats()
+    assert final.read_bytes() == b"x" * 10
+    assert sorted(p.name for p in (tmp_path / "Organized").iterdir()) == [f"{i}.jpg" for i in range(5)]
+    assert not list(tmp_path.rglob("*.part"))
+    assert (stats["files"], stats["copies"], stats["bytes"], stats["mkdirs"]) == (1, 5, 60, 2)
+    assert stats["fsyncs"] >= 6  # every file before its rename, plus the directories
+    assert writer.take_stats()["files"] == 0
@@ -0,0 +1,72 @@
+import asyncio
+
+import httpx
+
+from app.http_utils import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    CircuitBreaker,
+    RequestGuard,
+    RetryBudget,
+    request_with_retry,
+)
+
+
+def test_breaker_opens_then_half_opens_single_trial():
+    b = CircuitBreaker(failure_threshold=2, cooldown_seconds=10)
+    assert b.on_failure(0) is None
+    assert b.on_failure(1) == STATE_OPEN
+    assert b.allow(5) == (False, None)
+    assert b.allow(12) == (True, STATE_HALF_OPEN)
+    assert b.allow(12) == (False, None)  # only one trial while half-open
+    assert b.on_success() == STATE_CLOSED
+
+
+def test_retry_budget_is_fraction_of_requests():
+    budget = RetryBudget(ratio=0.5, min_retries=0)
+    budget.requests = 4
+    assert [budget.try_spend() for _ in range(3)] == [True, True, False]
+
+
+def _half_open_guard():
+    guard = RequestGuard(failure_threshold=1, cooldown_seconds=0)
+    guard.record("https://api.test/x", ok=False)
+    assert guard.breakers["api.test"].state == STATE_OPEN
+    return guard
+
+
+def test_give_up_response_settles_half_open_trial():
+    guard = _half_open_guard()
+
+    async def main():
+        transport = httpx.MockTransport(lambda request: httpx.Response(429, json={"errorCode": "010"}))
+        async with httpx.AsyncClient(transport=transport) as client:
+            resp = await request_with_retry(client, "GET", "https://api.test/x", guard=guard, give_up=lambda r: True)
+            assert resp.status_code == 429
+
+    asyncio.run(main())
+    breaker = guard.breakers["api.test"]
+    assert breaker.state == STATE_CLOSED and not breaker.trial_in_flight
+
+
+def test_cancelled_half_open_trial_frees_the_host():
+    guard = _half_open_guard()
+
+    async def handler(request):
+        await asyncio.sleep(10)
+        return httpx.Response(200)
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            task = asyncio.create_task(request_with_retry(client, "GET", "https://api.test/x", guard=guard))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    asyncio.run(main())
+    assert guard.breakers["api.test"].state == STATE_HALF_OPEN
+    assert guard.allow_request("https://api.test/x")  # a new trial may go out
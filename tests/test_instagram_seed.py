@@ -0,0 +1,56 @@
+import asyncio
+
+import httpx
+
+from app.discovery_cache import DiscoveryCache
+from app.providers.instagram_seed import InstagramSeedProvider, find_og_image
+from conftest import ListLogger
+
+
+def test_find_og_image_ignores_attribute_order_and_decodes_entities():
+    head = b"""<head><meta property="og:title" content="x"><META content='https://cdn.test/p.jpg?a=1&amp;b=2' Property='og:image' /></head>"""
+    assert find_og_image(head) == "https://cdn.test/p.jpg?a=1&b=2"
+    assert find_og_image(b"<head><title>login</title></head>") is None
+
+
+def test_seeds_resolve_concurrently_and_stop_reading_at_head(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.http_utils.random.uniform", lambda a, b: 0)
+    seeds = tmp_path / "seeds.txt"
+    seeds.write_text("# comment\nhttps://cdn.test/direct.jpg\n" + "".join(f"https://ig.test/p/{i}/\n" for i in range(8)))
+    state = {"active": 0, "peak": 0, "body_chunks": 0}
+
+    async def page(i):
+        yield f'<html><head><meta property="og:image" content="https://cdn.test/{i}.jpg"></head>'.encode()
+        for _ in range(100):
+            state["body_chunks"] += 1
+            yield b"<div>" + b"x" * 4096 + b"</div>"
+
+    async def handler(request):
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.05)
+        state["active"] -= 1
+        i = request.url.path.split("/")[2]
+        if i == "7":
+            return httpx.Response(401)
+        return httpx.Response(200, content=page(i))
+
+    cache = DiscoveryCache(tmp_path / "d.sqlite")
+    logger = ListLogger()
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            provider = InstagramSeedProvider(seeds, cache=cache, concurrency=3)
+            first = await provider.collect(client, logger, now_ts="t")
+            second = await provider.collect(client, logger, now_ts="t")
+            return first, second
+
+    first, second = asyncio.run(main())
+    expected = ["https://cdn.test/direct.jpg"] + [f"https://cdn.test/{i}.jpg" for i in range(7)]
+    assert [c.url for c in first] == expected
+    assert [c.url for c in second] == expected
+    assert state["peak"] == 3
+    assert state["body_chunks"] < 7 * 100 // 10
+    assert [r["reason"] for r in logger.rows] == ["INSTAGRAM_LOGIN_OR_BLOCKED"] * 2  # failures are not cached
+    assert cache.stats() == {"instagram_seed": {"hit": 7, "miss": 9}}
+    cache.close()
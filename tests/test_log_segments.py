@@ -0,0 +1,74 @@
+import json
+
+from app.log_segments import SegmentIndex, iter_log, rotate
+
+
+def _write(path, days):
+    with path.open("a", encoding="utf-8") as fh:
+        for day in days:
+            fh.write(json.dumps({"time_kst": f"{day}T09:00:00+09:00", "reason": "DUPLICATE", "url": day}) + "\n")
+
+
+def test_rotation_compresses_segments_and_reader_seeks_by_date(tmp_path):
+    meta = tmp_path / "meta"
+    meta.mkdir()
+    active = meta / "failed.jsonl"
+
+    _write(active, ["2026-01-01", "2026-01-02"])
+    assert rotate(meta, "failed", max_bytes=1 << 30, max_age_days=10_000, codec="gzip") is None
+    first = rotate(meta, "failed", max_bytes=1, max_age_days=10_000, codec="gzip")
+    assert first is not None and first.path.suffix == ".gz" and first.lines == 2
+    assert not active.exists()
+
+    _write(active, ["2026-02-01", "2026-02-02"])
+    # Entries older than max_age_days rotate regardless of size.
+    second = rotate(meta, "failed", max_bytes=1 << 30, max_age_days=1, codec="zstd")
+    assert second is not None and second.first_ts.startswith("2026-02-01")
+    _write(active, ["2026-03-01"])
+
+    assert [r["url"] for r in iter_log(meta, "failed")] == [
+        "2026-01-01", "2026-01-02", "2026-02-01", "2026-02-02", "2026-03-01"
+    ]
+    assert [r["url"] for r in iter_log(meta, "failed", since="2026-01-02", until="2026-02-01")] == [
+        "2026-01-02", "2026-02-01"
+    ]
+    index = SegmentIndex(meta)
+    assert [s.path for s in index.segments("failed", since="2026-02-01")] == [second.path]
+    index.close()
+
+
+def test_interrupted_rotation_is_finished_next_time(tmp_path):
+    meta = tmp_path / "meta"
+    raw = meta / "segments" / "items" / "items-20260101T000000-1.jsonl"
+    raw.parent.mkdir(parents=True)
+    _write(raw, ["2026-01-01"])
+
+    assert rotate(meta, "items", max_bytes=1 << 30, max_age_days=10_000, codec="gzip") is None
+    assert not raw.exists()
+    assert [r["url"] for r in iter_log(meta, "items")] == ["2026-01-01"]
+
+
+def test_segment_claimed_by_another_process_is_left_alone(tmp_path):
+    import time
+
+    meta = tmp_path / "meta"
+    raw_dir = meta / "segments" / "items"
+    raw_dir.mkdir(parents=True)
+    raw = raw_dir / "items-20260101T000000-1-abcd1234.jsonl"
+    _write(raw, ["2026-01-01"])
+    name = raw.name + ".gz"
+    leftover = raw_dir / f".{name}.999-deadbeef.part"
+    leftover.write_bytes(b"half written")
+
+    index = SegmentIndex(meta)
+    assert index.claim("items", name, "other-live")
+    assert rotate(meta, "items", max_bytes=1, max_age_days=1, codec="gzip") is None
+    assert raw.exists() and leftover.exists()
+
+    # The other process died: its claim goes stale and the segment is taken over.
+    assert index.claim("items", name, "other-live", now=time.time() - 3600)
+    index.close()
+    rotate(meta, "items", max_bytes=1, max_age_days=1, codec="gzip")
+    assert not raw.exists() and not leftover.exists()
+    assert [r["url"] for r in iter_log(meta, "items")] == ["2026-01-01"]
+    assert sorted(p.name for p in raw_dir.iterdir()) == [name]
@@ -0,0 +1,54 @@
+import asyncio
+import json
+import time
+
+from app.loop_watchdog import LoopWatchdog
+
+
+def _blocking_call():
+    time.sleep(0.3)
+
+
+def test_blocking_callback_is_logged_with_its_stack(tmp_path):
+    log = tmp_path / "loop_stalls.jsonl"
+
+    async def main():
+        watchdog = LoopWatchdog(log, threshold_s=0.1, interval_s=0.02)
+        watchdog.start()
+        await asyncio.sleep(0.1)
+        _blocking_call()
+        await asyncio.sleep(0.1)
+        await watchdog.stop()
+        return watchdog.stats()
+
+    stats = asyncio.run(main())
+    assert stats["count"] == 1
+    assert 250 <= stats["max_ms"] < 1000
+
+    (record,) = [json.loads(line) for line in log.read_text(encoding="utf-8").splitlines()]
+    assert record["duration_ms"] == stats["max_ms"]
+    assert any("in _blocking_call" in frame for frame in record["stack"])
+
+
+def test_failed_run_stops_watchdog_memory_monitor_and_tracer(tmp_path, monkeypatch):
+    import threading
+    import tracemalloc
+
+    import pytest
+
+    import app.runner
+    from app.config import RunConfig
+    from app.tracing import NULL_TRACER, tracer
+
+    monkeypatch.setenv("PHOTO_ROOT", str(tmp_path))
+
+    async def broken_collect(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(app.runner, "_collect", broken_collect)
+    config = RunConfig(trace=True, trace_memory=True)
+    with pytest.raises(RuntimeError):
+        asyncio.run(app.runner.run_once(config, tmp_path))
+    assert tracer() is NULL_TRACER
+    assert not tracemalloc.is_tracing()
+    assert not [t for t in threading.enumerate() if t.name in ("loop-watchdog", "memory-monitor") and t.is_alive()]
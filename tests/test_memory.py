@@ -0,0 +1,21 @@
+import pytest
+
+from app.memory import MemoryMonitor, current_rss_bytes
+
+
+@pytest.mark.skipif(current_rss_bytes() is None, reason="no RSS source on this platform")
+def test_peak_is_attributed_to_stage_and_allocation_site():
+    monitor = MemoryMonitor(interval_s=60, trace_memory=True, top_n=5)
+    monitor.start()
+    monitor.set_stage("download")
+    blob = [b"x" * (1024 * 1024) for _ in range(64)]  # 64 MB, written so it is resident
+    monitor.sample()
+    monitor.stop()
+    stats = monitor.stats()
+    monitor.close()
+    del blob
+
+    assert stats["peak_stage"] == "download"
+    assert stats["stage_peaks_mb"]["download"] >= stats["stage_peaks_mb"]["setup"] + 50
+    top = stats["top_allocations"][0]
+    assert top["site"].startswith(__file__) and top["size_mb"] >= 60
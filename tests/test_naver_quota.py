@@ -0,0 +1,79 @@
+import asyncio
+from datetime import datetime
+
+import httpx
+
+from app.naver_quota import NaverQuota
+from app.providers.naver import NaverImageProvider
+from app.time_utils import KST
+from conftest import ListLogger
+
+
+def test_plan_prefers_high_yield_calls_within_run_budget(tmp_path):
+    quota = NaverQuota(tmp_path / "q.sqlite", daily_limit=12, run_interval_hours=4)
+    quota.record_call("a", 0, [f"https://x/a{i}" for i in range(10)])
+    quota.record_call("a", 1, [f"https://x/a{i}" for i in range(10)])  # nothing new on page 2
+    quota.record_call("b", 0, [f"https://x/b{i}" for i in range(10)])
+
+    noon = datetime(2026, 1, 1, 12, 0, tzinfo=KST)  # 12h left -> 3 runs -> 4 calls each
+    plan = quota.plan(["a", "b"], 3, display=10, now=noon)
+    assert len(plan) == 4
+    assert ("a", 1) not in plan
+    quota.close()
+
+
+def test_quota_error_stops_provider_without_retrying(tmp_path, monkeypatch):
+    monkeypatch.setenv("NAVER_CLIENT_ID", "id")
+    monkeypatch.setenv("NAVER_CLIENT_SECRET", "secret")
+
+    async def no_sleep(_):
+        return None
+
+    monkeypatch.setattr("app.http_utils.asyncio.sleep", no_sleep)
+    seen = []
+
+    def handler(request):
+        seen.append(request.url.params["start"])
+        if len(seen) == 1:
+            return httpx.Response(200, json={"items": [{"link": "https://img/1.jpg"}]})
+        return httpx.Response(429, json={"errorCode": "010", "errorMessage": "quota"})
+
+    quota = NaverQuota(tmp_path / "q.sqlite")
+    logger = ListLogger()
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            provider = NaverImageProvider(display=10, pages=3, quota=quota)
+            return await provider.collect(client, ["kw"], failed_logger=logger, now_ts="t")
+
+    candidates = asyncio.run(main())
+    assert [c.url for c in candidates] == ["https://img/1.jpg"]
+    assert len(seen) == 2  # the quota error was neither retried nor followed by page 3
+    assert [r["reason"] for r in logger.rows] == ["NAVER_QUOTA_EXCEEDED"]
+    assert quota.is_exhausted() and quota.used() == 2
+    quota.close()
+
+
+def test_page_plan_sets_the_budget_and_stale_pages_give_way_to_deeper_ones(tmp_path):
+    quota = NaverQuota(tmp_path / "q.sqlite")
+    quota.record_call("a", 0, [f"https://x/a{i}" for i in range(10)])
+    quota.record_call("a", 1, [f"https://x/a{i}" for i in range(10)])  # page 2 repeats page 1
+
+    plan = quota.plan(["a"], 2, display=10)
+    assert len(plan) == 2  # the page plan binds even though most of the daily quota is left
+    assert ("a", 1) not in plan and ("a", 2) in plan
+    assert all(page * 10 + 1 <= 1000 for _, page in quota.plan(["a"], 500, display=100))
+    quota.close()
+
+
+def test_seen_urls_expire_by_age(tmp_path):
+    db = tmp_path / "q.sqlite"
+    quota = NaverQuota(db, seen_ttl_days=1)
+    assert quota.record_call("a", 0, ["https://x/old"], now=0) == 1
+    assert quota.record_call("a", 0, ["https://x/old"], now=0) == 0
+    quota.close()
+
+    quota = NaverQuota(db, seen_ttl_days=1)  # reopening prunes rows older than a day
+    assert quota.conn.execute("SELECT COUNT(*) FROM naver_seen").fetchone()[0] == 0
+    assert quota.record_call("a", 0, ["https://x/old"]) == 1
+    quota.close()
@@ -0,0 +1,52 @@
+import itertools
+import random
+
+import pytest
+
+from app.near_dup import cluster_hashes
+
+
+def _brute(hashes, threshold):
+    parent = list(range(len(hashes)))
+
+    def find(x):
+        while parent[x] != x:
+            x = parent[x]
+        return x
+
+    for i, j in itertools.combinations(range(len(hashes)), 2):
+        if (hashes[i] ^ hashes[j]).bit_count() <= threshold:
+            parent[find(j)] = find(i)
+    groups = {}
+    for i in range(len(hashes)):
+        groups.setdefault(find(i), []).append(i)
+    return sorted(sorted(g) for g in groups.values() if len(g) > 1)
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_clusters_match_brute_force(use_numpy):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    rng = random.Random(7)
+    hashes = [rng.getrandbits(64) for _ in range(300)]
+    for _ in range(200):
+        h = hashes[rng.randrange(60)]
+        for bit in rng.sample(range(64), rng.randint(0, 9)):
+            h ^= 1 << bit
+        hashes.append(h)
+
+    for threshold in (0, 4, 8):
+        assert sorted(cluster_hashes(hashes, threshold, use_numpy=use_numpy)) == _brute(hashes, threshold)
+
+
+def test_near_dups_warns_when_numpy_is_missing(monkeypatch, tmp_path):
+    from typer.testing import CliRunner
+
+    import app.cli
+    import app.near_dup
+
+    monkeypatch.setenv("PHOTO_ROOT", str(tmp_path))
+    monkeypatch.setattr(app.near_dup, "numpy_available", lambda: False)
+    result = CliRunner(mix_stderr=False).invoke(app.cli.app, ["near-dups", "--no-refresh"])
+    assert result.exit_code == 0, result.output
+    assert "numpy" in result.stderr
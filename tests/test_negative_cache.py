@@ -0,0 +1,73 @@
+import time
+
+from app.models import Candidate
+from app.negative_cache import NegativeCache, canonical_url
+
+
+def test_canonical_url_ignores_case_fragment_and_param_order():
+    assert canonical_url("HTTPS://Img.Example.com:443/a.jpg?b=2&a=1#x") == "https://img.example.com/a.jpg?a=1&b=2"
+
+
+def test_url_ttl_escalates_and_success_clears(tmp_path):
+    cache = NegativeCache(tmp_path / "neg.sqlite", ttls_seconds=(10, 100), host_failure_threshold=99)
+    cand = Candidate(url="https://h.example/a.jpg", provider="google")
+
+    cache.record(cand, "DOWNLOAD_FAIL", now=0)
+    assert cache.check(cand, now=5) == "url"
+    assert cache.check(cand, now=11) is None
+
+    cache.record(cand, "NOT_IMAGE", now=11)
+    assert cache.check(cand, now=100) == "url"
+
+    cache.record(cand, "OK", now=200)
+    assert cache.check(cand, now=201) is None
+
+
+def test_host_is_skipped_after_failure_streak(tmp_path):
+    cache = NegativeCache(tmp_path / "neg.sqlite", ttls_seconds=(10,), host_failure_threshold=2)
+    for i in range(2):
+        cache.record(
+            Candidate(url=f"https://dead.example/{i}.jpg", provider="naver"), "DOWNLOAD_FAIL", now=0, host_fault=True
+        )
+    assert cache.check(Candidate(url="https://dead.example/new.jpg", provider="naver"), now=1) == "host"
+
+
+def test_local_failures_do_not_count_against_the_host(tmp_path):
+    cache = NegativeCache(tmp_path / "neg.sqlite", ttls_seconds=(10,), host_failure_threshold=2)
+    for i in range(5):
+        cache.record(Candidate(url=f"https://ok.example/{i}.jpg", provider="naver"), "DOWNLOAD_FAIL", now=0, remote=False)
+    cand = Candidate(url="https://ok.example/0.jpg", provider="naver")
+    assert cache.check(cand, now=1) is None
+
+    # A local failure between remote ones does not reset the streak either.
+    cache.record(Candidate(url="https://ok.example/a.jpg", provider="naver"), "DOWNLOAD_FAIL", now=0, host_fault=True)
+    cache.record(Candidate(url="https://ok.example/b.jpg", provider="naver"), "DOWNLOAD_FAIL", now=0, remote=False)
+    cache.record(Candidate(url="https://ok.example/c.jpg", provider="naver"), "DOWNLOAD_FAIL", now=0, host_fault=True)
+    assert cache.check(cand, now=1) == "host"
+
+
+def test_dead_links_do_not_blacklist_the_host_and_host_ttl_is_capped(tmp_path):
+    cache = NegativeCache(
+        tmp_path / "neg.sqlite", ttls_seconds=(10, 7 * 24 * 3600), host_failure_threshold=2, host_ttl_max_seconds=60
+    )
+    for i in range(10):
+        cache.record(Candidate(url=f"https://cdn.example/{i}.jpg", provider="naver"), "NOT_IMAGE", now=0)
+    probe = Candidate(url="https://cdn.example/new.jpg", provider="naver")
+    assert cache.check(probe, now=1) is None
+
+    now = time.time()  # reopening forgets entries expired for 30 days of real time
+    for run_start in (now, now + 100):  # one streak per run; the second run escalates the host
+        cache.close()
+        cache = NegativeCache(
+            tmp_path / "neg.sqlite", ttls_seconds=(10, 7 * 24 * 3600), host_failure_threshold=2, host_ttl_max_seconds=60
+        )
+        for i in range(2):
+            cache.record(
+                Candidate(url=f"https://cdn.example/t{run_start}-{i}.jpg", provider="naver"),
+                "DOWNLOAD_FAIL",
+                now=run_start,
+                host_fault=True,
+            )
+    # Second host failure would be 7 days on the URL ladder; hosts stop at host_ttl_max_seconds.
+    assert cache.check(probe, now=now + 159) == "host"
+    assert cache.check(probe, now=now + 161) is None
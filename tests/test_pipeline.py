@@ -0,0 +1,112 @@
+import asyncio
+import random
+import time
+from io import BytesIO
+
+import httpx
+from PIL import Image
+
+from app.dedup import DedupStore
+from app.downloader import ImageDownloader
+from app.models import Candidate
+from app.smart_dedup import SmartDedupStore
+from conftest import ListLogger
+
+
+def _jpeg(seed, size=(800, 800)):
+    rng = random.Random(seed)
+    img = Image.frombytes("RGB", size, bytes(rng.getrandbits(8) for _ in range(size[0] * size[1] * 3)))
+    buf = BytesIO()
+    img.save(buf, "JPEG")
+    return buf.getvalue()
+
+
+def _downloader(tmp_path, **kwargs):
+    meta = tmp_path / "meta"
+    items, failed = ListLogger(), ListLogger()
+    downloader = ImageDownloader(
+        tmp_path,
+        DedupStore(meta / "dedup.sqlite"),
+        items,
+        failed,
+        smart_dedup=SmartDedupStore(str(meta / "smart_dedup.pkl")),
+        **kwargs,
+    )
+    return downloader, items, failed
+
+
+def test_pipeline_stages_process_every_candidate(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.downloader.random.uniform", lambda a, b: 0.0)
+    bodies = {f"/{i}.jpg": _jpeg(i) for i in range(6)}
+    bodies["/dup.jpg"] = bodies["/0.jpg"]
+    bodies["/small.jpg"] = _jpeg(99, size=(100, 100))
+
+    def handler(request):
+        if request.url.path == "/page.html":
+            return httpx.Response(200, headers={"content-type": "text/html"}, content=b"<html>")
+        return httpx.Response(200, headers={"content-type": "image/jpeg"}, content=bodies[request.url.path])
+
+    downloader, items, _ = _downloader(tmp_path, process_workers=2, stage_queue_size=2)
+    urls = [*bodies, "/page.html"]
+    cands = [Candidate(url=f"https://img.test{path}", provider="p", query="q") for path in urls]
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await downloader.process_candidates(client, cands, workers=3)
+
+    counts, provider_ok = asyncio.run(main())
+    assert counts == {"OK": 6, "DUPLICATE": 1, "RESOLUTION_TOO_SMALL": 1, "NOT_IMAGE": 1}
+    assert provider_ok == {"p": 6} and len(items.rows) == 6
+    stats = downloader.pipeline_stats
+    assert stats["fetch"]["items"] == 9 and stats["process"]["items"] == 8 and stats["persist"]["items"] == 9
+    assert stats["process"]["queue_max"] <= 2 and stats["persist"]["queue_max"] <= 2
+    assert not list(tmp_path.rglob("*.part"))
+
+
+def test_deadline_cancels_pipeline_and_drops_temp_files(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.downloader.random.uniform", lambda a, b: 0.0)
+    body = {f"/{i}.jpg": _jpeg(i) for i in range(6)}
+
+    async def handler(request):
+        await asyncio.sleep(1.0)
+        return httpx.Response(200, headers={"content-type": "image/jpeg"}, content=body[request.url.path])
+
+    downloader, _, _ = _downloader(tmp_path)
+    cands = [Candidate(url=f"https://img.test{path}", provider="p", query="q") for path in body]
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await downloader.process_candidates(
+                client, cands, workers=2, deadline=time.monotonic() + 3.2, drain_seconds=0.1
+            )
+
+    counts, _ = asyncio.run(main())
+    assert counts["DEADLINE_DEFERRED"] > 0
+    assert counts["OK"] + counts["DEADLINE_DEFERRED"] == 6
+    assert not list(tmp_path.rglob("*.part"))
+
+
+def test_failed_rename_leaves_smart_dedup_index_untouched(tmp_path, monkeypatch):
+    import pytest
+
+    monkeypatch.setattr("app.downloader.random.uniform", lambda a, b: 0.0)
+    body = _jpeg(1)
+
+    def handler(request):
+        return httpx.Response(200, headers={"content-type": "image/jpeg"}, content=body)
+
+    downloader, _, _ = _downloader(tmp_path)
+
+    async def broken_commit(tmp, dest):
+        raise OSError("disk full")
+
+    downloader.writer.commit = broken_commit
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await downloader.process_candidates(client, [Candidate(url="https://img.test/1.jpg", provider="p")], workers=1)
+
+    with pytest.raises(OSError):
+        asyncio.run(main())
+    assert SmartDedupStore(str(tmp_path / "meta" / "smart_dedup.pkl")).hashes == {}
+    assert downloader.dedup_store.conn.execute("SELECT COUNT(*) FROM hashes").fetchone()[0] == 0
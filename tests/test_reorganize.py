@@ -0,0 +1,37 @@
+from PIL import Image
+
+import reorganize
+from app.near_dup import build_report, quarantine
+from app.thumbnails import ThumbnailCache
+
+
+def _image(path, size=(1200, 800)):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", size, (120, 80, 40)).save(path)
+
+
+def test_thumbnail_cache_is_not_organized(tmp_path):
+    _image(tmp_path / "2026-01-01" / "naver" / "aaaa.jpg")
+    cache = ThumbnailCache(tmp_path / "meta" / "thumbs")
+    thumb = cache.path_for("bb" * 32)
+    _image(thumb, size=(320, 213))
+    cache.record("bb" * 32, thumb.stat().st_size)
+    cache.close()
+
+    assert reorganize.main(tmp_path) == 0
+    assert reorganize.main(tmp_path) == 0
+    organized = sorted(p.relative_to(tmp_path).as_posix() for p in (tmp_path / "Organized").rglob("*") if p.is_file())
+    assert organized == ["Organized/General_HQ/aaaa.jpg"]
+
+
+def test_quarantined_files_stay_out_of_organized(tmp_path):
+    keep = tmp_path / "2026-01-01" / "naver" / "keep.jpg"
+    dup = tmp_path / "2026-01-01" / "naver" / "dup.jpg"
+    _image(keep, size=(1600, 1000))
+    _image(dup)
+    report = build_report([("ff" * 8, str(keep), 1600 * 1000), ("ff" * 8, str(dup), 1200 * 800)], threshold=4)
+    assert quarantine(tmp_path, report) == 1
+
+    reorganize.main(tmp_path)
+    organized = sorted(p.name for p in (tmp_path / "Organized").rglob("*") if p.is_file())
+    assert organized == ["keep.jpg"]
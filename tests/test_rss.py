@@ -0,0 +1,75 @@
+import asyncio
+from xml.sax.saxutils import escape
+
+import httpx
+
+from app.providers.rss import image_urls, parse_rss_images
+from app.providers.twitter_rsshub import TwitterRSSHubProvider
+from conftest import ListLogger
+
+
+def _feed(n):
+    items = "".join(
+        "<item><link>https://x.test/status/{i}</link><description>{d}</description></item>".format(
+            i=i,
+            d=escape(f'<p>tweet {i}</p><img src="https://pbs.twimg.com/media/{i}.jpg?format=jpg&amp;name=small">'),
+        )
+        for i in range(n)
+    )
+    return f'<?xml version="1.0"?><rss><channel><title>t</title>{items}</channel></rss>'.encode()
+
+
+def test_image_urls_handles_quoting_and_entities():
+    desc = """<img src="https://a.test/1.jpg?x=1&amp;y=2"><IMG alt='x' SRC='https://a.test/2.png'><img src=https://a.test/3.gif>"""
+    assert image_urls(desc) == ["https://a.test/1.jpg?x=1&y=2", "https://a.test/2.png", "https://a.test/3.gif"]
+    assert image_urls("<p>no images</p>") == []
+
+
+def test_parse_stops_at_limit():
+    items = parse_rss_images(_feed(50), limit=3)
+    assert [link for link, _ in items] == [f"https://x.test/status/{i}" for i in range(3)]
+    assert items[0][1] == ["https://pbs.twimg.com/media/0.jpg?format=jpg&name=small"]
+    assert len(parse_rss_images(_feed(50))) == 50
+
+
+def test_rsshub_stops_reading_the_feed_at_the_limit():
+    body = _feed(2000)
+    sent = []
+
+    async def stream():
+        for start in range(0, len(body), 4096):
+            sent.append(start)
+            yield body[start : start + 4096]
+
+    def handler(request):
+        return httpx.Response(200, content=stream(), headers={"content-type": "application/rss+xml"})
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            provider = TwitterRSSHubProvider(keywords=["kw"], limit_per_keyword=5)
+            return await provider.collect(client, ListLogger(), now_ts="t")
+
+    candidates = asyncio.run(main())
+    assert [c.url for c in candidates] == [f"https://pbs.twimg.com/media/{i}.jpg?format=jpg&name=orig" for i in range(5)]
+    assert len(sent) < len(body) // 4096 // 10
+
+
+def test_twitter_rss_keeps_every_item_by_default(monkeypatch):
+    from app.providers.twitter_rss import TwitterRSSProvider
+
+    async def no_sleep(_):
+        return None
+
+    monkeypatch.setattr("app.providers.twitter_rss.asyncio.sleep", no_sleep)
+    body = _feed(60)
+
+    def handler(request):
+        return httpx.Response(200, content=body, headers={"content-type": "application/rss+xml"})
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            provider = TwitterRSSProvider()
+            provider.keywords = ["kw"]
+            return await provider.collect(client, ListLogger(), now_ts="t")
+
+    assert len(asyncio.run(main())) == 60
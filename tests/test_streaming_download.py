@@ -0,0 +1,128 @@
+import asyncio
+import hashlib
+import random
+from io import BytesIO
+
+import httpx
+from PIL import Image
+
+from app.dedup import DedupStore
+from app.downloader import ImageDownloader
+from app.models import Candidate
+from conftest import ListLogger
+
+
+def _jpeg(seed, size=(900, 900)):
+    rng = random.Random(seed)
+    img = Image.frombytes("RGB", size, bytes(rng.getrandbits(8) for _ in range(size[0] * size[1] * 3)))
+    buf = BytesIO()
+    img.save(buf, "JPEG")
+    return buf.getvalue()
+
+
+def _downloader(tmp_path, **kwargs):
+    items, failed = ListLogger(), ListLogger()
+    downloader = ImageDownloader(tmp_path, DedupStore(tmp_path / "meta" / "dedup.sqlite"), items, failed, **kwargs)
+    return downloader, items, failed
+
+
+def _chunked(body, size=64 * 1024):
+    async def stream():
+        for start in range(0, len(body), size):
+            yield body[start : start + size]
+
+    return stream()
+
+
+def _run(downloader, handler, urls, workers=1):
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            cands = [Candidate(url=url, provider="p") for url in urls]
+            return await downloader.process_candidates(client, cands, workers=workers)
+
+    return asyncio.run(main())
+
+
+def test_body_streams_to_a_part_file_and_is_renamed_into_place(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.downloader.random.uniform", lambda a, b: 0.0)
+    body = _jpeg(1)
+    downloader, items, _ = _downloader(tmp_path)
+    written = []
+    append = downloader.writer.append
+
+    async def spy(tmp, data):
+        written.append((tmp, len(data), any(tmp_path.rglob("*.jpg"))))
+        await append(tmp, data)
+
+    downloader.writer.append = spy
+
+    def handler(request):
+        return httpx.Response(200, headers={"content-type": "image/jpeg"}, content=_chunked(body))
+
+    counts, _ = _run(downloader, handler, ["https://img.test/a.jpg"])
+    assert counts["OK"] == 1
+    # Several chunks, all into one hidden .part file in the target directory, before any final file exists.
+    assert len(written) > 1 and len({tmp for tmp, _, _ in written}) == 1
+    tmp = written[0][0]
+    assert tmp.name.startswith(".") and tmp.suffix == ".part"
+    assert not any(saw_final for _, _, saw_final in written)
+    assert sum(n for _, n, _ in written) == len(body)
+
+    sha = hashlib.sha256(body).hexdigest()
+    row = items.rows[0]
+    assert row["sha256"] == sha
+    saved = tmp_path / row["saved_path"]
+    assert saved.parent == tmp.parent and saved.name.startswith(sha[:20])
+    assert saved.read_bytes() == body
+    assert not list(tmp_path.rglob("*.part"))
+
+
+def test_oversized_bodies_are_aborted(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.downloader.random.uniform", lambda a, b: 0.0)
+    body = _jpeg(2)
+    sent = {"declared": 0}
+
+    async def declared_stream():
+        sent["declared"] += 1
+        yield body
+
+    def handler(request):
+        if request.url.path == "/declared.jpg":
+            headers = {"content-type": "image/jpeg", "content-length": str(len(body))}
+            return httpx.Response(200, headers=headers, content=declared_stream())
+        # No Content-Length: the cap is enforced while streaming.
+        return httpx.Response(200, headers={"content-type": "image/jpeg"}, content=_chunked(body))
+
+    downloader, items, failed = _downloader(tmp_path, max_image_bytes=len(body) // 2)
+    counts, _ = _run(downloader, handler, ["https://img.test/declared.jpg", "https://img.test/chunked.jpg"])
+    assert counts == {"DOWNLOAD_FAIL": 2}
+    assert sent["declared"] == 0  # rejected from the header, body never read
+    details = sorted(r["detail"] for r in failed.rows)
+    assert details[0].startswith("_BodyTooLarge") and details[1].startswith("content_length=")
+    assert not items.rows
+    assert not list(tmp_path.rglob("*.part")) and not list(tmp_path.rglob("*.jpg"))
+
+
+def test_byte_budget_limits_concurrent_responses(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.downloader.random.uniform", lambda a, b: 0.0)
+    bodies = {f"/{i}.jpg": _jpeg(10 + i) for i in range(4)}
+    size = max(len(b) for b in bodies.values())
+    state = {"active": 0, "peak": 0}
+
+    async def slow(body):
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.05)
+        yield body
+        state["active"] -= 1
+
+    def handler(request):
+        body = bodies[request.url.path]
+        headers = {"content-type": "image/jpeg", "content-length": str(len(body))}
+        return httpx.Response(200, headers=headers, content=slow(body))
+
+    downloader, _, _ = _downloader(tmp_path, inflight_byte_budget=2 * size)
+    counts, _ = _run(downloader, handler, [f"https://img.test{p}" for p in bodies], workers=4)
+    assert counts["OK"] == 4
+    assert state["peak"] == 2
+    assert downloader.byte_budget.in_use == 0
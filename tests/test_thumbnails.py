@@ -0,0 +1,20 @@
+from PIL import Image
+
+from app.thumbnails import ThumbnailCache, render_thumbnail
+
+
+def test_thumbnails_are_small_webp_and_evicted_lru(tmp_path):
+    src = tmp_path / "big.jpg"
+    Image.linear_gradient("L").convert("RGB").resize((2000, 1500)).save(src)
+    cache = ThumbnailCache(tmp_path / "thumbs", max_bytes=1)
+
+    for sha in ("aa" * 32, "bb" * 32, "cc" * 32):
+        cache.record(sha, render_thumbnail(str(src), str(cache.path_for(sha))))
+    with Image.open(cache.path_for("aa" * 32)) as thumb:
+        assert thumb.format == "WEBP" and max(thumb.size) == 320
+
+    cache.touch(["aa" * 32])  # most recently used survives
+    cache.max_bytes = cache.path_for("aa" * 32).stat().st_size
+    assert cache.evict() == 2
+    assert cache.has("aa" * 32) and not cache.has("bb" * 32)
+    cache.close()
@@ -0,0 +1,37 @@
+import asyncio
+import json
+
+from app.tracing import NULL_TRACER, Tracer, activate, deactivate, tracer
+
+
+def test_spans_get_one_lane_per_task_and_write_chrome_trace(tmp_path):
+    t = Tracer()
+
+    async def work(n):
+        with tracer().span("step", "test", n=n) as span:
+            await asyncio.sleep(0)
+            span["done"] = True
+
+    async def main():
+        token = activate(t)
+        try:
+            await asyncio.gather(*(asyncio.create_task(work(n), name=f"worker-{n}") for n in range(3)))
+        finally:
+            deactivate(token)
+
+    asyncio.run(main())
+    assert tracer() is NULL_TRACER
+
+    path = t.write(tmp_path / "logs" / "trace.json")
+    events = json.loads(path.read_text(encoding="utf-8"))["traceEvents"]
+    spans = [e for e in events if e["ph"] == "X"]
+    lanes = {e["tid"]: e["args"]["name"] for e in events if e["ph"] == "M"}
+    assert len(spans) == 3 and all(e["dur"] >= 0 and e["args"]["done"] for e in spans)
+    assert sorted(lanes[e["tid"]] for e in spans) == ["worker-0", "worker-1", "worker-2"]
+
+
+def test_disabled_tracer_records_nothing():
+    with NULL_TRACER.span("step") as span:
+        span["x"] = 1
+    assert NULL_TRACER.httpx_hook() is None
+    assert not hasattr(NULL_TRACER, "events")
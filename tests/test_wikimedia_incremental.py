@@ -0,0 +1,103 @@
+import asyncio
+
+import httpx
+
+from app.providers.wikimedia import WikimediaProvider
+from app.watermarks import WatermarkStore
+
+
+class FakeCommons:
+    """Search results newest first, paged with gsroffset like CirrusSearch."""
+
+    def __init__(self, count):
+        self.files = [self._file(i) for i in range(count)]
+        self.next_id = count
+
+    @staticmethod
+    def _file(i):
+        return {"pageid": 1000 + i, "title": f"File:{i}.jpg", "ts": f"2026-01-01T00:{i:02d}:00Z"}
+
+    def upload(self):
+        self.files.append(self._file(self.next_id))
+        self.next_id += 1
+
+    def handler(self, request):
+        params = request.url.params
+        limit, offset = int(params["gsrlimit"]), int(params.get("gsroffset", 0))
+        ordered = sorted(self.files, key=lambda f: f["ts"], reverse=True)
+        page = ordered[offset : offset + limit]
+        data = {
+            "query": {
+                "pages": {
+                    str(f["pageid"]): {
+                        "pageid": f["pageid"],
+                        "title": f["title"],
+                        "imageinfo": [{"url": f"https://upload/{f['title'][5:]}", "timestamp": f["ts"]}],
+                    }
+                    for f in page
+                }
+            }
+        }
+        if offset + limit < len(ordered):
+            data["continue"] = {"gsroffset": offset + limit, "continue": "gsroffset||"}
+        return httpx.Response(200, json=data)
+
+
+def _collect(commons, store, **kwargs):
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(commons.handler)) as client:
+            provider = WikimediaProvider(watermarks=store, page_size=2, **kwargs)
+            found = await provider.collect(client, failed_logger=None, now_ts="t")
+            return {c.url.rsplit("/", 1)[1] for c in found}, provider.requests
+
+    return asyncio.run(main())
+
+
+def test_new_uploads_first_then_bounded_backfill(tmp_path, monkeypatch):
+    async def no_sleep(_):
+        return None
+
+    monkeypatch.setattr("app.http_utils.asyncio.sleep", no_sleep)
+    commons = FakeCommons(7)  # 0.jpg oldest .. 6.jpg newest
+    store = WatermarkStore(tmp_path / "w.sqlite")
+
+    urls, requests = _collect(commons, store, backfill_pages=1)
+    assert urls == {"6.jpg", "5.jpg", "4.jpg", "3.jpg"}
+    assert requests == 4  # 2 queries x (newest page + 1 backfill page)
+
+    commons.upload()  # 7.jpg
+    urls, requests = _collect(commons, store, backfill_pages=1)
+    # Only the new upload from the top, and the backfill continues where it stopped.
+    assert urls == {"7.jpg", "2.jpg", "1.jpg"}
+    assert requests == 4
+
+    urls, _ = _collect(commons, store, backfill_pages=1)
+    assert urls == {"0.jpg"}
+    assert store.get("wikimedia", "고윤정")["backfill_done"] is True
+    store.close()
+
+
+def test_backfill_advances_on_discovery_cache_hits(tmp_path, monkeypatch):
+    from app.discovery_cache import DiscoveryCache
+
+    async def no_sleep(_):
+        return None
+
+    monkeypatch.setattr("app.http_utils.asyncio.sleep", no_sleep)
+    commons = FakeCommons(7)
+    store = WatermarkStore(tmp_path / "w.sqlite")
+    cache = DiscoveryCache(tmp_path / "d.sqlite")
+
+    urls, requests = _collect(commons, store, cache=cache, backfill_pages=1)
+    assert urls == {"6.jpg", "5.jpg", "4.jpg", "3.jpg"} and requests == 4
+
+    # Within the TTL the newest page comes from the cache, but the backfill still moves on.
+    urls, requests = _collect(commons, store, cache=cache, backfill_pages=1)
+    assert urls == {"6.jpg", "5.jpg", "2.jpg", "1.jpg"}
+    assert requests == 2
+    urls, _ = _collect(commons, store, cache=cache, backfill_pages=1)
+    assert "0.jpg" in urls
+    assert store.get("wikimedia", "고윤정")["backfill_done"] is True
+    assert cache.stats() == {"wikimedia": {"hit": 4, "miss": 2}}
+    cache.close()
+    store.close()
@@ -0,0 +1,59 @@
+from app.models import Candidate
+from app.work_queue import WorkQueue
+
+
+def test_resume_reclaims_expired_leases(tmp_path):
+    q = WorkQueue(tmp_path / "frontier.sqlite", lease_seconds=10)
+    q.reset([Candidate(url=f"https://x/{i}.jpg", provider="naver") for i in range(3)], "ts")
+
+    q.lease("https://x/0.jpg")
+    q.complete("https://x/0.jpg", "OK")
+    q.lease("https://x/1.jpg")  # killed while in flight
+
+    assert [c.url for c in q.pending()] == ["https://x/2.jpg"]
+    assert q.reclaim_expired() == 0
+    assert q.reclaim_expired(now=10**12) == 1
+    assert [c.url for c in q.pending()] == ["https://x/1.jpg", "https://x/2.jpg"]
+    q.close()
+
+
+def test_lease_and_complete_are_written_in_batches(tmp_path):
+    path = tmp_path / "frontier.sqlite"
+    q = WorkQueue(path, batch_size=3, flush_seconds=3600)
+    q.reset([Candidate(url=f"https://x/{i}.jpg", provider="naver") for i in range(4)], "ts")
+    reader = WorkQueue(path)
+
+    q.lease("https://x/0.jpg")
+    q.complete("https://x/0.jpg", "OK")
+    assert reader.counts() == {"pending": 4}  # still buffered
+    q.lease("https://x/1.jpg")  # third update: one transaction for all three
+    assert reader.counts() == {"done": 1, "in_flight": 1, "pending": 2}
+
+    q.complete("https://x/1.jpg", "DUPLICATE")
+    q.close()  # flushes the rest
+    assert reader.counts() == {"done": 2, "pending": 2}
+    reader.close()
+
+
+def test_resume_completes_candidates_the_negative_cache_skips(tmp_path, monkeypatch):
+    import asyncio
+
+    from app.config import RunConfig
+    from app.negative_cache import NegativeCache
+    from app.runner import run_once
+
+    monkeypatch.setenv("PHOTO_ROOT", str(tmp_path))
+    meta = tmp_path / "Goyoonjung_Photos" / "meta"
+    dead = Candidate(url="https://dead.example/a.jpg", provider="naver")
+    q = WorkQueue(meta / "frontier.sqlite")
+    q.reset([dead], "ts")
+    q.close()
+    cache = NegativeCache(meta / "negative_cache.sqlite")
+    cache.record(dead, "DOWNLOAD_FAIL")
+    cache.close()
+
+    report = asyncio.run(run_once(RunConfig(providers=[], resume=True, thumbnails=False), tmp_path))
+    assert report.counts["NEGATIVE_CACHE_SKIP"] == 1
+    q = WorkQueue(meta / "frontier.sqlite")
+    assert q.counts() == {"done": 1}
+    q.close()
@@ -0,0 +1,35 @@
+import json
+
+from app.models import Candidate
+from app.yield_stats import YieldStatsStore
+
+
+def _write(path, rows):
+    path.write_text("".join(json.dumps(r) + "\n" for r in rows), encoding="utf-8")
+
+
+def test_bootstrap_classifies_failed_rows_like_live_outcomes(tmp_path):
+    meta = tmp_path / "meta"
+    meta.mkdir()
+    _write(meta / "items.jsonl", [{"url": "https://a.test/1.jpg", "provider": "naver", "reason": None}])
+    _write(
+        meta / "failed.jsonl",
+        [
+            {"url": "https://a.test/2.jpg", "provider": "naver", "reason": "DUPLICATE"},
+            {"url": "https://a.test/3.jpg", "provider": "naver", "reason": "DUPLICATE_SMART"},
+            {"url": "https://a.test/1.jpg", "provider": "naver", "reason": "SMART_DEDUP_ERROR"},
+            {"url": "https://ig.test/p/1", "provider": "naver", "reason": "OG_IMAGE_NOT_FOUND"},
+            {"url": "https://a.test/4.jpg", "provider": "naver", "reason": "DOWNLOAD_FAIL"},
+        ],
+    )
+    store = YieldStatsStore(meta / "yield_stats.sqlite")
+    assert store.bootstrap_from_jsonl(meta / "items.jsonl", meta / "failed.jsonl") == 2
+    store.load()
+    assert store._rates[("provider", "naver")] == (2, 1)
+
+    store.record(Candidate(url="https://a.test/5.jpg", provider="naver"), "DUPLICATE")
+    store.record(Candidate(url="https://a.test/6.jpg", provider="naver"), "OK")
+    store.conn.commit()
+    store.load()
+    assert store._rates[("provider", "naver")] == (3, 2)
+    store.close()